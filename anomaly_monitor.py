@@ -0,0 +1,228 @@
+import json
+import math
+import queue
+import threading
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+import streamlit as st
+from config import DEFAULT_SETTINGS
+from dataset_store import ROW_HASHES, get_dataset_store, row_hashes
+from nps_metrics import get_service_name
+
+# Granularités surveillées : libellé -> fréquence pandas
+FREQUENCIES = {"Mensuel": "M", "Hebdomadaire": "W"}
+
+def aggregate_periods(df, freq):
+    """Agrège les réponses par période : effectifs NPS et sommes des notes de satisfaction."""
+    if df.empty:
+        return pd.DataFrame()
+    scores = df['Recommandation']
+    values = {
+        'n': scores.notna().astype(int),
+        'promoteurs': (scores >= 9).astype(int),
+        'detracteurs': (scores <= 6).astype(int),
+    }
+    for col in df.columns:
+        if col.startswith('Satisfaction_'):
+            notes = df[col]
+            values[f'{col}__n'] = notes.notna().astype(int)
+            values[f'{col}__somme'] = notes.fillna(0)
+            values[f'{col}__carres'] = notes.fillna(0) ** 2
+    periods = df['Date'].dt.to_period(freq).to_numpy()
+    return pd.DataFrame(values, index=df.index).groupby(periods).sum().sort_index()
+
+def merge_aggregates(previous, new):
+    """Fusionne deux tableaux d'agrégats (les sommes s'additionnent)."""
+    if previous is None or previous.empty:
+        return new
+    if new.empty:
+        return previous
+    return previous.add(new, fill_value=0).sort_index()
+
+def _z_score(mean_cur, var_cur, n_cur, mean_ref, var_ref, n_ref):
+    """Statistique z de l'écart entre deux moyennes (test de Welch, grands échantillons)."""
+    se = math.sqrt(var_cur / n_cur + var_ref / n_ref)
+    return (mean_cur - mean_ref) / se if se > 0 else 0.0
+
+def detect_drops(aggregates, baseline_periods=6, min_responses=20, z_threshold=2.33):
+    """Compare la dernière période à la moyenne des périodes précédentes.
+
+    Signale les baisses significatives (test unilatéral) du NPS et de chaque
+    note de satisfaction, uniquement à partir des agrégats.
+    """
+    if aggregates is None or len(aggregates) < 2:
+        return []
+
+    current = aggregates.iloc[-1]
+    reference = aggregates.iloc[-1 - baseline_periods:-1].sum()
+    period = str(aggregates.index[-1])
+    alerts = []
+
+    # NPS : chaque réponse vaut +1 (promoteur), 0 ou -1 (détracteur)
+    if current['n'] >= min_responses and reference['n'] >= min_responses:
+        stats = []
+        for row in (current, reference):
+            p, d = row['promoteurs'] / row['n'], row['detracteurs'] / row['n']
+            stats.append((p - d, p + d - (p - d) ** 2, row['n']))
+        z = _z_score(*stats[0], *stats[1])
+        if z <= -z_threshold:
+            alerts.append({
+                'periode': period,
+                'indicateur': 'NPS',
+                'valeur': round(stats[0][0] * 100, 1),
+                'reference': round(stats[1][0] * 100, 1),
+                'z': round(z, 2)
+            })
+
+    # Notes de satisfaction (sur 5)
+    for col in [c[:-3] for c in aggregates.columns if c.endswith('__n')]:
+        n_cur, n_ref = current[f'{col}__n'], reference[f'{col}__n']
+        if n_cur < min_responses or n_ref < min_responses:
+            continue
+        stats = []
+        for row, n in ((current, n_cur), (reference, n_ref)):
+            mean = row[f'{col}__somme'] / n
+            stats.append((mean, max(row[f'{col}__carres'] / n - mean ** 2, 0), n))
+        z = _z_score(*stats[0], *stats[1])
+        if z <= -z_threshold:
+            alerts.append({
+                'periode': period,
+                'indicateur': get_service_name(col),
+                'valeur': round(stats[0][0], 2),
+                'reference': round(stats[1][0], 2),
+                'z': round(z, 2)
+            })
+    return alerts
+
+class AnomalyMonitor:
+    """Surveille le NPS et la satisfaction à chaque nouvelle version des données.
+
+    Les évaluations tournent dans un thread d'arrière-plan. Les agrégats par
+    période sont conservés par source et mis à jour avec les seules nouvelles
+    réponses lorsque les données n'ont fait que s'allonger.
+    """
+
+    def __init__(self, log_path, baseline_periods=6, min_responses=20, z_threshold=2.33, store=None):
+        self.log_path = Path(log_path)
+        self.store = store
+        self.baseline_periods = baseline_periods
+        self.min_responses = min_responses
+        self.z_threshold = z_threshold
+        self._lock = threading.Lock()
+        self._state = {}
+        self._logged = self._load_logged_keys()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="nps-anomaly-monitor", daemon=True)
+        self._thread.start()
+
+    def submit(self, source, version, df):
+        """Planifie l'évaluation d'une nouvelle version (sans bloquer l'appelant)."""
+        with self._lock:
+            if self._state.get(source, {}).get('version') == version:
+                return
+        self._queue.put((source, version, df))
+
+    def alerts(self, source):
+        """Alertes de la dernière évaluation d'une source."""
+        with self._lock:
+            return list(self._state.get(source, {}).get('alerts', []))
+
+    def _run(self):
+        while True:
+            source, version, df = self._queue.get()
+            try:
+                self.evaluate(source, version, df)
+            except Exception as e:
+                print(f"DEBUG - Erreur dans la surveillance des anomalies ({source}):", str(e))
+            finally:
+                self._queue.task_done()
+
+    def evaluate(self, source, version, df):
+        """Met à jour les agrégats d'une source puis recherche les baisses significatives."""
+        with self._lock:
+            state = dict(self._state.get(source, {}))
+        if state.get('version') == version or df.empty:
+            return
+
+        # Empreintes de lignes calculées à la publication de la version (voir dataset_version)
+        if self.store is not None:
+            hashes = self.store.derived(version, ROW_HASHES, lambda: row_hashes(df))
+        else:
+            hashes = row_hashes(df)
+
+        # Ajout seul (mêmes réponses jusqu'à la dernière date connue) : agrégation de la fin uniquement.
+        # L'empreinte des réponses déjà agrégées, additive, écarte les versions qui en corrigent
+        # d'anciennes : une somme partielle des empreintes, sans nouveau hachage.
+        last_date = state.get('last_date')
+        appended = (
+            last_date is not None
+            and int(df.index.searchsorted(last_date, side='right')) == state.get('rows')
+            and int(hashes[:state['rows']].sum(dtype='uint64')) == state.get('fingerprint')
+        )
+        new_rows = df.iloc[state['rows']:] if appended else df
+        fingerprint = (
+            (state['fingerprint'] + int(hashes[state['rows']:].sum(dtype='uint64'))) % 2 ** 64
+            if appended else int(hashes.sum(dtype='uint64'))
+        )
+        aggregates = {
+            label: merge_aggregates(state.get('aggregates', {}).get(label) if appended else None,
+                                    aggregate_periods(new_rows, freq))
+            for label, freq in FREQUENCIES.items()
+        }
+
+        alerts = []
+        for label, table in aggregates.items():
+            for alert in detect_drops(table, self.baseline_periods, self.min_responses, self.z_threshold):
+                alerts.append({'source': source, 'granularite': label, **alert})
+
+        with self._lock:
+            self._state[source] = {
+                'version': version,
+                'rows': len(df),
+                'last_date': df.index[-1],
+                'fingerprint': fingerprint,
+                'aggregates': aggregates,
+                'alerts': alerts
+            }
+        self._log(alerts)
+
+    def _alert_key(self, alert):
+        return (alert['source'], alert['granularite'], alert['periode'], alert['indicateur'])
+
+    def _load_logged_keys(self):
+        """Clés des alertes déjà journalisées, pour ne pas les répéter."""
+        if not self.log_path.is_file():
+            return set()
+        keys = set()
+        with open(self.log_path, encoding='utf-8') as handle:
+            for line in handle:
+                try:
+                    keys.add(self._alert_key(json.loads(line)))
+                except (ValueError, KeyError):
+                    continue
+        return keys
+
+    def _log(self, alerts):
+        """Ajoute les nouvelles alertes au journal local (une ligne JSON par alerte)."""
+        new_alerts = [alert for alert in alerts if self._alert_key(alert) not in self._logged]
+        if not new_alerts:
+            return
+        with open(self.log_path, 'a', encoding='utf-8') as handle:
+            for alert in new_alerts:
+                handle.write(json.dumps({'detectee_le': datetime.now().isoformat(timespec='seconds'), **alert},
+                                        ensure_ascii=False) + "\n")
+                self._logged.add(self._alert_key(alert))
+
+@st.cache_resource
+def get_anomaly_monitor():
+    """Retourne le moniteur partagé, abonné aux nouvelles versions du store de données."""
+    monitor = AnomalyMonitor(
+        DEFAULT_SETTINGS['fichier_alertes'],
+        baseline_periods=DEFAULT_SETTINGS['periodes_reference_alertes'],
+        min_responses=DEFAULT_SETTINGS['reponses_min_alertes'],
+        z_threshold=DEFAULT_SETTINGS['seuil_z_alertes'],
+        store=get_dataset_store()
+    )
+    monitor.store.add_listener(monitor.submit)
+    return monitor
@@ -1,16 +1,199 @@
 import streamlit as st
+import base64
 import hashlib
+import hmac
+import json
+import secrets
+import threading
 from config import AUTH_CONFIG
 import time
 
+class LoginRateLimiter:
+    """Limite les tentatives de connexion pour tout le processus.
+
+    Les échecs sont comptés par clé (utilisateur, adresse IP). Au-delà des
+    tentatives gratuites, chaque échec double le délai de blocage, sans
+    jamais mettre en pause le thread de la session : une tentative bloquée
+    est rejetée immédiatement (pour un utilisateur bloqué, seules les
+    tentatives dont le mot de passe est faux).
+    """
+    
+    def __init__(self, free_attempts=3, base_delay=2, max_delay=300):
+        self.free_attempts = free_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._failures = {}
+    
+    def retry_after(self, keys, now=None):
+        """Retourne le nombre de secondes avant la prochaine tentative autorisée."""
+        now = time.time() if now is None else now
+        with self._lock:
+            blocked_until = max(
+                (self._failures[key][1] for key in keys if key in self._failures),
+                default=0
+            )
+        return max(0, blocked_until - now)
+    
+    def record_failure(self, keys, now=None):
+        """Enregistre un échec et prolonge le blocage des clés concernées."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._prune(now)
+            for key in keys:
+                count, _ = self._failures.get(key, (0, 0))
+                count += 1
+                excess = count - self.free_attempts
+                delay = min(self.base_delay * 2 ** (excess - 1), self.max_delay) if excess > 0 else 0
+                self._failures[key] = (count, now + delay)
+    
+    def record_success(self, keys):
+        """Réinitialise le compteur d'échecs après une connexion réussie."""
+        with self._lock:
+            for key in keys:
+                self._failures.pop(key, None)
+    
+    def _prune(self, now):
+        """Oublie les clés dont le dernier blocage est expiré depuis longtemps."""
+        expired = [key for key, (_, until) in self._failures.items() if now - until > self.max_delay]
+        for key in expired:
+            del self._failures[key]
+
+@st.cache_resource
+def get_login_rate_limiter():
+    """Retourne le limiteur de tentatives partagé par toutes les sessions."""
+    return LoginRateLimiter(**AUTH_CONFIG.get("rate_limit", {}))
+
+def client_ip_from_headers(headers, trusted_hops):
+    """Adresse du client ajoutée par les proxys de confiance, ou None.
+
+    Chaque proxy ajoute à droite de X-Forwarded-For l'adresse qui l'a contacté :
+    seules les trusted_hops dernières valeurs sont fiables, les précédentes
+    viennent du client. Sans proxy de confiance, aucun en-tête n'est utilisé.
+    """
+    if trusted_hops <= 0:
+        return None
+    forwarded = [part.strip() for part in (headers.get("X-Forwarded-For") or "").split(",") if part.strip()]
+    if forwarded:
+        return forwarded[-trusted_hops] if len(forwarded) >= trusted_hops else None
+    # Proxy unique qui remplace l'en-tête au lieu de compléter X-Forwarded-For
+    return headers.get("X-Real-Ip") if trusted_hops == 1 else None
+
+def get_client_ip():
+    """Récupère l'adresse IP du client depuis les en-têtes de la connexion, si disponible."""
+    try:
+        from streamlit.web.server.websocket_headers import _get_websocket_headers
+        headers = _get_websocket_headers() or {}
+    except Exception:
+        return None
+    return client_ip_from_headers(headers, AUTH_CONFIG.get("trusted_proxy_hops", 0))
+
+SESSION_QUERY_PARAM = "session"
+
+class TokenRevocations:
+    """Jetons de session révoqués à la déconnexion, conservés jusqu'à leur expiration.
+
+    Partagés par toutes les sessions du processus : un jeton copié depuis l'URL
+    n'est plus accepté après la déconnexion de son titulaire.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revoked = {}
+    
+    def revoke(self, token_id, expires_at, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._revoked = {key: until for key, until in self._revoked.items() if until > now}
+            self._revoked[token_id] = expires_at
+    
+    def is_revoked(self, token_id):
+        with self._lock:
+            return token_id in self._revoked
+
+@st.cache_resource
+def get_token_revocations():
+    """Retourne la liste des jetons révoqués partagée par toutes les sessions."""
+    return TokenRevocations()
+
+@st.cache_resource
+def get_session_secret():
+    """Retourne le secret de signature des jetons (aléatoire si non configuré)."""
+    secret = AUTH_CONFIG.get("session_secret") or secrets.token_hex(32)
+    return secret.encode()
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def create_session_token(username, role, secret, ttl, now=None):
+    """Crée un jeton de session signé et daté, avec un identifiant unique : payload.signature."""
+    expires_at = int((time.time() if now is None else now) + ttl)
+    payload = _b64encode(json.dumps([username, role, expires_at, secrets.token_urlsafe(12)]).encode())
+    signature = _b64encode(hmac.new(secret, payload.encode(), hashlib.sha256).digest())
+    return f"{payload}.{signature}"
+
+def _token_claims(token, secret):
+    """Contenu signé d'un jeton : (utilisateur, rôle, expiration, identifiant), ou None si invalide."""
+    try:
+        payload, signature = token.split(".", 1)
+        expected = _b64encode(hmac.new(secret, payload.encode(), hashlib.sha256).digest())
+        if not hmac.compare_digest(signature, expected):
+            return None
+        username, role, expires_at, token_id = json.loads(_b64decode(payload))
+    except (ValueError, TypeError, AttributeError):
+        return None
+    return username, role, expires_at, token_id
+
+def verify_session_token(token, secret, now=None, revocations=None):
+    """Vérifie un jeton de session et retourne (utilisateur, rôle), ou None s'il est invalide,
+    expiré ou révoqué."""
+    claims = _token_claims(token, secret)
+    if claims is None:
+        return None
+    username, role, expires_at, token_id = claims
+    if (time.time() if now is None else now) >= expires_at:
+        return None
+    if revocations is not None and revocations.is_revoked(token_id):
+        return None
+    return username, role
+
 class Authenticator:
     """Gère l'authentification des utilisateurs."""
     
     def __init__(self):
         """Initialise l'authentificateur avec la configuration depuis config.py"""
         self.credentials = AUTH_CONFIG
-        if 'last_attempt_time' not in st.session_state:
-            st.session_state.last_attempt_time = 0
+        self.rate_limiter = get_login_rate_limiter()
+    
+    def restore_session(self) -> bool:
+        """Restaure l'authentification depuis le jeton de session de l'URL, s'il est valide."""
+        if st.session_state.get('authenticated'):
+            return True
+        
+        token = st.query_params.get(SESSION_QUERY_PARAM)
+        if not token:
+            return False
+        
+        identity = verify_session_token(token, get_session_secret(), revocations=get_token_revocations())
+        # Le compte doit toujours exister avec le même rôle
+        if identity is None or self.credentials["users"].get(identity[0], {}).get("role") != identity[1]:
+            del st.query_params[SESSION_QUERY_PARAM]
+            return False
+        
+        st.session_state.authenticated = True
+        st.session_state.user, st.session_state.user_role = identity
+        return True
+    
+    def _throttle_keys(self, username):
+        """Clés de limitation pour une tentative : utilisateur et adresse IP."""
+        keys = [f"user:{username.strip().lower()}"]
+        client_ip = get_client_ip()
+        if client_ip:
+            keys.append(f"ip:{client_ip}")
+        return keys
     
     def _hash_password(self, password: str) -> str:
         """Hash le mot de passe avec SHA-256."""
@@ -32,7 +215,7 @@ class Authenticator:
                 footer {visibility: hidden;}
                 .block-container {padding-top: 1rem;}
                 
-                /* Style pour l'animation de succès */
+                /* Style pour l'animation des messages */
                 @keyframes slideIn {
                     from {
                         transform: translateY(-10px);
@@ -43,13 +226,6 @@ class Authenticator:
                         opacity: 1;
                     }
                 }
-                .success-message {
-                    animation: slideIn 0.5s ease-out;
-                    padding: 1rem;
-                    background-color: rgba(36, 161, 88, 0.1);
-                    border-left: 4px solid #24A158;
-                    margin: 1rem 0;
-                }
                 .error-message {
                     animation: slideIn 0.5s ease-out;
                     padding: 1rem;
@@ -65,60 +241,57 @@ class Authenticator:
         with col2:
             st.markdown("### Connexion au Dashboard NPS")
             
-            # Vérifier le délai entre les tentatives
-            current_time = time.time()
-            time_since_last_attempt = current_time - st.session_state.last_attempt_time
-            
-            # Si moins de 3 secondes depuis la dernière tentative
-            if time_since_last_attempt < 3:
-                st.warning(f"Veuillez patienter {3 - int(time_since_last_attempt)} secondes avant de réessayer...")
-                time.sleep(min(3 - time_since_last_attempt, 3))
-            
             username = st.text_input("Email")
             password = st.text_input("Mot de passe", type="password")
             
-            login_placeholder = st.empty()
-            
             if st.button("Se connecter"):
-                st.session_state.last_attempt_time = current_time
+                keys = self._throttle_keys(username)
+                
+                # Rejet immédiat si l'adresse IP est temporairement bloquée
+                retry_after = self.rate_limiter.retry_after(keys[1:])
+                if retry_after > 0:
+                    st.warning(f"Trop de tentatives. Veuillez patienter {int(retry_after) + 1} secondes avant de réessayer...")
+                    return False
+                
+                user = self.credentials["users"].get(username)
+                if user is not None and self._hash_password(password) == user["password"]:
+                    # Le blocage de l'utilisateur ne s'applique qu'aux échecs : un tiers qui
+                    # connaît l'email ne peut pas empêcher le titulaire de se connecter.
+                    # Seul le compteur de l'utilisateur est remis à zéro : un compte
+                    # valide ne doit pas lever le blocage d'une adresse IP
+                    self.rate_limiter.record_success(keys[:1])
+                    st.session_state.authenticated = True
+                    st.session_state.user = username
+                    st.session_state.user_role = user["role"]
+                    st.query_params[SESSION_QUERY_PARAM] = create_session_token(
+                        username,
+                        st.session_state.user_role,
+                        get_session_secret(),
+                        self.credentials.get("session_ttl", 12 * 3600)
+                    )
+                    st.rerun()
+                
+                # Échec : pendant un blocage, la réponse ne dit pas si le mot de passe était faux
+                retry_after = self.rate_limiter.retry_after(keys)
+                self.rate_limiter.record_failure(keys)
+                if retry_after > 0:
+                    st.warning(f"Trop de tentatives. Veuillez patienter {int(retry_after) + 1} secondes avant de réessayer...")
+                    return False
                 
-                with st.spinner("Vérification des identifiants..."):
-                    time.sleep(1)  # Délai artificiel pour l'UX
-                    
-                    if username in self.credentials["users"]:
-                        stored_password = self.credentials["users"][username]["password"]
-                        if self._hash_password(password) == stored_password:
-                            # Animation de succès
-                            success_placeholder = st.empty()
-                            for i in range(3):
-                                success_placeholder.markdown(f"""
-                                    <div class="success-message">
-                                        <h3>Connexion réussie! {'.' * (i + 1)}</h3>
-                                    </div>
-                                """, unsafe_allow_html=True)
-                                time.sleep(0.5)
-                            
-                            st.session_state.authenticated = True
-                            st.session_state.user = username
-                            st.session_state.user_role = self.credentials["users"][username]["role"]
-                            time.sleep(0.5)  # Petit délai avant le rechargement
-                            st.rerun()
-                        else:
-                            time.sleep(1)  # Délai avant l'affichage de l'erreur
-                            st.markdown("""
-                                <div class="error-message">
-                                    <h3>❌ Mot de passe incorrect</h3>
-                                    <p>Veuillez vérifier vos identifiants et réessayer.</p>
-                                </div>
-                            """, unsafe_allow_html=True)
-                    else:
-                        time.sleep(1)  # Délai avant l'affichage de l'erreur
-                        st.markdown("""
-                            <div class="error-message">
-                                <h3>❌ Utilisateur inconnu</h3>
-                                <p>Cet email n'est pas enregistré dans notre système.</p>
-                            </div>
-                        """, unsafe_allow_html=True)
+                if user is not None:
+                    st.markdown("""
+                        <div class="error-message">
+                            <h3>❌ Mot de passe incorrect</h3>
+                            <p>Veuillez vérifier vos identifiants et réessayer.</p>
+                        </div>
+                    """, unsafe_allow_html=True)
+                else:
+                    st.markdown("""
+                        <div class="error-message">
+                            <h3>❌ Utilisateur inconnu</h3>
+                            <p>Cet email n'est pas enregistré dans notre système.</p>
+                        </div>
+                    """, unsafe_allow_html=True)
         
         return st.session_state.authenticated
 
@@ -128,7 +301,12 @@ class Authenticator:
                 st.session_state.get('user_role') == "admin")
     
     def logout(self):
-        """Déconnecte l'utilisateur."""
+        """Déconnecte l'utilisateur et révoque son jeton de session (une copie de l'URL ne suffit plus)."""
         st.session_state.authenticated = False
         st.session_state.user = None
-        st.session_state.user_role = None
\ No newline at end of file
+        st.session_state.user_role = None
+        if SESSION_QUERY_PARAM in st.query_params:
+            claims = _token_claims(st.query_params[SESSION_QUERY_PARAM], get_session_secret())
+            if claims is not None:
+                get_token_revocations().revoke(claims[3], claims[2])
+            del st.query_params[SESSION_QUERY_PARAM]
\ No newline at end of file
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from dataset_store import get_dataset_store
+
+class BitmapIndex:
+    """Index bitmap (tableaux NumPy compactés) sur les champs filtrés par les vues.
+
+    Chaque valeur d'un champ (note de recommandation) est associée au bitmap des
+    lignes qui la portent ; une combinaison de valeurs se résout ensuite par des
+    OU bit à bit. Les opérations se limitent aux octets couvrant la plage de
+    lignes demandée : une période courte ne parcourt pas tout l'historique.
+    """
+
+    def __init__(self, df):
+        self.size = len(df)
+        self._bitmaps = {}
+        for field, labels in self._field_labels(df).items():
+            codes, uniques = pd.factorize(labels, sort=True)
+            self._bitmaps[field] = {value: np.packbits(codes == i) for i, value in enumerate(uniques)}
+
+    @staticmethod
+    def _field_labels(df):
+        """Valeurs indexées pour chaque champ filtré présent dans le DataFrame."""
+        fields = {}
+        if 'Recommandation' in df.columns:
+            fields['Recommandation'] = df['Recommandation'].to_numpy()
+        return fields
+
+    @property
+    def fields(self):
+        return list(self._bitmaps.keys())
+
+    def values(self, field):
+        """Valeurs indexées d'un champ."""
+        return list(self._bitmaps.get(field, {}).keys())
+
+    def _window(self, start, stop):
+        """Octets des bitmaps couvrant les positions [start, stop)."""
+        stop = self.size if stop is None else stop
+        return slice(start // 8, (stop + 7) // 8)
+
+    def any_of(self, field, values, start=0, stop=None):
+        """Bitmap des lignes dont le champ prend l'une des valeurs (OU), limité aux octets de [start, stop)."""
+        window = self._window(start, stop)
+        bitmaps = self._bitmaps.get(field, {})
+        result = np.zeros(window.stop - window.start, dtype=np.uint8)
+        for value in values:
+            bitmap = bitmaps.get(value)
+            if bitmap is not None:
+                result |= bitmap[window]
+        return result
+
+    def positions(self, bitmap, start=0, stop=None):
+        """Positions des lignes de [start, stop) présentes dans un bitmap limité aux octets de cette plage."""
+        stop = self.size if stop is None else stop
+        first = start // 8 * 8
+        bits = np.unpackbits(bitmap, count=stop - first)
+        return np.flatnonzero(bits[start - first:]) + start
+
+def get_bitmap_index(version, df, store=None):
+    """Retourne l'index bitmap d'une version de données (construit une seule fois)."""
+    store = get_dataset_store() if store is None else store
+    return store.derived(version, 'bitmap_index', lambda: BitmapIndex(df))
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from config import METRIC_STRUCTURE
+from dataset_store import get_dataset_store
+from time_index import bounds_between, ensure_time_index
+
+# Périodes comparées : clé -> profondeur en jours depuis la dernière réponse (None = tout)
+PERIODS = {'all': None, 'last_month': 30, 'last_quarter': 90, 'last_year': 365}
+
+# Libellés du sélecteur de période des métriques -> clé de période
+PERIOD_LABELS = {
+    "Dernier mois": 'last_month',
+    "Dernier trimestre": 'last_quarter',
+    "Dernière année": 'last_year',
+    "Tout": 'all',
+}
+
+COLUMNS = ['Période', 'Catégorie', 'Libellé', 'Couleur', 'Métrique', 'Service',
+           'Score', 'Notes', 'Score catégorie', 'Réponses']
+
+def category_weights(columns):
+    """Matrice d'appartenance métrique x catégorie, d'après METRIC_STRUCTURE.
+
+    Retourne (métriques présentes, catégories, matrice 0/1 de forme (métriques, catégories)).
+    """
+    categories = list(METRIC_STRUCTURE)
+    metrics = [
+        metric
+        for details in METRIC_STRUCTURE.values()
+        for metric in details['metrics']
+        if metric in columns
+    ]
+    weights = np.zeros((len(metrics), len(categories)))
+    for i, metric in enumerate(metrics):
+        for j, details in enumerate(METRIC_STRUCTURE.values()):
+            if metric in details['metrics']:
+                weights[i, j] = 1.0
+    return metrics, categories, weights
+
+def period_bounds(df, periods=PERIODS):
+    """Positions [left, right) des réponses de chaque période, par recherche dichotomique.
+
+    Les périodes remontent depuis la dernière réponse : ce sont des suffixes du
+    DataFrame trié par date.
+    """
+    df = ensure_time_index(df)
+    current_date = df.index[-1] if len(df) else None
+    bounds = []
+    for days in periods.values():
+        start = None if days is None or current_date is None else current_date - timedelta(days=days)
+        bounds.append(bounds_between(df, start))
+    return bounds
+
+def category_score_table(df, periods=PERIODS):
+    """Scores par métrique et par catégorie pour toutes les périodes.
+
+    Les sommes et effectifs de notes par (période, métrique) sont calculés sur
+    la tranche de lignes de chaque période ; le score d'une catégorie est la
+    moyenne des moyennes de ses métriques renseignées, obtenue par produit avec
+    la matrice d'appartenance. Retourne une table longue : une ligne par
+    (période, métrique).
+    """
+    df = ensure_time_index(df)
+    metrics, categories, weights = category_weights(df.columns)
+    if not metrics or df.empty:
+        return pd.DataFrame(columns=COLUMNS)
+
+    # Notes en lignes (métriques, réponses) : chaque colonne est copiée d'un bloc
+    values = np.vstack([
+        df[metric].to_numpy(dtype=float, na_value=np.nan)
+        for metric in metrics
+    ])
+    observed = ~np.isnan(values)
+    filled = np.where(observed, values, 0.0)
+    bounds = period_bounds(df, periods)
+
+    sums = np.array([filled[:, left:right].sum(axis=1) for left, right in bounds])
+    counts = np.array([observed[:, left:right].sum(axis=1) for left, right in bounds], dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+        defined = ~np.isnan(means)
+        category_means = (np.where(defined, means, 0.0) @ weights) / (defined @ weights)
+
+    n_periods, n_metrics = means.shape
+    category_of = weights.argmax(axis=1)
+    labels = [METRIC_STRUCTURE[category]['label'] for category in categories]
+    colors = [METRIC_STRUCTURE[category]['color'] for category in categories]
+    services = [METRIC_STRUCTURE[categories[j]]['metrics'][metric] for metric, j in zip(metrics, category_of)]
+
+    table = pd.DataFrame({
+        'Période': np.repeat(list(periods), n_metrics),
+        'Catégorie': np.tile(np.array(categories, dtype=object)[category_of], n_periods),
+        'Libellé': np.tile(np.array(labels, dtype=object)[category_of], n_periods),
+        'Couleur': np.tile(np.array(colors, dtype=object)[category_of], n_periods),
+        'Métrique': np.tile(np.array(metrics, dtype=object), n_periods),
+        'Service': np.tile(np.array(services, dtype=object), n_periods),
+        'Score': means.ravel(),
+        'Notes': counts.ravel().astype(int),
+        'Score catégorie': category_means[:, category_of].ravel(),
+        'Réponses': np.repeat([right - left for left, right in bounds], n_metrics),
+    })
+    # Une catégorie sans aucune moyenne renseignée n'a pas de score
+    return table[table['Score catégorie'].notna()].reset_index(drop=True)
+
+def cached_category_scores(version, df, store=None):
+    """Version mise en cache de category_score_table, par version de données."""
+    store = get_dataset_store() if store is None else store
+    return store.derived(version, 'category_scores', lambda: category_score_table(df))
@@ -1,17 +1,55 @@
 """Configuration de l'application."""
 import os
-from dotenv import load_dotenv
+from pathlib import Path
 
-__all__ = ['DEFAULT_SETTINGS', 'AUTH_CONFIG', 'METRIC_STRUCTURE', 'COLUMN_MAPPING', 'SCORE_COLORS', 'SHEET_ID', 'SHEET_NAME']
+__all__ = ['DEFAULT_SETTINGS', 'AUTH_CONFIG', 'METRIC_STRUCTURE', 'COLUMN_MAPPING', 'SCORE_COLORS', 'SHEET_ID', 'SHEET_NAME', 'STARTUP_MODE']
 
-# Chargement des variables d'environnement
-load_dotenv()
+# Chargement des variables d'environnement (python-dotenv n'est importé que si un .env existe,
+# à côté de l'application ou dans le répertoire courant)
+_ENV_FILE = next((path for path in (Path(__file__).with_name('.env'), Path.cwd() / '.env') if path.is_file()), None)
+if _ENV_FILE is not None:
+    from dotenv import load_dotenv
+    load_dotenv(_ENV_FILE)
+
+# Mode de démarrage : "lazy" diffère les imports lourds jusqu'après la connexion,
+# "eager" les charge dès le démarrage du processus
+STARTUP_MODE = os.getenv('STARTUP_MODE', 'lazy')
 
 # Configuration par défaut
 DEFAULT_SETTINGS = {
     'seuil_representativite': 35,
+    'source_donnees': os.getenv('DATA_SOURCE', 'Données réelles'),  # source initiale des sessions
+    'duree_cache_donnees': 300,  # secondes avant rechargement des données partagées
+    'ratio_rafraichissement': 0.8,  # rechargement en arrière-plan à 80 % de la durée de cache
+    'inactivite_source': 1800,  # secondes sans session sur une source avant l'arrêt de son rechargement
+    'cache_partage': os.getenv('SHARED_CACHE_DIR', ''),  # répertoire d'instantanés commun aux répliques ('' : désactivé)
+    'base_reponses': os.getenv('RESPONSE_DB', ''),  # fichier SQLite reflétant les réponses du sheet ('' : désactivé)
+    'historique_disque': os.getenv('HISTORY_PATH', ''),  # historique Parquet ou SQLite lu par blocs, hors mémoire ('' : désactivé)
+    'lignes_par_bloc': 100_000,  # réponses lues par bloc en mode hors mémoire
+    'points_max_graphique': 500,  # points envoyés au navigateur par courbe de tendance
+    'reponses_par_page': 50,  # cartes de réponse affichées par page
+    'rendu_cartes': 'html',  # 'html' : une page de cartes en un seul bloc, 'widgets' : composants Streamlit
+    # Détection des baisses de NPS / satisfaction
+    'fichier_alertes': 'alertes_nps.jsonl',
+    'periodes_reference_alertes': 6,  # périodes précédentes formant la référence
+    'reponses_min_alertes': 20,  # réponses minimum par période pour évaluer
+    'seuil_z_alertes': 2.33,  # baisse significative au seuil unilatéral de 1 %
 }
 
+# Valeurs d'exemple qui ne doivent jamais signer de jetons
+_PLACEHOLDER_SECRETS = {'change_me_long_random_string', 'change_me', 'changeme', 'secret', 'your_secret_here'}
+_MIN_SECRET_LENGTH = 32
+
+def _session_secret():
+    """SESSION_SECRET, refusé s'il s'agit d'une valeur d'exemple ou s'il est trop court (None si vide)."""
+    secret = os.getenv('SESSION_SECRET') or None
+    if secret is not None and (secret.strip().lower() in _PLACEHOLDER_SECRETS or len(secret) < _MIN_SECRET_LENGTH):
+        raise ValueError(
+            f"SESSION_SECRET doit être une valeur aléatoire d'au moins {_MIN_SECRET_LENGTH} caractères "
+            "(python -c \"import secrets; print(secrets.token_hex(32))\"), ou vide pour un secret aléatoire"
+        )
+    return secret
+
 # Configuration de l'authentification
 AUTH_CONFIG = {
     "users": {
@@ -23,6 +61,22 @@ AUTH_CONFIG = {
             "password": os.getenv('USER_PASSWORD_HASH', '240be518fabd2724ddb6f04eeb1da5967448d7e831c08c8fa822809f74c720a9'),
             "role": "user"
         }
+    },
+    # Jetons de session signés (HMAC) pour éviter une reconnexion à chaque rechargement.
+    # Le jeton figure dans l'URL (paramètre "session") : quiconque copie l'URL est connecté
+    # jusqu'à la déconnexion, qui le révoque, ou jusqu'à son expiration (SESSION_TTL).
+    # Sans SESSION_SECRET, un secret aléatoire est généré au démarrage du processus.
+    "session_secret": _session_secret(),
+    "session_ttl": int(os.getenv('SESSION_TTL', 12 * 3600)),
+    # Nombre de proxys de confiance devant l'application : l'adresse du client est
+    # celle ajoutée à X-Forwarded-For par le plus éloigné d'entre eux. À 0, les
+    # en-têtes (modifiables par le client) sont ignorés et seul l'utilisateur est limité.
+    "trusted_proxy_hops": int(os.getenv('TRUSTED_PROXY_HOPS', 0)),
+    # Limitation des tentatives de connexion (délai exponentiel en secondes)
+    "rate_limit": {
+        "free_attempts": 3,
+        "base_delay": 2,
+        "max_delay": 300
     }
 }
 
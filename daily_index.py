@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+from dataset_store import get_dataset_store
+from time_index import ensure_time_index
+
+# Colonnes de notes indexées en plus des colonnes Satisfaction_*
+SCORE_COLUMNS = ('Recommandation', 'ProbabiliteReabo')
+
+# Niveaux de notes entières suivis (0 à 10)
+LEVELS = 11
+
+NS_PER_DAY = 86400 * 10**9
+
+def _day_numbers(index):
+    """Numéro de jour (depuis l'époque) de chaque horodatage."""
+    return index.asi8 // NS_PER_DAY
+
+def score_columns(columns):
+    """Colonnes de notes suivies par l'index, dans l'ordre des colonnes."""
+    return [col for col in columns if col in SCORE_COLUMNS or col.startswith('Satisfaction_')]
+
+def daily_totals(df, columns, offsets, n_days):
+    """Totaux non cumulés de chaque jour : effectifs, sommes et répartition des notes.
+
+    offsets donne le numéro de jour (dans [0, n_days)) de chaque ligne de df.
+    Les totaux de deux blocs de réponses s'additionnent.
+    """
+    n_columns = len(columns)
+    counts = np.zeros((n_days, n_columns))
+    sums = np.zeros((n_days, n_columns))
+    levels = np.zeros((n_days, n_columns, LEVELS))
+    for i, col in enumerate(columns):
+        values = df[col].to_numpy(dtype=float, na_value=np.nan)
+        valid = ~np.isnan(values)
+        counts[:, i] = np.bincount(offsets[valid], minlength=n_days)
+        sums[:, i] = np.bincount(offsets[valid], weights=values[valid], minlength=n_days)
+        # Répartition des notes entières : un seul bincount sur (jour, note)
+        whole = valid & (values >= 0) & (values < LEVELS) & (values == np.round(values))
+        cells = offsets[whole] * LEVELS + values[whole].astype(int)
+        levels[:, i] = np.bincount(cells, minlength=n_days * LEVELS).reshape(n_days, LEVELS)
+    return counts, sums, levels
+
+class DailyIndex:
+    """Cumuls journaliers des notes d'une version de données.
+
+    Pour chaque colonne de note, la ligne j des cumuls porte les totaux des jours
+    [origine, origine + j) : effectifs, sommes et répartition des notes entières
+    de 0 à 10. Les totaux d'une période [start, end) sont la différence de deux
+    lignes, en temps constant quelle que soit la longueur de l'historique. Les
+    bornes sont prises à la journée.
+    """
+    __slots__ = ('origin', 'n_days', 'columns', 'positions', 'counts', 'sums', 'levels')
+
+    def __init__(self, df):
+        df = ensure_time_index(df)
+        columns = score_columns(df.columns)
+        days = _day_numbers(df.index)
+        origin = int(days[0]) if len(days) else 0
+        n_days = int(days[-1]) - origin + 1 if len(days) else 0
+        self._accumulate(origin, columns, *daily_totals(df, columns, days - origin, n_days))
+
+    @classmethod
+    def from_daily(cls, origin, columns, counts, sums, levels):
+        """Index construit à partir de totaux journaliers déjà agrégés (voir daily_totals)."""
+        index = cls.__new__(cls)
+        index._accumulate(origin, list(columns), counts, sums, levels)
+        return index
+
+    def _accumulate(self, origin, columns, counts, sums, levels):
+        self.origin = origin
+        self.n_days = len(counts)
+        self.columns = columns
+        self.positions = {col: i for i, col in enumerate(columns)}
+        # Ligne 0 à zéro : les cumuls de la ligne j portent les j premiers jours
+        self.counts = np.cumsum(np.concatenate([np.zeros((1,) + counts.shape[1:]), counts]), axis=0)
+        self.sums = np.cumsum(np.concatenate([np.zeros((1,) + sums.shape[1:]), sums]), axis=0)
+        self.levels = np.cumsum(np.concatenate([np.zeros((1,) + levels.shape[1:]), levels]), axis=0)
+
+    def first_day(self):
+        return pd.Timestamp(self.origin * NS_PER_DAY)
+
+    def last_day(self):
+        return pd.Timestamp((self.origin + max(self.n_days - 1, 0)) * NS_PER_DAY)
+
+    def position(self, date, default):
+        """Ligne des cumuls correspondant au début du jour date (default si date est None)."""
+        if date is None:
+            return default
+        day = pd.Timestamp(date).value // NS_PER_DAY - self.origin
+        return int(min(max(day, 0), self.n_days))
+
+    def totals(self, start=None, end=None):
+        """(effectifs, sommes, répartition des notes) par colonne sur [start, end)."""
+        left = self.position(start, 0)
+        right = max(left, self.position(end, self.n_days))
+        return (
+            self.counts[right] - self.counts[left],
+            self.sums[right] - self.sums[left],
+            self.levels[right] - self.levels[left]
+        )
+
+    def mean(self, column, start=None, end=None):
+        """Moyenne d'une colonne sur [start, end) (NaN sans réponse)."""
+        counts, sums, _ = self.totals(start, end)
+        i = self.positions[column]
+        return sums[i] / counts[i] if counts[i] else np.nan
+
+    def share(self, column, low, high, start=None, end=None):
+        """Part (en %) des notes entières de [low, high] parmi les notes entières de la colonne."""
+        _, _, levels = self.totals(start, end)
+        distribution = levels[self.positions[column]]
+        total = distribution.sum()
+        return distribution[low:high + 1].sum() / total * 100 if total else np.nan
+
+    def nps(self, start=None, end=None):
+        """(NPS, nombre de notes) sur [start, end), d'après la répartition des recommandations."""
+        if 'Recommandation' not in self.positions:
+            return np.nan, 0
+        _, _, levels = self.totals(start, end)
+        distribution = levels[self.positions['Recommandation']]
+        total = distribution.sum()
+        if not total:
+            return np.nan, 0
+        return (distribution[9:].sum() - distribution[:7].sum()) / total * 100, int(total)
+
+    def compare(self, current, reference, labels=None):
+        """Compare deux périodes (start, end) : NPS puis moyenne de chaque colonne.
+
+        Retourne un DataFrame (Indicateur, Période, Référence, Écart, Réponses,
+        Réponses référence) ; labels donne le libellé affiché d'une colonne.
+        """
+        labels = labels or {}
+        counts, sums, _ = self.totals(*current)
+        ref_counts, ref_sums, _ = self.totals(*reference)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / counts
+            ref_means = ref_sums / ref_counts
+
+        nps, nps_count = self.nps(*current)
+        ref_nps, ref_nps_count = self.nps(*reference)
+        rows = [("NPS", nps, ref_nps, nps_count, ref_nps_count)]
+        rows += [
+            (labels.get(col, col), means[i], ref_means[i], int(counts[i]), int(ref_counts[i]))
+            for i, col in enumerate(self.columns)
+        ]
+        table = pd.DataFrame(rows, columns=['Indicateur', 'Période', 'Référence', 'Réponses', 'Réponses référence'])
+        table.insert(3, 'Écart', table['Période'] - table['Référence'])
+        return table
+
+def month_over_month(last):
+    """Bornes (mois en cours, mois précédent) pour la date la plus récente last."""
+    current_month = pd.Timestamp(last).normalize().replace(day=1)
+    next_day = pd.Timestamp(last).normalize() + pd.Timedelta(days=1)
+    previous_month = current_month - pd.DateOffset(months=1)
+    return (current_month, next_day), (previous_month, current_month)
+
+def same_period_last_year(start, end):
+    """Même période [start, end) un an plus tôt."""
+    return pd.Timestamp(start) - pd.DateOffset(years=1), pd.Timestamp(end) - pd.DateOffset(years=1)
+
+def previous_period(start, end):
+    """Période de même durée précédant immédiatement [start, end)."""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    return start - (end - start), start
+
+def get_daily_index(version, df, store=None):
+    """Retourne les cumuls journaliers d'une version de données."""
+    store = get_dataset_store() if store is None else store
+    return store.derived(version, 'daily_index', lambda: DailyIndex(df))
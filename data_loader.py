@@ -1,16 +1,15 @@
-import gspread
 import pandas as pd
 import numpy as np
-from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime, timedelta
 import streamlit as st
 import os
 from pathlib import Path
 from config import METRIC_STRUCTURE
-from data_preprocessing import preprocess_data
 
 def get_credentials():
     """Récupère les credentials en gérant à la fois le développement local et la production."""
+    # Import différé : inutile en mode données de test
+    from oauth2client.service_account import ServiceAccountCredentials
     try:
         # Vérifier d'abord les secrets Streamlit (production)
         if hasattr(st.secrets, "GOOGLE_APPLICATION_CREDENTIALS"):
@@ -38,12 +37,11 @@ def get_credentials():
         raise FileNotFoundError("Aucune credential trouvée (ni en local, ni dans Streamlit)")
         
     except Exception as e:
+        details = ""
         if hasattr(st.secrets, "GOOGLE_APPLICATION_CREDENTIALS"):
-            # Log plus détaillé en cas d'erreur avec les secrets Streamlit
-            available_keys = list(st.secrets.GOOGLE_APPLICATION_CREDENTIALS.keys())
-            st.error(f"Erreur credentials. Clés disponibles: {available_keys}")
-        st.error(f"Erreur lors de la récupération des credentials: {str(e)}")
-        return None
+            # Message plus détaillé en cas d'erreur avec les secrets Streamlit
+            details = f" (clés disponibles : {list(st.secrets.GOOGLE_APPLICATION_CREDENTIALS.keys())})"
+        raise RuntimeError(f"Erreur lors de la récupération des credentials: {str(e)}{details}") from e
 
 def get_sheet_config():
     """Récupère la configuration Google Sheets."""
@@ -60,11 +58,17 @@ def get_sheet_config():
             os.getenv("SHEET_NAME", "Réponses")
         )
     except Exception as e:
-        st.error(f"Erreur lors de la récupération de la configuration sheets: {str(e)}")
+        print("DEBUG - Erreur lors de la récupération de la configuration sheets:", str(e))
         return None, None
 
 def load_google_sheet_data():
-    """Charge les données depuis Google Sheets avec meilleure gestion des erreurs."""
+    """Charge les données depuis Google Sheets.
+
+    Appelée aussi depuis le thread de rafraîchissement : les erreurs sont levées
+    (et affichées par la session), sans appel à l'interface Streamlit.
+    """
+    # Import différé : inutile en mode données de test
+    import gspread
     try:
         # Récupération des credentials
         creds = get_credentials()
@@ -82,26 +86,14 @@ def load_google_sheet_data():
         data = sheet.get_all_values()
         
         if not data:
-            st.warning("Aucune donnée trouvée dans le Google Sheet")
+            print("DEBUG - Aucune donnée trouvée dans le Google Sheet")
             return pd.DataFrame()
             
-        # Conversion en DataFrame
-        df = pd.DataFrame(data[1:], columns=data[0])
-        
-        # Suppression de la colonne email pour la confidentialité
-        if 'Email' in df.columns:
-            df = df.drop('Email', axis=1)
-            
-        # Prétraitement des données
-        df = preprocess_data(df)
-        return df
+        # Conversion en DataFrame (brut : le prétraitement est fait par data_preprocessing)
+        return pd.DataFrame(data[1:], columns=data[0])
         
     except gspread.exceptions.APIError as e:
-        st.error(f"Erreur API Google Sheets: {str(e)}")
-        return pd.DataFrame()
-    except Exception as e:
-        st.error(f"Erreur lors du chargement des données: {str(e)}")
-        return pd.DataFrame()
+        raise RuntimeError(f"Erreur API Google Sheets: {str(e)}") from e
 
 def generate_test_data(n_months=12, responses_per_month=50):
     """Génère des données de test NPS synthétiques."""
@@ -150,8 +142,7 @@ def generate_test_data(n_months=12, responses_per_month=50):
         return test_data
         
     except Exception as e:
-        st.error(f"Erreur lors de la génération des données de test: {str(e)}")
-        return pd.DataFrame()
+        raise RuntimeError(f"Erreur lors de la génération des données de test: {str(e)}") from e
 
 if __name__ == "__main__":
     st.write("Test de la configuration :")
@@ -1,96 +1,182 @@
 # data_preprocessing.py
 
+import numpy as np
 import pandas as pd
+from time_index import index_by_date
+
+# Étapes du prétraitement, dans leur ordre d'exécution : [(nom, fonction DataFrame -> DataFrame)]
+PIPELINE = []
+
+def stage(name):
+    """Enregistre une fonction comme étape du prétraitement."""
+    def register(func):
+        PIPELINE.append((name, func))
+        return func
+    return register
+
+# Contrat de sortie : type de chaque colonne après prétraitement. Les vues
+# s'appuient dessus et ne reconvertissent plus les colonnes.
+SCORE_COLUMNS = ['Recommandation', 'ProbabiliteReabo']
+TEXT_COLUMNS = ['Club', 'Nom', 'Prenom', 'PourquoiNote', 'PourquoiReabo', 'Ameliorations', 'MotsCles']
+REQUIRED_COLUMNS = ['Date', 'Recommandation']
+PRIVATE_COLUMNS = ['Email']
+
+def is_satisfaction_column(col):
+    return col.startswith('Satisfaction_')
+
+def output_contract(columns):
+    """Type attendu de chaque colonne présente : {colonne: dtype}."""
+    contract = {'Date': 'datetime64[ns]', 'Catégorie': 'object'}
+    contract.update({col: 'float64' for col in columns if col in SCORE_COLUMNS or is_satisfaction_column(col)})
+    contract.update({col: 'object' for col in TEXT_COLUMNS if col in columns})
+    return contract
+
+def check_contract(df):
+    """Vérifie que le DataFrame prétraité respecte le contrat de sortie (ValueError sinon)."""
+    check_required_columns(df)
+    mismatches = [
+        f"{col} ({df[col].dtype}, attendu {dtype})"
+        for col, dtype in output_contract(df.columns).items()
+        if col in df.columns and str(df[col].dtype) != dtype
+    ]
+    if mismatches:
+        raise ValueError(f"Types de colonnes inattendus : {', '.join(mismatches)}")
+
+# Catégories NPS (seuils 9 et 7)
+def get_nps_category(score):
+    """Détermine la catégorie NPS basée sur le score."""
+    try:
+        score = float(score)
+        if score >= 9:
+            return "Promoteur"
+        elif score >= 7:
+            return "Passif"
+        elif score >= 0:
+            return "Détracteur"
+        return "Inconnu"
+    except (ValueError, TypeError):
+        return "Inconnu"
+
+def nps_category_labels(scores):
+    """Version vectorisée de get_nps_category pour une série de notes."""
+    scores = np.asarray(scores, dtype=float)
+    return np.select([scores >= 9, scores >= 7, scores >= 0], ["Promoteur", "Passif", "Détracteur"], default="Inconnu")
 
 # Renommer les colonnes en utilisant des mots-clés flexibles
-def rename_columns_flexibly(df):
-    rename_mapping = {
-        "Horodateur": "Date",
-        "Adresse e-mail": "Email",
-        "Recommandation": "Recommandation",
-        "Pourquoi cette note": "PourquoiNote",
-        "probabilité que vous soyez toujours abonné": "ProbabiliteReabo",
-        "Pourquoi cette réponse": "PourquoiReabo",
-        "salle de sport": "Satisfaction_Salle",
-        "piscine": "Satisfaction_Piscine",
-        "coaching en groupe": "Satisfaction_Coaching",
-        "disponibilité des cours": "Satisfaction_DispoCours",
-        "disponibilité des équipements": "Satisfaction_DispoEquipements",
-        "coachs": "Satisfaction_Coachs",
-        "maitres nageurs": "Satisfaction_MNS",
-        "personnel d'accueil": "Satisfaction_Accueil",
-        "conseiller sports": "Satisfaction_Conseiller",
-        "ambiance générale": "Satisfaction_Ambiance",
-        "propreté générale": "Satisfaction_Proprete",
-        "vestiaires": "Satisfaction_Vestiaires",
-        "offre de restauration": "Satisfaction_Restauration",
-        "offre festive": "Satisfaction_Festive",
-        "masterclass / evenements sportifs": "Satisfaction_Masterclass",
-        "Quelles améliorations proposeriez": "Ameliorations",
-        "Votre Nom": "Nom",
-        "Votre prénom": "Prenom",
-        "Score": "Score",
-        "MOTS CLES": "MotsCles"
-    }
+RENAME_KEYWORDS = {
+    "Horodateur": "Date",
+    "Adresse e-mail": "Email",
+    "Votre club": "Club",
+    "Recommandation": "Recommandation",
+    "Pourquoi cette note": "PourquoiNote",
+    "probabilité que vous soyez toujours abonné": "ProbabiliteReabo",
+    "Pourquoi cette réponse": "PourquoiReabo",
+    "salle de sport": "Satisfaction_Salle",
+    "piscine": "Satisfaction_Piscine",
+    "coaching en groupe": "Satisfaction_Coaching",
+    "disponibilité des cours": "Satisfaction_DispoCours",
+    "disponibilité des équipements": "Satisfaction_DispoEquipements",
+    "coachs": "Satisfaction_Coachs",
+    "maitres nageurs": "Satisfaction_MNS",
+    "personnel d'accueil": "Satisfaction_Accueil",
+    "conseiller sports": "Satisfaction_Conseiller",
+    "ambiance générale": "Satisfaction_Ambiance",
+    "propreté générale": "Satisfaction_Proprete",
+    "vestiaires": "Satisfaction_Vestiaires",
+    "offre de restauration": "Satisfaction_Restauration",
+    "offre festive": "Satisfaction_Festive",
+    "masterclass / evenements sportifs": "Satisfaction_Masterclass",
+    "Quelles améliorations proposeriez": "Ameliorations",
+    "Votre Nom": "Nom",
+    "Votre prénom": "Prenom",
+    "Score": "Score",
+    "MOTS CLES": "MotsCles"
+}
 
+@stage("renommage")
+def rename_columns_flexibly(df):
+    # Les colonnes déjà au format interne (données de test) sont conservées telles quelles
+    known = set(RENAME_KEYWORDS.values())
     new_column_names = {}
     for col in df.columns:
-        for keyword, new_name in rename_mapping.items():
+        if col in known:
+            continue
+        for keyword, new_name in RENAME_KEYWORDS.items():
             if keyword.lower() in col.lower():
                 new_column_names[col] = new_name
                 break
+    return df.rename(columns=new_column_names)
+
+@stage("colonnes obligatoires")
+def check_required_columns(df):
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Colonnes obligatoires absentes : {', '.join(missing)}")
+    return df
+
+@stage("confidentialité")
+def drop_private_columns(df):
+    # Suppression de l'email pour la confidentialité
+    return df.drop(columns=[col for col in PRIVATE_COLUMNS if col in df.columns])
 
-    df = df.rename(columns=new_column_names)
+@stage("dates")
+def parse_dates(df):
+    # Horodateur Google Forms au format jour/mois/année ; les dates déjà converties sont conservées
+    if not pd.api.types.is_datetime64_any_dtype(df['Date']):
+        df['Date'] = pd.to_datetime(df['Date'], format='%d/%m/%Y %H:%M:%S', errors='coerce')
+    df['Date'] = df['Date'].astype('datetime64[ns]')
+    return df
+
+@stage("notes")
+def convert_scores(df):
+    # Conversion unique des notes en float (NaN pour les valeurs non numériques)
+    for col in df.columns:
+        if col in SCORE_COLUMNS or is_satisfaction_column(col):
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
     return df
 
 # Correction d'anomalies dans les colonnes
+@stage("anomalies")
 def correct_anomalies(df):
     if "Satisfaction_DispoCours" in df.columns:
-        df['Satisfaction_DispoCours'] = df['Satisfaction_DispoCours'].replace(0, pd.NA)
+        df['Satisfaction_DispoCours'] = df['Satisfaction_DispoCours'].replace(0, np.nan)
     return df
 
-# Fonction pour catégoriser les scores NPS
-def get_nps_category(score):
-    try:
-        score = float(score)
-        if score >= 8:
-            return "Promoter"
-        elif score >= 6:
-            return "Passive"
-        else:
-            return "Detractor"
-    except ValueError:
-        return "Unknown"
+@stage("réponses sans note")
+def drop_unscored(df):
+    # Suppression des lignes sans recommandation exploitable
+    return df.dropna(subset=['Recommandation'])
+
+@stage("catégories")
+def categorize(df):
+    # Catégorie NPS recalculée depuis la note, quel que soit le libellé d'origine
+    df['Catégorie'] = nps_category_labels(df['Recommandation']).astype(object)
+    return df
+
+@stage("textes")
+def clean_text(df):
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].fillna('').astype(str).str.strip()
+    return df
+
+@stage("index temporel")
+def index_dates(df):
+    # Tri chronologique et index temporel pour les filtres de période
+    return index_by_date(df)
 
 # Fonction de prétraitement des données
 def preprocess_data(df):
-    # Renommer les colonnes
-    df = rename_columns_flexibly(df)
-    
-    # Correction des anomalies
-    df = correct_anomalies(df)
-    
-    # Conversion de la colonne 'Date' en format datetime avec le bon format
-    # Remplace "jour/mois/année" par le format correct si nécessaire
-    df['Date'] = pd.to_datetime(df['Date'], format='%d/%m/%Y %H:%M:%S', errors='coerce')
-    
-    # Conversion stricte de 'Recommandation' en float, en remplaçant les erreurs par NaN
-    df['Recommandation'] = pd.to_numeric(df['Recommandation'], errors='coerce')
-
-    # Ajout : conversion des colonnes de satisfaction en numérique
-    satisfaction_columns = [col for col in df.columns if 'Satisfaction_' in col]
-    for col in satisfaction_columns:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-
-    # Suppression des lignes avec des NaN dans 'Recommandation' après conversion
-    df = df.dropna(subset=['Recommandation'])
-
-    # Catégoriser les scores NPS et ajouter une colonne 'Catégorie'
-    df['Catégorie'] = df['Recommandation'].apply(get_nps_category)
-    
-    # Vérifications de test
-    print("Colonnes après renommage :", df.columns.tolist())
-    print("Types des colonnes :", df.dtypes)
-    print("Aperçu des premières lignes :", df.head())
-    
-    return df
\ No newline at end of file
+    """Applique les étapes du prétraitement puis vérifie le contrat de sortie.
+
+    Toutes les conversions ont lieu ici, une seule fois au chargement.
+    """
+    if df.empty:
+        return df
+
+    df = df.copy()
+    for _, func in PIPELINE:
+        df = func(df)
+
+    check_contract(df)
+    return df
@@ -0,0 +1,291 @@
+import threading
+import time
+import weakref
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Résultat dérivé : empreinte de chaque ligne, dont la somme est l'identifiant de version
+ROW_HASHES = 'row_hashes'
+
+def row_hashes(df):
+    """Empreinte (uint64) de chaque ligne, index compris."""
+    return pd.util.hash_pandas_object(df, index=True).to_numpy()
+
+def dataset_version(df, hashes=None):
+    """Calcule l'empreinte du contenu d'un DataFrame (identifiant de version).
+
+    Somme modulo 2**64 des empreintes de lignes : l'empreinte des premières
+    lignes s'obtient par une somme partielle de row_hashes.
+    """
+    if df.empty:
+        return "vide"
+    hashes = row_hashes(df) if hashes is None else hashes
+    return format(int(hashes.sum(dtype='uint64')), '016x')
+
+def freeze_dataframe(df):
+    """Passe les tableaux NumPy sous-jacents en lecture seule."""
+    for block in df._mgr.blocks:
+        values = getattr(block, 'values', None)
+        if isinstance(values, np.ndarray):
+            values.flags.writeable = False
+    return df
+
+class _DatasetEntry:
+    """Version immuable d'un jeu de données, nombre de sessions qui l'utilisent
+    et résultats dérivés (index, agrégats) calculés sur cette version."""
+    __slots__ = ('df', 'refcount', 'loaded_at', 'derived')
+
+    def __init__(self, df, loaded_at):
+        self.df = df
+        self.refcount = 0
+        self.loaded_at = loaded_at
+        self.derived = {}
+
+class DatasetStore:
+    """Stocke une copie unique par version de données, partagée par toutes les sessions.
+
+    Chaque session reçoit une vue en lecture seule (copie superficielle) ;
+    une version est libérée dès qu'elle n'est plus la version courante de sa
+    source et qu'aucune session ne la référence.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._load_locks = {}
+        self._versions = {}
+        self._current = {}
+        self._listeners = []
+        self._loaders = {}
+        self._static = set()
+        self._requested = {}
+        self._errors = {}
+
+    def register_source(self, source, loader, static=False):
+        """Enregistre la fonction de chargement d'une source.
+
+        Une source statique, une fois chargée, reste fraîche et n'est jamais rechargée.
+        """
+        with self._lock:
+            self._loaders[source] = loader
+            if static:
+                self._static.add(source)
+
+    def is_static(self, source):
+        with self._lock:
+            return source in self._static
+
+    def last_request(self, source):
+        """Date (time.time) de la dernière demande d'une source par une session (None si jamais)."""
+        with self._lock:
+            return self._requested.get(source)
+
+    def last_error(self, source):
+        """Message d'erreur du dernier chargement d'une source (None s'il a réussi)."""
+        with self._lock:
+            return self._errors.get(source)
+
+    def sources(self):
+        """Sources enregistrées."""
+        with self._lock:
+            return list(self._loaders.keys())
+
+    def add_listener(self, callback):
+        """Abonne callback(source, version, df) aux nouvelles versions publiées.
+
+        Les versions déjà courantes sont notifiées immédiatement.
+        """
+        with self._lock:
+            self._listeners.append(callback)
+            current = [(source, version, self._versions[version].df) for source, version in self._current.items()]
+        for source, version, df in current:
+            callback(source, version, df)
+
+    def current_version(self, source):
+        """Retourne la version courante d'une source (None si jamais chargée)."""
+        with self._lock:
+            return self._current.get(source)
+
+    def age(self, source):
+        """Âge en secondes de la version courante d'une source (None si jamais chargée)."""
+        with self._lock:
+            version = self._current.get(source)
+            if version is None:
+                return None
+            return time.time() - self._versions[version].loaded_at
+
+    def is_fresh(self, source, ttl):
+        """Vérifie si la version courante d'une source a moins de ttl secondes (ou est statique)."""
+        age = self.age(source)
+        return age is not None and (age < ttl or self.is_static(source))
+
+    def publish(self, source, df):
+        """Enregistre un jeu de données comme version courante de la source."""
+        hashes = row_hashes(df)
+        version = dataset_version(df, hashes)
+        with self._lock:
+            entry = self._versions.get(version)
+            if entry is None:
+                entry = _DatasetEntry(freeze_dataframe(df), time.time())
+                entry.derived[ROW_HASHES] = hashes
+                self._versions[version] = entry
+            else:
+                entry.loaded_at = time.time()
+            previous = self._current.get(source)
+            self._current[source] = version
+            if previous is not None and previous != version:
+                self._collect(previous)
+            listeners = list(self._listeners) if previous != version else []
+        for callback in listeners:
+            callback(source, version, entry.df)
+        return version
+
+    def acquire(self, version):
+        """Retourne une vue en lecture seule d'une version et incrémente son compteur."""
+        with self._lock:
+            entry = self._versions[version]
+            entry.refcount += 1
+            view = entry.df.copy(deep=False)
+        # La référence est rendue automatiquement quand la session abandonne sa vue
+        weakref.finalize(view, self.release, version)
+        return view
+
+    def release(self, version):
+        """Décrémente le compteur d'une version et la libère si elle est obsolète."""
+        with self._lock:
+            entry = self._versions.get(version)
+            if entry is None:
+                return
+            entry.refcount = max(entry.refcount - 1, 0)
+            self._collect(version)
+
+    def _collect(self, version):
+        """Supprime une version qui n'est plus courante ni utilisée."""
+        entry = self._versions.get(version)
+        if entry is not None and entry.refcount == 0 and version not in self._current.values():
+            del self._versions[version]
+
+    def derived(self, version, key, compute):
+        """Retourne un résultat calculé sur une version, en le mémorisant avec elle.
+
+        Le résultat est libéré en même temps que la version. Pour une version
+        inconnue du store, le calcul est fait sans mise en cache.
+        """
+        with self._lock:
+            entry = self._versions.get(version)
+            if entry is not None and key in entry.derived:
+                return entry.derived[key]
+        value = compute()
+        if entry is not None:
+            with self._lock:
+                entry.derived.setdefault(key, value)
+        return value
+
+    def _load_lock(self, source):
+        with self._lock:
+            return self._load_locks.setdefault(source, threading.Lock())
+
+    def _load(self, source, loader):
+        # Les erreurs sont conservées pour la session : le chargement peut avoir lieu
+        # dans un thread d'arrière-plan, sans accès à l'interface
+        try:
+            df = loader()
+        except Exception as e:
+            print(f"DEBUG - Erreur lors du chargement de {source}:", str(e))
+            with self._lock:
+                self._errors[source] = str(e)
+            return self.current_version(source)
+        with self._lock:
+            self._errors.pop(source, None)
+        # En cas d'échec du chargement, on conserve la dernière version valide
+        if df.empty:
+            return self.current_version(source)
+        return self.publish(source, df)
+
+    def refresh(self, source):
+        """Recharge une source (bloquant) ; un seul chargement à la fois par source."""
+        with self._lock:
+            loader = self._loaders[source]
+        with self._load_lock(source):
+            return self._load(source, loader)
+
+    def refresh_async(self, source):
+        """Lance le rechargement d'une source en arrière-plan, sauf s'il est déjà en cours."""
+        load_lock = self._load_lock(source)
+        if not load_lock.acquire(blocking=False):
+            return
+        with self._lock:
+            loader = self._loaders[source]
+
+        def run():
+            try:
+                self._load(source, loader)
+            except Exception as e:
+                print(f"DEBUG - Erreur lors du rechargement de {source}:", str(e))
+            finally:
+                load_lock.release()
+
+        threading.Thread(target=run, name=f"dataset-refresh-{source}", daemon=True).start()
+
+    def get_or_load(self, source, loader, ttl):
+        """Retourne la version courante d'une source (stale-while-revalidate).
+
+        Une version expirée est servie telle quelle pendant son rechargement en
+        arrière-plan ; seul le tout premier chargement d'une source est bloquant,
+        et les sessions concurrentes attendent puis réutilisent la version publiée.
+        """
+        self.register_source(source, loader)
+        with self._lock:
+            self._requested[source] = time.time()
+        version = self.current_version(source)
+        if version is not None:
+            if not self.is_fresh(source, ttl):
+                self.refresh_async(source)
+            return version
+
+        with self._load_lock(source):
+            version = self.current_version(source)
+            if version is not None:
+                return version
+            return self._load(source, loader)
+
+    def entries(self):
+        """Retourne les versions en mémoire avec leurs entrées (instantané)."""
+        with self._lock:
+            return list(self._versions.items())
+
+    def stats(self):
+        """Retourne l'état des versions en mémoire."""
+        with self._lock:
+            return [
+                {
+                    'version': version,
+                    'lignes': len(entry.df),
+                    'sessions': entry.refcount,
+                    'courante': version in self._current.values(),
+                    'chargee_le': entry.loaded_at
+                }
+                for version, entry in self._versions.items()
+            ]
+
+@st.cache_resource
+def get_dataset_store():
+    """Retourne le store partagé par toutes les sessions du processus."""
+    return DatasetStore()
+
+def get_session_dataset(source, loader, ttl):
+    """Retourne la vue de la session sur la version courante d'une source."""
+    store = get_dataset_store()
+    version = store.get_or_load(source, loader, ttl)
+    if version is None:
+        return pd.DataFrame()
+
+    # Réutilise la vue de la session si elle porte déjà sur la bonne version
+    if (st.session_state.get('dataset_source') == source
+            and st.session_state.get('dataset_version') == version):
+        return st.session_state.dataset
+
+    st.session_state.dataset = store.acquire(version)
+    st.session_state.dataset_source = source
+    st.session_state.dataset_version = version
+    return st.session_state.dataset
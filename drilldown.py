@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+from dataset_store import get_dataset_store
+from config import METRIC_STRUCTURE
+
+# Tranches de probabilité de réabonnement (notes sur 10)
+REABO_BINS = [-np.inf, 4, 6, 8, 10]
+REABO_LABELS = ["0-4", "5-6", "7-8", "9-10"]
+
+# Niveaux de satisfaction (notes sur 5)
+SATISFACTION_BINS = [-np.inf, 2, 3, 5]
+SATISFACTION_LABELS = ["Insatisfait (1-2)", "Neutre (3)", "Satisfait (4-5)"]
+
+DEFAULT_DIMENSIONS = ["Catégorie NPS"]
+DEFAULT_MEASURES = ["Réponses", "NPS", "Prob. réabonnement"]
+
+def _metric_labels():
+    """Libellé de chaque métrique de satisfaction, d'après METRIC_STRUCTURE."""
+    return {
+        metric: label
+        for category in METRIC_STRUCTURE.values()
+        for metric, label in category['metrics'].items()
+    }
+
+def available_dimensions(df):
+    """Retourne les axes d'analyse disponibles : libellé -> fonction de calcul vectorisée."""
+    dimensions = {}
+    if 'Date' in df.columns:
+        dimensions["Mois"] = lambda d: d['Date'].dt.to_period('M').astype(str)
+    if 'Catégorie' in df.columns:
+        dimensions["Catégorie NPS"] = lambda d: d['Catégorie']
+    if 'ProbabiliteReabo' in df.columns:
+        dimensions["Probabilité de réabonnement"] = lambda d: pd.cut(
+            d['ProbabiliteReabo'], bins=REABO_BINS, labels=REABO_LABELS
+        )
+    if 'Club' in df.columns:
+        dimensions["Club"] = lambda d: d['Club']
+    for metric, label in _metric_labels().items():
+        if metric in df.columns:
+            dimensions[f"Satisfaction : {label}"] = lambda d, m=metric: pd.cut(
+                d[m], bins=SATISFACTION_BINS, labels=SATISFACTION_LABELS
+            )
+    return dimensions
+
+def default_query(df):
+    """Axes et mesures affichés par défaut (et précalculés à chaque nouvelle version)."""
+    dimensions = [name for name in DEFAULT_DIMENSIONS if name in available_dimensions(df)]
+    measures = [name for name in DEFAULT_MEASURES if name in available_measures(df)]
+    return dimensions, measures
+
+def available_measures(df):
+    """Retourne les mesures disponibles, dans l'ordre d'affichage."""
+    measures = ["Réponses"]
+    if 'Recommandation' in df.columns:
+        measures.append("NPS")
+    if 'ProbabiliteReabo' in df.columns:
+        measures.append("Prob. réabonnement")
+    measures += [label for metric, label in _metric_labels().items() if metric in df.columns]
+    return measures
+
+def drilldown_partials(df, dimensions, measures):
+    """Sommes et effectifs des mesures demandées pour chaque combinaison des axes.
+
+    Les colonnes d'agrégation (promoteurs, détracteurs, notes) sont préparées
+    une fois, puis un unique groupby calcule toutes les sommes et effectifs.
+    Les agrégats partiels de deux blocs de réponses se fusionnent par addition
+    (voir merge_partials), les moyennes n'étant calculées qu'à la fin.
+    """
+    dimension_funcs = available_dimensions(df)
+    metric_columns = {label: metric for metric, label in _metric_labels().items()}
+
+    keys = pd.DataFrame({name: dimension_funcs[name](df) for name in dimensions}, index=df.index)
+    values = pd.DataFrame(index=df.index)
+    values['Réponses'] = 1
+
+    if "NPS" in measures:
+        scores = df['Recommandation']
+        values['_notes'] = scores.notna().astype(int)
+        values['_promoteurs'] = (scores >= 9).astype(int)
+        values['_detracteurs'] = (scores <= 6).astype(int)
+    averaged = {}
+    if "Prob. réabonnement" in measures:
+        averaged['Prob. réabonnement'] = 'ProbabiliteReabo'
+    averaged.update({measure: metric_columns[measure] for measure in measures if measure in metric_columns})
+    for measure, col in averaged.items():
+        values[measure] = df[col].fillna(0)
+        values[f'_n {measure}'] = df[col].notna().astype(int)
+
+    if dimensions:
+        return values.groupby([keys[name] for name in dimensions], observed=True, dropna=True).sum()
+    return values.sum().to_frame().T
+
+def merge_partials(partials, dimensions):
+    """Fusionne les agrégats partiels de plusieurs blocs (addition par combinaison d'axes)."""
+    merged = pd.concat(partials)
+    if dimensions:
+        return merged.groupby(level=list(range(len(dimensions))), observed=True).sum()
+    return merged.sum().to_frame().T
+
+def finalize_drilldown(partials, dimensions, measures):
+    """Calcule les mesures (NPS, moyennes) à partir des sommes et effectifs."""
+    grouped = partials.copy()
+    if "NPS" in measures:
+        grouped['NPS'] = (grouped['_promoteurs'] - grouped['_detracteurs']) / grouped['_notes'].replace(0, np.nan) * 100
+    for measure in measures:
+        if f'_n {measure}' in grouped.columns:
+            grouped[measure] = grouped[measure] / grouped[f'_n {measure}'].replace(0, np.nan)
+
+    result = grouped[[measure for measure in measures if measure in grouped.columns]].round(2)
+    return result.reset_index(drop=not dimensions)
+
+def compute_drilldown(df, dimensions, measures):
+    """Calcule les mesures demandées pour chaque combinaison des axes, en un seul regroupement."""
+    return finalize_drilldown(drilldown_partials(df, dimensions, measures), dimensions, measures)
+
+def cached_drilldown(version, dimensions, measures, df, store=None):
+    """Version mise en cache de compute_drilldown, par signature de requête et version de données."""
+    store = get_dataset_store() if store is None else store
+    signature = ('drilldown', tuple(dimensions), tuple(measures))
+    return store.derived(version, signature, lambda: compute_drilldown(df, list(dimensions), list(measures)))
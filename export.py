@@ -0,0 +1,169 @@
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import weakref
+import pandas as pd
+
+EXPORT_FORMATS = {
+    "CSV": {"extension": "csv", "mime": "text/csv"},
+    "Parquet": {"extension": "parquet", "mime": "application/octet-stream"},
+    "XLSX": {"extension": "xlsx", "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+}
+
+DEFAULT_CHUNK_SIZE = 5000
+
+def iter_row_chunks(df, rows, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Parcourt les lignes retenues par blocs, sans matérialiser tout le DataFrame filtré."""
+    col_positions = slice(None) if columns is None else [df.columns.get_loc(col) for col in columns if col in df.columns]
+    for start in range(0, len(rows), chunk_size):
+        yield df.iloc[rows[start:start + chunk_size], col_positions]
+
+def kpis_to_frame(kpis):
+    """Met les indicateurs calculés sous forme de tableau Indicateur / Valeur."""
+    return pd.DataFrame({'Indicateur': list(kpis.keys()), 'Valeur': [str(v) for v in kpis.values()]})
+
+def iter_csv(df, rows, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Génère l'export CSV (séparateur ';', compatible Excel) par blocs d'octets."""
+    first = True
+    for chunk in iter_row_chunks(df, rows, columns, chunk_size):
+        text = chunk.to_csv(sep=';', index=False, header=first, date_format='%d/%m/%Y %H:%M:%S')
+        yield (('\ufeff' if first else '') + text).encode('utf-8')
+        first = False
+
+class _ChunkSink:
+    """Flux en écriture seule qui accumule les octets jusqu'à leur lecture par le générateur."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+def iter_parquet(df, rows, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Génère l'export Parquet, un groupe de lignes par bloc."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _ChunkSink()
+    writer = None
+    for chunk in iter_row_chunks(df, rows, columns, chunk_size):
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            # Une colonne vide dans le premier bloc est typée en texte pour les suivants
+            schema = pa.schema([
+                pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+                for field in table.schema
+            ])
+            writer = pq.ParquetWriter(sink, schema)
+        writer.write_table(table.cast(writer.schema))
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+    yield sink.drain()
+
+def iter_xlsx(df, rows, columns=None, kpis=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Génère l'export XLSX (feuilles Réponses et Indicateurs).
+
+    Le classeur est écrit en mode flux par openpyxl ; le fichier n'est
+    disponible qu'une fois complet, puis renvoyé par blocs.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Réponses")
+    header_written = False
+    for chunk in iter_row_chunks(df, rows, columns, chunk_size):
+        if not header_written:
+            sheet.append(list(chunk.columns))
+            header_written = True
+        for values in chunk.itertuples(index=False, name=None):
+            sheet.append([None if pd.isna(v) else (v.to_pydatetime() if isinstance(v, pd.Timestamp) else v) for v in values])
+
+    if kpis:
+        kpi_sheet = workbook.create_sheet("Indicateurs")
+        for values in kpis_to_frame(kpis).itertuples(index=False, name=None):
+            kpi_sheet.append(list(values))
+
+    with tempfile.TemporaryFile() as handle:
+        workbook.save(handle)
+        handle.seek(0)
+        while block := handle.read(1024 * 1024):
+            yield block
+
+def iter_export(export_format, df, rows, columns=None, kpis=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Retourne le générateur de blocs d'octets pour le format demandé."""
+    if export_format == "CSV":
+        return iter_csv(df, rows, columns, chunk_size)
+    if export_format == "Parquet":
+        return iter_parquet(df, rows, columns, chunk_size)
+    if export_format == "XLSX":
+        return iter_xlsx(df, rows, columns, kpis, chunk_size)
+    raise ValueError(f"Format d'export inconnu : {export_format}")
+
+def _remove_file(path):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+class ExportJob:
+    """Export écrit bloc par bloc dans un fichier temporaire, par un thread d'arrière-plan.
+
+    Le script de la session n'attend pas la fin de l'écriture et ne garde pas
+    le contenu en mémoire ; le fichier est supprimé avec le job (remplacement
+    par un autre export ou fin de session).
+    """
+
+    def __init__(self, chunks, suffix=''):
+        handle, self.path = tempfile.mkstemp(prefix='export_nps_', suffix=suffix)
+        os.close(handle)
+        self.error = None
+        self._done = threading.Event()
+        self._finalizer = weakref.finalize(self, _remove_file, self.path)
+        threading.Thread(target=self._write, args=(chunks,), name="nps-export", daemon=True).start()
+
+    def _write(self, chunks):
+        try:
+            with open(self.path, 'wb') as handle:
+                for block in chunks:
+                    handle.write(block)
+        except Exception as e:
+            print("DEBUG - Erreur lors de la préparation de l'export:", str(e))
+            self.error = str(e)
+        finally:
+            self._done.set()
+
+    def wait(self, timeout=None):
+        """Attend la fin de l'écriture (au plus timeout secondes) ; True si elle est terminée."""
+        return self._done.wait(timeout)
+
+    def open(self):
+        return open(self.path, 'rb')
+
+    def discard(self):
+        """Supprime le fichier de l'export."""
+        self._finalizer()
+
+def kpis_to_csv(kpis):
+    """Export CSV des indicateurs calculés."""
+    buffer = io.StringIO()
+    kpis_to_frame(kpis).to_csv(buffer, sep=';', index=False)
+    return ('\ufeff' + buffer.getvalue()).encode('utf-8')
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+from config import DEFAULT_SETTINGS, METRIC_STRUCTURE
+from dataset_store import get_dataset_store
+
+OVERALL_PERIOD = "Ensemble"
+
+def _as_float(series):
+    """Valeurs numériques d'une colonne (NaN pour les valeurs manquantes)."""
+    return series.to_numpy(dtype=float, na_value=np.nan)
+
+def _nps_contribution(df):
+    """Contribution NPS de chaque réponse (+100 promoteur, -100 détracteur) : sa moyenne est le NPS."""
+    scores = _as_float(df['Recommandation'])
+    contribution = np.select([scores >= 9, scores <= 6], [100.0, -100.0], 0.0)
+    return np.where(np.isnan(scores), np.nan, contribution)
+
+# Cibles expliquées : libellé -> (colonne source, valeur individuelle)
+TARGETS = {
+    "NPS": ('Recommandation', _nps_contribution),
+    "Prob. réabonnement": ('ProbabiliteReabo', lambda df: _as_float(df['ProbabiliteReabo'])),
+}
+
+def driver_metrics(df):
+    """Métriques de satisfaction présentes : (colonne, service, catégorie)."""
+    return [
+        (metric, label, category['label'])
+        for category in METRIC_STRUCTURE.values()
+        for metric, label in category['metrics'].items()
+        if metric in df.columns
+    ]
+
+def _month_codes(df):
+    """Code de mois de chaque réponse et libellés des mois."""
+    codes, months = pd.factorize(df['Date'].dt.to_period('M'), sort=True)
+    return codes, months.astype(str).tolist()
+
+def _impute_by_month(values, codes, n_months):
+    """Remplace les notes manquantes par la moyenne du mois (à défaut, la moyenne globale)."""
+    n_columns = values.shape[1]
+    observed = ~np.isnan(values)
+    # Sommes et effectifs par (mois, colonne) en un seul bincount
+    cells = (codes[:, None] * n_columns + np.arange(n_columns)).ravel()
+    size = n_months * n_columns
+    sums = np.bincount(cells, weights=np.where(observed, values, 0.0).ravel(), minlength=size).reshape(n_months, n_columns)
+    counts = np.bincount(cells, weights=observed.ravel(), minlength=size).reshape(n_months, n_columns)
+    overall = sums.sum(axis=0) / np.maximum(counts.sum(axis=0), 1)
+    month_means = np.where(counts > 0, sums / np.maximum(counts, 1), overall)
+    return np.where(observed, values, month_means[codes])
+
+def sufficient_statistics(x, y, codes, n_groups, chunk_size=20000):
+    """Moments croisés par groupe et par cible, en un produit matriciel par bloc de lignes.
+
+    Pour chaque réponse, z = [1, x, y] ; on cumule sum(w * z zᵀ) par (groupe, cible),
+    w valant 1 si la cible est renseignée. Seul le triangle supérieur de z zᵀ est
+    calculé. Résultat de forme (groupes, cibles, q, q).
+    """
+    n, n_targets = y.shape
+    q = 1 + x.shape[1] + n_targets
+    rows, cols = np.triu_indices(q)
+    weights = ~np.isnan(y)
+    upper = np.zeros((n_groups * n_targets, len(rows)))
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        z = np.hstack([np.ones((stop - start, 1)), x[start:stop], np.nan_to_num(y[start:stop])])
+        # Poids (ligne, groupe x cible) : appartenance au groupe et cible renseignée
+        group_weights = np.zeros((stop - start, n_groups, n_targets))
+        group_weights[np.arange(stop - start), codes[start:stop]] = weights[start:stop]
+        upper += group_weights.reshape(stop - start, -1).T @ (z[:, rows] * z[:, cols])
+
+    stats = np.zeros((n_groups * n_targets, q, q))
+    stats[:, rows, cols] = upper
+    stats[:, cols, rows] = upper
+    return stats.reshape(n_groups, n_targets, q, q)
+
+def solve_drivers(stats, n_metrics, alpha=0.1):
+    """Corrélations et coefficients de ridge standardisés pour tous les systèmes à la fois.
+
+    stats : moments de forme (..., cibles, q, q). Les systèmes (R + alpha I) b = r
+    de chaque groupe et cible sont résolus en un seul appel batché.
+    """
+    n_targets = stats.shape[-3]
+    counts = stats[..., 0, 0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = stats[..., 0, :] / counts[..., None]
+        cov = stats / counts[..., None, None] - means[..., :, None] * means[..., None, :]
+
+    x_slice = slice(1, 1 + n_metrics)
+    cov_xx = cov[..., x_slice, x_slice]
+    # Covariance de chaque métrique avec la cible du système (diagonale sur l'axe des cibles)
+    cov_xy = np.einsum('...tit->...ti', cov[..., x_slice, 1 + n_metrics:])
+    var_y = np.einsum('...ttt->...t', cov[..., 1 + n_metrics:, 1 + n_metrics:])
+
+    sd_x = np.sqrt(np.clip(np.einsum('...ii->...i', cov_xx), 0, None))
+    sd_y = np.sqrt(np.clip(var_y, 0, None))
+    # Les métriques sans variance sont neutralisées (corrélation et coefficient nuls)
+    inv_sd_x = np.divide(1.0, sd_x, out=np.zeros_like(sd_x), where=sd_x > 1e-12)
+    inv_sd_y = np.divide(1.0, sd_y, out=np.zeros_like(sd_y), where=sd_y > 1e-12)
+
+    corr_xx = np.nan_to_num(cov_xx * inv_sd_x[..., :, None] * inv_sd_x[..., None, :])
+    corr_xy = np.nan_to_num(cov_xy * inv_sd_x * inv_sd_y[..., None])
+
+    system = corr_xx + alpha * np.eye(n_metrics)
+    coefficients = np.linalg.solve(system, corr_xy[..., None])[..., 0]
+    # R² de l'ajustement standardisé : 2 bᵀr - bᵀRb
+    r_squared = 2 * np.einsum('...i,...i->...', coefficients, corr_xy) - np.einsum(
+        '...i,...ij,...j->...', coefficients, corr_xx, coefficients
+    )
+    return corr_xy, coefficients, r_squared, counts
+
+def compute_key_drivers(df, alpha=0.1, min_responses=None):
+    """Analyse des facteurs clés par mois et sur l'ensemble de la période.
+
+    Retourne un tableau long : Période, Cible, Service, Catégorie, Corrélation,
+    Coefficient (standardisé, ridge), R², Réponses. Les périodes comptant moins
+    de min_responses réponses renseignées sont exclues.
+    """
+    min_responses = DEFAULT_SETTINGS['seuil_representativite'] if min_responses is None else min_responses
+    metrics = driver_metrics(df)
+    targets = [name for name, (column, _) in TARGETS.items() if column in df.columns]
+    columns = ['Période', 'Cible', 'Service', 'Catégorie', 'Corrélation', 'Coefficient', 'R²', 'Réponses']
+    if df.empty or not metrics or not targets or 'Date' not in df.columns:
+        return pd.DataFrame(columns=columns)
+
+    codes, months = _month_codes(df)
+    x = np.column_stack([_as_float(df[metric]) for metric, _, _ in metrics])
+    x = _impute_by_month(x, codes, len(months))
+    y = np.column_stack([TARGETS[name][1](df) for name in targets])
+
+    month_stats = sufficient_statistics(x, y, codes, len(months))
+    # Les moments sont additifs : l'ensemble de la période est la somme des mois
+    stats = np.concatenate([month_stats, month_stats.sum(axis=0, keepdims=True)])
+    periods = months + [OVERALL_PERIOD]
+
+    corr, coefficients, r_squared, counts = solve_drivers(stats, len(metrics), alpha)
+
+    n_periods, n_targets, n_metrics = corr.shape
+    result = pd.DataFrame({
+        'Période': np.repeat(periods, n_targets * n_metrics),
+        'Cible': np.tile(np.repeat(targets, n_metrics), n_periods),
+        'Service': np.tile([label for _, label, _ in metrics], n_periods * n_targets),
+        'Catégorie': np.tile([category for _, _, category in metrics], n_periods * n_targets),
+        'Corrélation': corr.ravel(),
+        'Coefficient': coefficients.ravel(),
+        'R²': np.repeat(r_squared.ravel(), n_metrics),
+        'Réponses': np.repeat(counts.ravel(), n_metrics).astype(int),
+    })
+    result = result[result['Réponses'] >= min_responses]
+    return result.round({'Corrélation': 3, 'Coefficient': 3, 'R²': 3}).reset_index(drop=True)
+
+def cached_key_drivers(version, df, store=None):
+    """Version mise en cache de compute_key_drivers, par version de données."""
+    store = get_dataset_store() if store is None else store
+    return store.derived(version, 'key_drivers', lambda: compute_key_drivers(df))
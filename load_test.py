@@ -0,0 +1,273 @@
+"""Test de charge : sessions simultanées de l'application sur les données de test.
+
+Lance un serveur Streamlit local (ou cible un serveur existant avec --url) et
+ouvre N sessions par le protocole websocket du navigateur : chaque session
+s'authentifie par un jeton de session signé, puis joue le même scénario
+(ouverture puis changements de filtres dans chaque onglet). Chaque étape
+déclenche une réexécution du script, chronométrée jusqu'à sa fin côté serveur.
+
+Usage en ligne de commande : python load_test.py --sessions 50 --iterations 3
+"""
+import argparse
+import asyncio
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+import numpy as np
+import pandas as pd
+
+TEST_SOURCE = "Données de test"
+TEST_USER = "user@annettek.fr"
+PERCENTILES = [50, 95, 99]
+
+# Étapes du scénario : (nom, type de widget, libellé, valeur choisie).
+# Un libellé None désigne le premier widget du type proposant la valeur.
+# Streamlit exécute tous les onglets à chaque réexécution : changer d'onglet
+# n'a pas de coût serveur, seules les interactions avec leurs widgets en ont.
+SCENARIO = [
+    ("Vue d'ensemble : granularité", 'radio', "Granularité", "Journalier"),
+    ("Métriques : période", 'selectbox', None, "Dernière année"),
+    ("Métriques : vue par catégorie", 'radio', None, "Vue par catégorie"),
+    ("Réponses : période", 'selectbox', "Période", "Tout"),
+    ("Réponses : recherche", 'text_input', "Rechercher par nom ou prénom", "ma"),
+    ("Réponses : types d'avis", 'multiselect', "Types d'avis", ["Promoteurs"]),
+    ("Segments : axes", 'multiselect', "Axes d'analyse", ["Mois", "Catégorie NPS"]),
+    ("Segments : mesure", 'selectbox', "Mesure affichée", "NPS"),
+    ("Facteurs clés : indicateur", 'selectbox', "Indicateur expliqué", "Prob. réabonnement"),
+]
+
+class ScenarioError(Exception):
+    """Erreur rencontrée par une session pendant le scénario."""
+
+class AppSessionClient:
+    """Client websocket minimal jouant le rôle du navigateur pour une session."""
+
+    def __init__(self, url, query_string, timeout=120):
+        self.url = url
+        self.query_string = query_string
+        self.timeout = timeout
+        self.widgets = {}
+        self.widget_states = {}
+        self._cache = {}
+        self._connection = None
+
+    async def connect(self):
+        from tornado.websocket import websocket_connect
+
+        ws_url = self.url.replace('http', 'ws', 1).rstrip('/') + '/_stcore/stream'
+        self._connection = await websocket_connect(ws_url, subprotocols=['streamlit'])
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+
+    async def rerun(self):
+        """Demande une réexécution avec l'état courant des widgets et attend sa fin."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = self.query_string
+        for state in self.widget_states.values():
+            msg.rerun_script.widget_states.widgets.append(state)
+        await self._connection.write_message(msg.SerializeToString(), binary=True)
+        await asyncio.wait_for(self._read_until_finished(), self.timeout)
+
+    async def _read_until_finished(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        errors = []
+        while True:
+            payload = await self._connection.read_message()
+            if payload is None:
+                raise ScenarioError("connexion fermée par le serveur")
+            msg = ForwardMsg()
+            msg.ParseFromString(payload)
+            if msg.hash:
+                self._cache[msg.hash] = msg
+            if msg.WhichOneof('type') == 'ref_hash':
+                msg = self._cache.get(msg.ref_hash, msg)
+
+            kind = msg.WhichOneof('type')
+            if kind == 'delta' and msg.delta.WhichOneof('type') == 'new_element':
+                element = msg.delta.new_element
+                element_type = element.WhichOneof('type')
+                if element_type == 'exception':
+                    errors.append(element.exception.message)
+                elif element_type in ('selectbox', 'radio', 'multiselect', 'text_input'):
+                    self.widgets[getattr(element, element_type).id] = (element_type, getattr(element, element_type))
+            elif kind == 'script_finished':
+                if msg.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                if msg.script_finished != ForwardMsg.FINISHED_SUCCESSFULLY:
+                    errors.append("échec de compilation du script")
+                if errors:
+                    raise ScenarioError(errors[0])
+                return
+
+    def set_widget(self, widget_type, label, value):
+        """Modifie la valeur d'un widget affiché (comme le ferait le navigateur)."""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        options_needed = value if isinstance(value, list) else [value]
+        for widget_id, (element_type, proto) in self.widgets.items():
+            if element_type != widget_type or (label is not None and proto.label != label):
+                continue
+            options = list(getattr(proto, 'options', []))
+            if widget_type != 'text_input' and not set(options_needed) <= set(options):
+                continue
+            state = WidgetState(id=widget_id)
+            if widget_type == 'text_input':
+                state.string_value = value
+            elif widget_type == 'multiselect':
+                state.int_array_value.data.extend(options.index(option) for option in value)
+            else:
+                state.int_value = options.index(value)
+            self.widget_states[widget_id] = state
+            return
+        raise ScenarioError(f"widget introuvable : {widget_type} {label or value}")
+
+async def run_session(session_id, url, query_string, iterations, start_event):
+    """Joue le scénario pour une session et retourne les mesures de chaque réexécution."""
+    client = AppSessionClient(url, query_string)
+    measures = []
+
+    async def timed(step, iteration, action=None):
+        start = time.perf_counter()
+        error = None
+        try:
+            if action is not None:
+                action()
+            await client.rerun()
+        except (ScenarioError, asyncio.TimeoutError) as e:
+            error = str(e) or type(e).__name__
+        measures.append({
+            'session': session_id,
+            'iteration': iteration,
+            'etape': step,
+            'duree_ms': (time.perf_counter() - start) * 1000,
+            'erreur': error
+        })
+        return error is None
+
+    try:
+        await client.connect()
+        await start_event.wait()
+        if not await timed("Ouverture", 0):
+            return measures
+        for iteration in range(iterations):
+            for step, widget_type, label, value in SCENARIO:
+                if not await timed(step, iteration, lambda: client.set_widget(widget_type, label, value)):
+                    return measures
+            # Retour aux valeurs initiales pour rejouer le scénario à l'identique
+            client.widget_states.clear()
+    except OSError as e:
+        measures.append({'session': session_id, 'iteration': 0, 'etape': "Connexion",
+                         'duree_ms': np.nan, 'erreur': str(e)})
+    finally:
+        client.close()
+    return measures
+
+async def run_load_test(url, query_string, sessions=50, iterations=3):
+    """Lance les sessions simultanément et retourne (mesures, durée totale en s)."""
+    start_event = asyncio.Event()
+    tasks = [
+        asyncio.create_task(run_session(i, url, query_string, iterations, start_event))
+        for i in range(sessions)
+    ]
+    # Toutes les sessions démarrent ensemble, une fois les connexions ouvertes
+    await asyncio.sleep(1)
+    start = time.perf_counter()
+    start_event.set()
+    results = await asyncio.gather(*tasks)
+    return pd.DataFrame([row for rows in results for row in rows]), time.perf_counter() - start
+
+def summarize(measures, elapsed):
+    """Percentiles de latence par étape et au global, débit en réexécutions par seconde."""
+    def stats(durations):
+        durations = durations.dropna()
+        values = np.percentile(durations, PERCENTILES) if len(durations) else [np.nan] * len(PERCENTILES)
+        return {f"p{p}_ms": round(float(v), 1) for p, v in zip(PERCENTILES, values)}
+
+    ok = measures[measures['erreur'].isna()]
+    rows = [{'etape': step, 'reexecutions': len(group), **stats(group['duree_ms'])}
+            for step, group in ok.groupby('etape', sort=False)]
+    rows.append({'etape': "Total", 'reexecutions': len(ok), **stats(ok['duree_ms'])})
+    throughput = len(ok) / elapsed if elapsed > 0 else 0.0
+    return pd.DataFrame(rows), throughput
+
+def session_query_string(secret, username=TEST_USER):
+    """Paramètres d'URL authentifiant une session par jeton signé."""
+    from auth import SESSION_QUERY_PARAM, create_session_token
+    from config import AUTH_CONFIG
+
+    role = AUTH_CONFIG["users"][username]["role"]
+    token = create_session_token(username, role, secret.encode(), 3600)
+    return urlencode({SESSION_QUERY_PARAM: token})
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(secret, port):
+    """Démarre un serveur Streamlit local sur les données de test."""
+    env = dict(os.environ, SESSION_SECRET=secret, DATA_SOURCE=TEST_SOURCE)
+    return subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py'),
+         '--server.headless', 'true', '--server.port', str(port), '--browser.gatherUsageStats', 'false'],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+def wait_until_ready(url, timeout=60):
+    """Attend que le serveur réponde sur son point de contrôle de santé."""
+    from urllib.request import urlopen
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urlopen(url.rstrip('/') + '/_stcore/health', timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError(f"Le serveur {url} ne répond pas")
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de l'application NPS (sessions simultanées)")
+    parser.add_argument('--sessions', type=int, default=50, help="nombre de sessions simultanées")
+    parser.add_argument('--iterations', type=int, default=3, help="nombre de passages du scénario par session")
+    parser.add_argument('--url', help="serveur existant à cibler (SESSION_SECRET doit être celui du serveur)")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        url, secret = args.url, os.getenv('SESSION_SECRET', '')
+    else:
+        url, secret = f"http://127.0.0.1:{_free_port()}", secrets.token_hex(32)
+        server = start_server(secret, url.rsplit(':', 1)[1])
+    try:
+        wait_until_ready(url)
+        measures, elapsed = asyncio.run(run_load_test(url, session_query_string(secret), args.sessions, args.iterations))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    summary, throughput = summarize(measures, elapsed)
+    errors = measures['erreur'].dropna()
+
+    print(f"{args.sessions} sessions x {args.iterations} itérations en {elapsed:.1f} s")
+    print(summary.to_string(index=False))
+    print(f"Débit : {throughput:.1f} réexécutions/s")
+    print(f"Erreurs : {len(errors)}")
+    for error in errors.unique()[:5]:
+        print(f"  - {error}")
+
+if __name__ == "__main__":
+    main()
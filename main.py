@@ -1,13 +1,15 @@
 import streamlit as st
-from data_loader import load_google_sheet_data, generate_test_data
-from data_preprocessing import preprocess_data
-from nps_overview import display_nps_overview
-from nps_metrics import display_metrics_details
-from nps_responses import display_responses_details
-from config import DEFAULT_SETTINGS
-import pandas as pd
+from config import DEFAULT_SETTINGS, STARTUP_MODE
 from datetime import datetime
 from auth import Authenticator
+from shared_cache import shared_loaders
+from startup import APP_MODULES, HEAVY_MODULES, VIEW_DEPENDENCIES, import_report, preload, timed_imports
+
+# Les modules de données et de vues (pandas, numpy, plotly, gspread) ne sont importés
+# qu'après la connexion, sauf en mode de démarrage "eager"
+if STARTUP_MODE == "eager":
+    with timed_imports("démarrage"):
+        preload(HEAVY_MODULES + APP_MODULES)
 
 # Configuration globale
 ENABLE_AUTH = True  # Mettre à True pour activer l'authentification
@@ -26,14 +28,14 @@ def display_config_tab(data_source):
         st.subheader("Source des données")
         new_data_source = st.selectbox(
             "Source des données",
-            ["Données réelles", "Données de test"],
-            index=0 if data_source == "Données réelles" else 1
+            DATA_SOURCES,
+            index=DATA_SOURCES.index(data_source) if data_source in DATA_SOURCES else 0
         )
     
     with col2:
         st.markdown("### ")  # Pour aligner avec le selectbox
         if st.button("🚪 Déconnexion", type="secondary"):
-            st.session_state.authenticated = False
+            Authenticator().logout()
             st.rerun()
     
     # Informations sur l'utilisateur connecté
@@ -41,54 +43,30 @@ def display_config_tab(data_source):
     st.markdown(f"**Utilisateur connecté :** {st.session_state.get('user', 'Non connecté')}")
     st.markdown(f"**Rôle :** {st.session_state.get('user_role', 'Non défini')}")
     
-    return new_data_source
-
-def preprocess_dataframe(df):
-    """Prétraite le DataFrame pour assurer la cohérence des types de données."""
-    if df.empty:
-        return df
-        
-    # Conversion des dates
-    if 'Date' in df.columns:
-        df['Date'] = pd.to_datetime(df['Date'])
-    
-    # Création/vérification de la colonne Catégorie si elle n'existe pas
-    if 'Recommandation' in df.columns and 'Catégorie' not in df.columns:
-        df['Catégorie'] = df['Recommandation'].apply(lambda x: 
-            'Promoteur' if x >= 9 else ('Passif' if x >= 7 else 'Détracteur'))
-    
-    # Conversion des colonnes numériques
-    numeric_columns = [
-        'Recommandation',
-        'ProbabiliteReabo',
-        'Satisfaction_Salle',
-        'Satisfaction_Piscine',
-        'Satisfaction_Coaching',
-        'Satisfaction_DispoCours',
-        'Satisfaction_DispoEquipements',
-        'Satisfaction_Coachs',
-        'Satisfaction_MNS',
-        'Satisfaction_Accueil',
-        'Satisfaction_Conseiller',
-        'Satisfaction_Ambiance',
-        'Satisfaction_Proprete',
-        'Satisfaction_Vestiaires',
-        'Satisfaction_Restauration',
-        'Satisfaction_Festive',
-        'Satisfaction_Masterclass'
-    ]
+    # Temps d'import mesurés depuis le démarrage du processus
+    st.markdown("---")
+    st.subheader("Temps d'import")
+    st.caption(f"Mode de démarrage : {STARTUP_MODE}")
+    st.dataframe(import_report(), use_container_width=True, hide_index=True)
     
-    for col in numeric_columns:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+    # Base SQLite des réponses (optionnelle)
+    if DEFAULT_SETTINGS['base_reponses']:
+        st.markdown("---")
+        st.subheader("Base de réponses")
+        from response_store import get_response_store
+        summary = get_response_store(DEFAULT_SETTINGS['base_reponses']).summary()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Réponses conservées", summary['reponses'])
+        col2.metric("Dernière réponse", (summary['derniere_date'] or "-")[:10])
+        col3.metric("Taille", f"{summary['taille'] / 1024 ** 2:.1f} Mo")
     
-    # Nettoyage des colonnes textuelles
-    text_columns = ['Nom', 'Prenom', 'Email', 'PourquoiNote', 'PourquoiReabo', 'Ameliorations', 'Catégorie']
-    for col in text_columns:
-        if col in df.columns:
-            df[col] = df[col].astype(str).replace('nan', '').str.strip()
+    # Mémoire du processus et principaux consommateurs
+    st.markdown("---")
+    st.subheader("Mémoire")
+    from memory_report import display_memory_report
+    display_memory_report()
     
-    return df
+    return new_data_source
 
 def configure_page():
     """Configure la page Streamlit."""
@@ -214,20 +192,61 @@ def configure_page():
     """, unsafe_allow_html=True)
 
 def load_data(use_test_data=True):
-    """Charge et prétraite les données."""
-    try:
-        if use_test_data:
-            df = generate_test_data()
-        else:
-            df = load_google_sheet_data()
-        
-        # Prétraitement des données
-        df = preprocess_dataframe(df)
-        return df
-        
-    except Exception as e:
-        st.error(f"Erreur lors du chargement des données: {str(e)}")
-        return pd.DataFrame()
+    """Charge et prétraite les données.
+
+    Exécutée aussi par le thread de rafraîchissement : les erreurs sont levées,
+    conservées par le store et affichées par la session.
+    """
+    from data_loader import load_google_sheet_data, generate_test_data
+    from data_preprocessing import preprocess_data
+    
+    if use_test_data:
+        df = generate_test_data()
+    else:
+        df = load_google_sheet_data()
+    
+    # Prétraitement unique (types, catégories, index temporel)
+    df = preprocess_data(df)
+    
+    # Réponses du sheet dans la base SQLite, si elle est configurée (lecture complète :
+    # les réponses supprimées ou modifiées dans le sheet y sont retirées)
+    if not use_test_data and not df.empty and DEFAULT_SETTINGS['base_reponses']:
+        from response_store import get_response_store
+        get_response_store(DEFAULT_SETTINGS['base_reponses']).sync(df)
+    return df
+
+# Fonctions de chargement de chaque source de données, partagées entre répliques
+# par un cache d'instantanés si SHARED_CACHE_DIR est défini
+DATA_LOADERS = shared_loaders(
+    {
+        "Données réelles": lambda: load_data(use_test_data=False),
+        "Données de test": lambda: load_data(use_test_data=True)
+    },
+    DEFAULT_SETTINGS['cache_partage'],
+    DEFAULT_SETTINGS['duree_cache_donnees'] * DEFAULT_SETTINGS['ratio_rafraichissement']
+)
+
+# Données générées une fois par processus : jamais rechargées
+STATIC_SOURCES = ("Données de test",)
+
+# Historique trop volumineux pour la mémoire (HISTORY_PATH) : ses vues sont calculées
+# par blocs depuis le disque, sans chargement de l'ensemble des réponses
+HISTORY_SOURCE = "Historique sur disque"
+DATA_SOURCES = list(DATA_LOADERS) + ([HISTORY_SOURCE] if DEFAULT_SETTINGS['historique_disque'] else [])
+
+def start_background_services():
+    """Démarre les services d'arrière-plan (une fois par processus).
+
+    Le rafraîchissement charge la source par défaut et précalcule ses vues sans
+    attendre de session : la première connexion trouve les données prêtes.
+    """
+    with timed_imports("services d'arrière-plan"):
+        from refresher import get_background_refresher
+        from anomaly_monitor import get_anomaly_monitor
+        from memory_report import get_memory_sampler
+    get_background_refresher(DATA_LOADERS, STATIC_SOURCES, (DEFAULT_SETTINGS['source_donnees'],))
+    get_anomaly_monitor()
+    get_memory_sampler()
 
 def main():
     """Fonction principale de l'application."""
@@ -240,7 +259,8 @@ def main():
     # Gestion de l'authentification
     if ENABLE_AUTH:
         authenticator = Authenticator()
-        if not authenticator.login():
+        # Un jeton de session valide évite de repasser par l'écran de connexion
+        if not authenticator.restore_session() and not authenticator.login():
             return
     else:
         # En mode développement, définir des valeurs par défaut
@@ -249,39 +269,103 @@ def main():
             st.session_state.user = "dev@annettek.fr"
             st.session_state.user_role = "admin"
     
+    # Imports différés : chargés une seule fois par processus, après la connexion
+    with timed_imports("données et vues"):
+        preload(VIEW_DEPENDENCIES)
+        from nps_overview import display_nps_overview, display_anomaly_alerts
+        from nps_metrics import display_metrics_details
+        from nps_responses import display_responses_details
+        from nps_themes import display_text_themes
+        from nps_drilldown import display_drilldown
+        from nps_drivers import display_key_drivers
+        from nps_history import (
+            display_history_drilldown, display_history_metrics, display_history_overview, display_history_responses
+        )
+        from out_of_core import get_out_of_core_history
+        from dataset_store import get_dataset_store, get_session_dataset
+        from anomaly_monitor import get_anomaly_monitor
+    
     # État initial de la source de données
     if 'data_source' not in st.session_state:
-        st.session_state.data_source = "Données réelles"
+        st.session_state.data_source = DEFAULT_SETTINGS['source_donnees']
     
     # Création des onglets
-    tab1, tab2, tab3, tab4 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
         "Vue d'ensemble NPS",
         "Détails des métriques",
         "Détails des réponses",
+        "Thèmes des commentaires",
+        "Analyse par segment",
+        "Facteurs clés",
         "Configuration"
     ])
     
-    # Chargement des données
-    df = load_data(use_test_data=(st.session_state.data_source == "Données de test"))
+    # Sans écran de connexion (jeton restauré), le script n'a pas encore démarré les services
+    start_background_services()
     
-    if df.empty:
-        st.warning("Aucune donnée n'est disponible.")
-        return
-    
-    with tab1:
-        display_nps_overview(df)
-    
-    with tab2:
-        display_metrics_details(df)
-    
-    with tab3:
-        display_responses_details(df)
-    
-    with tab4:
+    if st.session_state.data_source == HISTORY_SOURCE:
+        history = get_out_of_core_history(DEFAULT_SETTINGS['historique_disque'], DEFAULT_SETTINGS['lignes_par_bloc'])
+
+        with tab1:
+            display_history_overview(history)
+
+        with tab2:
+            display_history_metrics(history)
+
+        with tab3:
+            display_history_responses(history)
+
+        # Analyses qui nécessitent l'ensemble des réponses en mémoire
+        for tab in (tab4, tab6):
+            with tab:
+                st.info("Analyse non disponible pour l'historique sur disque")
+
+        with tab5:
+            display_history_drilldown(history)
+    else:
+        # Chargement des données (copie partagée entre sessions, vue en lecture seule)
+        df = get_session_dataset(
+            st.session_state.data_source,
+            DATA_LOADERS[st.session_state.data_source],
+            DEFAULT_SETTINGS['duree_cache_donnees']
+        )
+
+        # Erreur du dernier chargement (éventuellement fait en arrière-plan)
+        load_error = get_dataset_store().last_error(st.session_state.data_source)
+        if load_error:
+            st.error(f"Erreur lors du chargement des données: {load_error}")
+
+        if df.empty:
+            st.warning("Aucune donnée n'est disponible.")
+            return
+
+        with tab1:
+            display_anomaly_alerts(get_anomaly_monitor().alerts(st.session_state.data_source))
+            display_nps_overview(df)
+
+        with tab2:
+            display_metrics_details(df)
+
+        with tab3:
+            display_responses_details(df)
+
+        with tab4:
+            display_text_themes(df)
+
+        with tab5:
+            display_drilldown(df)
+
+        with tab6:
+            display_key_drivers(df)
+
+    with tab7:
         new_data_source = display_config_tab(st.session_state.data_source)
         if new_data_source != st.session_state.data_source:
             st.session_state.data_source = new_data_source
             st.rerun()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
+    # Après l'envoi de la page (écran de connexion compris) : le premier chargement des
+    # données et les précalculs ont lieu pendant la saisie des identifiants
+    start_background_services()
\ No newline at end of file
@@ -0,0 +1,235 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+def process_rss():
+    """Mémoire résidente (RSS) actuelle du processus, en octets (None si indisponible)."""
+    try:
+        with open('/proc/self/statm') as handle:
+            return int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Repli : pic de RSS (en Ko sous Linux, en octets sous macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _buffer_key(values):
+    """Identifie la zone mémoire d'un tableau pour ne pas compter deux fois les vues partagées."""
+    if isinstance(values, np.ndarray):
+        return ('buffer', values.__array_interface__['data'][0], values.nbytes)
+    return ('object', id(values))
+
+def _array_sizeof(values):
+    """Taille d'un tableau, chaînes et objets Python compris.
+
+    Calculée sans memory_usage(deep=True) de pandas, qui échoue sur les
+    tableaux d'objets en lecture seule du store.
+    """
+    if isinstance(values, np.ndarray) and values.dtype == object:
+        return values.nbytes + sum(sys.getsizeof(value) for value in values.ravel())
+    return int(getattr(values, 'nbytes', sys.getsizeof(values)))
+
+def _frame_sizeof(df, seen):
+    """Taille profonde d'un DataFrame, hors colonnes déjà comptées (vues partagées)."""
+    total = 0
+    if id(df.index) not in seen:
+        seen.add(id(df.index))
+        total += _array_sizeof(df.index.to_numpy())
+    for position in range(df.shape[1]):
+        values = df.iloc[:, position].to_numpy()
+        key = _buffer_key(values)
+        if key not in seen:
+            seen.add(key)
+            total += _array_sizeof(values)
+    return total
+
+def deep_sizeof(obj, seen=None, depth=0, max_depth=8):
+    """Estime la taille mémoire d'un objet et de son contenu (en octets).
+
+    Les objets et tableaux déjà rencontrés (ensemble seen) ne sont pas recomptés,
+    ce qui permet de mesurer les vues de session sans compter deux fois les
+    données partagées.
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen or depth > max_depth:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return _frame_sizeof(obj, seen)
+    if isinstance(obj, (pd.Series, pd.Index)):
+        key = _buffer_key(obj.to_numpy())
+        if key in seen:
+            return 0
+        seen.add(key)
+        return _array_sizeof(obj.to_numpy())
+    if isinstance(obj, np.ndarray):
+        key = _buffer_key(obj)
+        if key in seen:
+            return 0
+        seen.add(key)
+        return _array_sizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return sys.getsizeof(obj)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_sizeof(key, seen, depth + 1, max_depth) + deep_sizeof(value, seen, depth + 1, max_depth)
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        for item in obj:
+            size += deep_sizeof(item, seen, depth + 1, max_depth)
+    elif hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen, depth + 1, max_depth)
+    elif hasattr(obj, '__slots__'):
+        for name in obj.__slots__:
+            size += deep_sizeof(getattr(obj, name, None), seen, depth + 1, max_depth)
+    return size
+
+class MemorySampler:
+    """Relève périodiquement la RSS du processus (historique borné)."""
+
+    def __init__(self, interval=30, max_samples=240):
+        self.interval = interval
+        self._samples = deque(maxlen=max_samples)
+        self._thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            rss = process_rss()
+            if rss is not None:
+                self._samples.append((pd.Timestamp.now(), rss))
+            time.sleep(self.interval)
+
+    def history(self):
+        """Historique de la RSS sous forme de DataFrame (Heure, RSS en Mo)."""
+        samples = list(self._samples)
+        return pd.DataFrame({
+            'Heure': [timestamp for timestamp, _ in samples],
+            'RSS (Mo)': [rss / 1024 ** 2 for _, rss in samples]
+        })
+
+@st.cache_resource
+def get_memory_sampler():
+    """Retourne l'échantillonneur de mémoire partagé par le processus."""
+    return MemorySampler()
+
+def _state_snapshot(session):
+    """Copie de l'état d'une autre session, ou None s'il est modifié pendant la lecture.
+
+    L'état appartient au thread d'exécution de cette session : il n'est parcouru
+    qu'une fois, pour en prendre une copie, et les tailles sont mesurées sur la copie.
+    """
+    try:
+        return dict(session.session_state.filtered_state)
+    except (RuntimeError, KeyError):
+        return None
+
+def _list_sessions():
+    """Sessions Streamlit actives : (identifiant, état). Repli sur la session courante.
+
+    La liste des sessions passe par le gestionnaire de sessions du runtime, qui
+    n'est pas une API publique de Streamlit : s'il n'est pas disponible, seule la
+    session courante est mesurée.
+    """
+    current = [("session courante", {key: st.session_state[key] for key in st.session_state})]
+    try:
+        from streamlit import runtime
+        sessions = runtime.get_instance()._session_mgr.list_sessions()
+    except (AttributeError, RuntimeError) as e:
+        print(f"DEBUG - Sessions actives non disponibles ({e}), mesure de la session courante seule")
+        return current
+
+    snapshots = []
+    for info in sessions:
+        try:
+            session_id, state = info.session.id, _state_snapshot(info.session)
+        except AttributeError as e:
+            print(f"DEBUG - Sessions actives non disponibles ({e}), mesure de la session courante seule")
+            return current
+        if state is None:
+            print(f"DEBUG - État de la session {session_id} modifié pendant la lecture, ignoré")
+            continue
+        snapshots.append((session_id, state))
+    return snapshots
+
+def memory_consumers(store, extra=None):
+    """Liste les consommateurs de mémoire, du plus gros au plus petit.
+
+    Les données partagées du store sont comptées en premier : les vues des
+    sessions ne comptent ensuite que ce qu'elles ajoutent en propre.
+    """
+    seen = set()
+    consumers = []
+
+    for version, entry in store.entries():
+        consumers.append({
+            'composant': 'Données partagées',
+            'detail': f"version {version} ({len(entry.df)} lignes, {entry.refcount} sessions)",
+            'octets': deep_sizeof(entry.df, seen)
+        })
+        for key, value in list(entry.derived.items()):
+            label = key[0] if isinstance(key, tuple) else key
+            consumers.append({
+                'composant': 'Résultats dérivés',
+                'detail': f"{label} - version {version}",
+                'octets': deep_sizeof(value, seen)
+            })
+
+    for name, obj in (extra or {}).items():
+        consumers.append({'composant': 'Cache', 'detail': name, 'octets': deep_sizeof(obj, seen)})
+
+    for session_id, state in _list_sessions():
+        consumers.append({'composant': 'Session', 'detail': str(session_id), 'octets': deep_sizeof(state, seen)})
+
+    return sorted(consumers, key=lambda row: row['octets'], reverse=True)
+
+def _format_bytes(size):
+    """Formate une taille en octets (Ko, Mo, Go)."""
+    for unit in ('o', 'Ko', 'Mo'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'o' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} Go"
+
+def display_memory_report(top=15):
+    """Affiche la mémoire du processus et les principaux consommateurs (vue administrateur)."""
+    from dataset_store import get_dataset_store
+    from text_analytics import get_comment_cache
+    from anomaly_monitor import get_anomaly_monitor
+
+    consumers = memory_consumers(get_dataset_store(), extra={
+        'Commentaires analysés': get_comment_cache(),
+        'Surveillance des anomalies': get_anomaly_monitor()
+    })
+    rss = process_rss()
+    shared = sum(row['octets'] for row in consumers if row['composant'] == 'Données partagées')
+    sessions = [row for row in consumers if row['composant'] == 'Session']
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("RSS du processus", _format_bytes(rss) if rss is not None else "N/A")
+    col2.metric("Données partagées", _format_bytes(shared))
+    col3.metric("Sessions actives", len(sessions))
+
+    history = get_memory_sampler().history()
+    if len(history) > 1:
+        st.line_chart(history, x='Heure', y='RSS (Mo)')
+
+    table = pd.DataFrame(consumers[:top])
+    if not table.empty:
+        table['Taille'] = table['octets'].map(_format_bytes)
+        st.dataframe(
+            table[['composant', 'detail', 'Taille']].rename(columns={'composant': 'Composant', 'detail': 'Détail'}),
+            use_container_width=True,
+            hide_index=True
+        )
@@ -0,0 +1,76 @@
+import streamlit as st
+import plotly.graph_objects as go
+from drilldown import available_dimensions, available_measures, cached_drilldown, default_query
+
+def select_query(df):
+    """Sélecteurs des axes et mesures ; df ne sert qu'à connaître les colonnes disponibles."""
+    dimension_names = list(available_dimensions(df).keys())
+    measure_names = available_measures(df)
+    default_dimensions, default_measures = default_query(df)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        dimensions = st.multiselect(
+            "Axes d'analyse",
+            dimension_names,
+            default=default_dimensions,
+            max_selections=3,
+            key="drilldown_dimensions"
+        )
+    with col2:
+        measures = st.multiselect(
+            "Mesures",
+            measure_names,
+            default=default_measures,
+            key="drilldown_measures"
+        )
+    return dimensions, measures
+
+def display_drilldown_result(result, dimensions, measures):
+    """Affiche le résultat d'une analyse par segment (graphique si un seul axe, puis tableau)."""
+    if result.empty:
+        st.info("Aucune donnée pour cette combinaison")
+        return
+
+    # Graphique lorsque l'analyse porte sur un seul axe
+    if len(dimensions) == 1:
+        chart_measure = st.selectbox(
+            "Mesure affichée",
+            measures,
+            index=measures.index("NPS") if "NPS" in measures else 0,
+            key="drilldown_chart_measure"
+        )
+        fig = go.Figure(go.Bar(
+            x=result[dimensions[0]].astype(str),
+            y=result[chart_measure],
+            marker_color='rgb(52, 152, 219)',
+            text=result[chart_measure],
+            textposition='outside'
+        ))
+        fig.update_layout(
+            height=400,
+            margin=dict(l=20, r=20, t=30, b=20),
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)')
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(result, use_container_width=True, hide_index=True)
+
+def display_drilldown(df):
+    """Affiche l'analyse par segment (axes et mesures au choix)."""
+    st.header("Analyse par segment")
+
+    dimensions, measures = select_query(df)
+    if not measures:
+        st.info("Sélectionnez au moins une mesure")
+        return
+
+    result = cached_drilldown(
+        st.session_state.get('dataset_version'),
+        tuple(dimensions),
+        tuple(measures),
+        df
+    )
+    display_drilldown_result(result, dimensions, measures)
@@ -0,0 +1,78 @@
+import streamlit as st
+import plotly.graph_objects as go
+from key_drivers import OVERALL_PERIOD, cached_key_drivers
+
+def display_key_drivers(df):
+    """Affiche les facteurs clés : poids de chaque service sur le NPS et le réabonnement."""
+    st.header("Facteurs clés")
+
+    drivers = cached_key_drivers(st.session_state.get('dataset_version'), df)
+    if drivers.empty:
+        st.info("Pas assez de réponses pour analyser les facteurs clés")
+        return
+
+    periods = drivers['Période'].unique().tolist()
+    # Ensemble de la période en premier, puis les mois du plus récent au plus ancien
+    period_options = [OVERALL_PERIOD] + sorted((p for p in periods if p != OVERALL_PERIOD), reverse=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        target = st.selectbox("Indicateur expliqué", drivers['Cible'].unique().tolist(), key="drivers_target")
+    with col2:
+        period = st.selectbox("Période analysée", [p for p in period_options if p in periods], key="drivers_period")
+
+    selection = drivers[(drivers['Cible'] == target) & (drivers['Période'] == period)].sort_values('Coefficient')
+    if selection.empty:
+        st.info("Pas assez de réponses sur cette période")
+        return
+
+    st.caption(
+        f"{selection['Réponses'].iloc[0]} réponses - part expliquée (R²) : {selection['R²'].iloc[0]:.0%}. "
+        "Coefficients standardisés d'une régression ridge sur l'ensemble des services : "
+        "variation de l'indicateur (en écarts-types) pour un écart-type de satisfaction en plus."
+    )
+
+    fig = go.Figure(go.Bar(
+        x=selection['Coefficient'],
+        y=selection['Service'],
+        orientation='h',
+        marker_color=['rgb(36, 161, 88)' if value >= 0 else 'rgb(176, 52, 40)' for value in selection['Coefficient']],
+        customdata=selection[['Corrélation', 'Catégorie']],
+        hovertemplate="%{y} (%{customdata[1]})<br>Coefficient : %{x:.3f}<br>Corrélation : %{customdata[0]:.3f}<extra></extra>"
+    ))
+    fig.update_layout(
+        height=max(300, 28 * len(selection)),
+        margin=dict(l=20, r=20, t=30, b=20),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        xaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)', zeroline=True)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Évolution mensuelle des coefficients
+    monthly = drivers[(drivers['Cible'] == target) & (drivers['Période'] != OVERALL_PERIOD)]
+    if monthly['Période'].nunique() > 1:
+        st.subheader("Évolution mensuelle")
+        matrix = monthly.pivot(index='Service', columns='Période', values='Coefficient')
+        matrix = matrix.reindex(selection['Service'][::-1])
+        heatmap = go.Figure(go.Heatmap(
+            z=matrix.values,
+            x=matrix.columns,
+            y=matrix.index,
+            colorscale='RdYlGn',
+            zmid=0,
+            hovertemplate="%{y} - %{x}<br>Coefficient : %{z:.3f}<extra></extra>"
+        ))
+        heatmap.update_layout(
+            height=max(300, 28 * len(matrix)),
+            margin=dict(l=20, r=20, t=30, b=20),
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)'
+        )
+        st.plotly_chart(heatmap, use_container_width=True)
+
+    st.dataframe(
+        selection.sort_values('Coefficient', ascending=False)[['Service', 'Catégorie', 'Corrélation', 'Coefficient']],
+        use_container_width=True,
+        hide_index=True
+    )
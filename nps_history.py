@@ -0,0 +1,148 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from datetime import timedelta
+from config import DEFAULT_SETTINGS
+from category_scores import PERIODS, PERIOD_LABELS
+from daily_index import month_over_month
+from out_of_core import monthly_nps, satisfaction_table
+from nps_overview import COLORS
+from nps_metrics import display_period_comparison
+from nps_drilldown import display_drilldown_result, select_query
+from nps_responses import CARD_STYLE, render_cards_html
+from response_details import ResponseDetails
+
+def display_history_overview(history):
+    """Vue d'ensemble NPS calculée par blocs depuis l'historique sur disque."""
+    st.header("Vue d'ensemble NPS")
+    st.caption(f"Historique sur disque : {history.count()} réponses, agrégées par blocs")
+
+    index = history.daily_index()
+    if not index.n_days:
+        st.warning("Aucune donnée n'est disponible.")
+        return
+
+    current, previous = month_over_month(index.last_day())
+    current_nps, current_count = index.nps(*current)
+    previous_nps, _ = index.nps(*previous)
+    overall_nps, overall_count = index.nps()
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric(
+        "NPS ce mois-ci",
+        f"{current_nps:.0f}%" if not np.isnan(current_nps) else "Non disponible",
+        f"{current_nps - previous_nps:+.0f}%" if not np.isnan(current_nps - previous_nps) else None
+    )
+    col2.metric("Réponses ce mois-ci", current_count)
+    col3.metric("NPS sur l'historique", f"{overall_nps:.0f}%" if overall_count else "Non disponible")
+
+    monthly = monthly_nps(index)
+    fig = go.Figure()
+    for category in ['Détracteur', 'Passif', 'Promoteur']:
+        fig.add_trace(go.Bar(
+            name=category,
+            x=monthly['Mois'],
+            y=monthly[category],
+            marker_color=COLORS[category],
+            hovertemplate=f"Mois: %{{x}}<br>{category}s: %{{y}}<br><extra></extra>"
+        ))
+    fig.add_trace(go.Scatter(
+        x=monthly['Mois'],
+        y=monthly['NPS'],
+        mode='lines+text',
+        name='NPS',
+        yaxis='y2',
+        line=dict(color='white', width=2),
+        text=[f"{int(x)}%" if pd.notna(x) else "N/A" for x in monthly['NPS']],
+        textposition='top center',
+        hovertemplate="NPS: %{text}<br><extra></extra>"
+    ))
+    fig.update_layout(
+        barmode='stack',
+        title="Évolution mensuelle des réponses",
+        height=400,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        xaxis=dict(showgrid=False),
+        yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)'),
+        yaxis2=dict(overlaying='y', side='right', showgrid=False, range=[-100, 100])
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.markdown("### Détail mensuel")
+    st.dataframe(
+        monthly.style.format({'NPS': '{:.1f}'}, na_rep="-"),
+        use_container_width=True,
+        hide_index=True
+    )
+
+def display_history_metrics(history):
+    """Moyennes et répartition des notes de satisfaction, depuis les cumuls journaliers."""
+    st.header("Détails des métriques de satisfaction")
+
+    index = history.daily_index()
+    if not index.n_days:
+        st.warning("Aucune donnée n'est disponible.")
+        return
+
+    periode = st.selectbox("Période", list(PERIOD_LABELS), key="history_metrics_period")
+    days = PERIODS[PERIOD_LABELS[periode]]
+    start = None if days is None else index.last_day() - timedelta(days=days)
+
+    nps, count = index.nps(start)
+    col1, col2 = st.columns(2)
+    col1.metric("NPS de la période", f"{nps:.0f}%" if count else "Non disponible")
+    col2.metric("Réponses notées", count)
+
+    table = satisfaction_table(index, start)
+    if table.empty:
+        st.info("Aucune note de satisfaction sur cette période")
+    else:
+        # Tendance : moyenne du mois en cours comparée à celle du mois précédent
+        current, previous = month_over_month(index.last_day())
+        table['Tendance (m-1)'] = [
+            index.mean(metric, *current) - index.mean(metric, *previous) for metric in table['Métrique']
+        ]
+        st.dataframe(
+            table.drop(columns=['Métrique']).style.format({
+                'Moyenne': '{:.2f}',
+                'Satisfaits': '{:.1f}%',
+                'Neutres': '{:.1f}%',
+                'Insatisfaits': '{:.1f}%',
+                'Tendance (m-1)': '{:+.2f}'
+            }, na_rep="-"),
+            use_container_width=True,
+            hide_index=True
+        )
+
+    display_period_comparison(index)
+
+def display_history_responses(history):
+    """Réponses de l'historique, lues page par page (des plus récentes aux plus anciennes)."""
+    st.header("Détails des réponses")
+    st.markdown(CARD_STYLE, unsafe_allow_html=True)
+
+    page_size = DEFAULT_SETTINGS['reponses_par_page']
+    total = history.count()
+    if not total:
+        st.info("Aucune réponse")
+        return
+    page_count = (total + page_size - 1) // page_size
+    page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1, key="history_page")
+
+    responses, total = history.page(page_size, (page - 1) * page_size)
+    first = (page - 1) * page_size + 1
+    st.caption(f"Réponses {first} à {first + len(responses) - 1} sur {total}")
+    st.markdown(render_cards_html(ResponseDetails(responses), range(len(responses))), unsafe_allow_html=True)
+
+def display_history_drilldown(history):
+    """Analyse par segment, agrégée par blocs depuis l'historique sur disque."""
+    st.header("Analyse par segment")
+
+    dimensions, measures = select_query(history.schema())
+    if not measures:
+        st.info("Sélectionnez au moins une mesure")
+        return
+
+    display_drilldown_result(history.drilldown(dimensions, measures), dimensions, measures)
@@ -3,6 +3,9 @@ import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from config import METRIC_STRUCTURE, SCORE_COLORS
+from category_scores import PERIOD_LABELS, cached_category_scores
+from daily_index import get_daily_index, month_over_month, previous_period, same_period_last_year
+from time_index import last_date, slice_since
 
 def get_service_name(col):
     """Obtient le nom du service à partir de la colonne en utilisant METRIC_STRUCTURE."""
@@ -18,49 +21,6 @@ def get_metric_category(metric_name):
             return category
     return None
 
-def calculate_category_scores(df, period='all'):
-    """Calcule les scores moyens par catégorie pour une période donnée."""
-    print("DEBUG - Début calculate_category_scores")
-    print(f"DEBUG - Colonnes disponibles: {df.columns.tolist()}")
-    category_scores = {}
-    
-    # Filtrer les données selon la période si nécessaire
-    if period != 'all':
-        current_date = df['Date'].max()
-        if period == 'last_month':
-            df = df[df['Date'] >= (current_date - timedelta(days=30))]
-        elif period == 'last_quarter':
-            df = df[df['Date'] >= (current_date - timedelta(days=90))]
-        elif period == 'last_year':
-            df = df[df['Date'] >= (current_date - timedelta(days=365))]
-
-    # Calculer les scores pour chaque catégorie
-    for category, details in METRIC_STRUCTURE.items():
-        print(f"DEBUG - Traitement de la catégorie: {category}")
-        metrics = details['metrics'].keys()
-        print(f"DEBUG - Métriques recherchées: {list(metrics)}")
-        scores = []
-        for metric in metrics:
-            if metric in df.columns:
-                avg_score = df[metric].mean()
-                if not pd.isna(avg_score):
-                    scores.append(avg_score)
-                print(f"DEBUG - Métrique {metric}: score moyen = {avg_score}")
-            else:
-                print(f"DEBUG - Métrique {metric} non trouvée dans les colonnes")
-        
-        if scores:
-            category_scores[category] = {
-                'mean': sum(scores) / len(scores),
-                'metrics': {metric: df[metric].mean() for metric in metrics if metric in df.columns},
-                'count': len(df),
-                'color': details['color']
-            }
-            print(f"DEBUG - Score final pour {category}: {category_scores[category]['mean']}")
-    
-    print("DEBUG - Scores par catégorie:", category_scores)
-    return category_scores
-
 def get_score_color(score):
     """Détermine la couleur en fonction du score."""
     if pd.isna(score):
@@ -76,8 +36,12 @@ def get_score_color(score):
     else:
         return SCORE_COLORS['bad']
 
-def calculate_satisfaction_stats(df, column):
-    """Calcule les statistiques de satisfaction pour une colonne donnée."""
+def calculate_satisfaction_stats(df, column, index):
+    """Calcule les statistiques de satisfaction pour une colonne donnée.
+
+    index : cumuls journaliers de la version de données (get_daily_index),
+    servant à la tendance.
+    """
     stats = {}
     
     try:
@@ -86,12 +50,10 @@ def calculate_satisfaction_stats(df, column):
         # Moyenne
         stats['moyenne'] = numeric_data.mean()
         
-        # Tendance (m-1)
-        current_month = df['Date'].max().replace(day=1)
-        last_month = current_month - timedelta(days=1)
-        current_mean = df[df['Date'] >= current_month][column].mean()
-        previous_mean = df[(df['Date'] >= last_month) & 
-                         (df['Date'] < current_month)][column].mean()
+        # Tendance (m-1) : deux lectures des cumuls journaliers
+        current, previous = month_over_month(last_date(df))
+        current_mean = index.mean(column, *current)
+        previous_mean = index.mean(column, *previous)
         stats['tendance'] = current_mean - previous_mean if not pd.isna(previous_mean) else 0
         
         # Distribution par catégorie
@@ -115,14 +77,14 @@ def calculate_satisfaction_stats(df, column):
     
     return stats
 
-def get_top_flop_services(df):
-    """Calcule les services avec leur performance."""
+def get_top_flop_services(df, index):
+    """Calcule les services avec leur performance (index : cumuls journaliers de la version)."""
     resultats = []
     
     try:
         for col in df.columns:
             if 'Satisfaction_' in col:
-                stats = calculate_satisfaction_stats(df, col)
+                stats = calculate_satisfaction_stats(df, col, index)
                 
                 if stats['nb_reponses'] > 0:
                     service_name = get_service_name(col)
@@ -183,8 +145,8 @@ def calculate_global_nps(df):
     detracteurs = (df['Recommandation'] <= 6).sum()
     
     # Calcul du score de réabonnement moyen
-    reabo_score = pd.to_numeric(df['ProbabiliteReabo'], errors='coerce').mean()
-    reabo_reponses = pd.to_numeric(df['ProbabiliteReabo'], errors='coerce').notna().sum()
+    reabo_score = df['ProbabiliteReabo'].mean()
+    reabo_reponses = df['ProbabiliteReabo'].notna().sum()
     
     nps = ((promoteurs - detracteurs) / total_reponses) * 100
     return round(nps), total_reponses, round(reabo_score, 1), reabo_reponses
@@ -207,6 +169,74 @@ def get_nps_label(score):
     else:
         return "À améliorer"
 
+# Périodes de référence proposées pour la comparaison
+REFERENCE_PERIODS = {
+    "Même période l'an dernier": same_period_last_year,
+    "Période précédente": previous_period,
+}
+
+def _date_range(value):
+    """Bornes [start, end) d'une plage choisie dans un st.date_input (None si incomplète)."""
+    if not isinstance(value, (tuple, list)) or len(value) != 2:
+        return None
+    return pd.Timestamp(value[0]), pd.Timestamp(value[1]) + pd.Timedelta(days=1)
+
+def display_period_comparison(index):
+    """Compare deux périodes au choix à partir des cumuls journaliers."""
+    if not index.n_days:
+        return
+    first_day, last_day = index.first_day().date(), index.last_day().date()
+
+    with st.expander("Comparer deux périodes"):
+        col1, col2 = st.columns(2)
+        with col1:
+            current = _date_range(st.date_input(
+                "Période analysée",
+                value=(max(first_day, last_day - timedelta(days=6)), last_day),
+                min_value=first_day,
+                max_value=last_day,
+                key="compare_current"
+            ))
+        with col2:
+            reference_mode = st.selectbox(
+                "Comparer à",
+                list(REFERENCE_PERIODS) + ["Dates personnalisées"],
+                key="compare_reference_mode"
+            )
+            if reference_mode == "Dates personnalisées":
+                reference = _date_range(st.date_input(
+                    "Période de référence",
+                    value=(first_day, min(last_day, first_day + timedelta(days=6))),
+                    min_value=first_day,
+                    max_value=last_day,
+                    key="compare_reference"
+                ))
+            elif current is not None:
+                reference = REFERENCE_PERIODS[reference_mode](*current)
+            else:
+                reference = None
+
+        if current is None or reference is None:
+            st.info("Choisissez le début et la fin de chaque période")
+            return
+
+        comparison = index.compare(current, reference, labels={
+            'Recommandation': "Recommandation",
+            'ProbabiliteReabo': "Prob. réabonnement",
+            **{col: get_service_name(col) for col in index.columns if col.startswith('Satisfaction_')}
+        })
+        st.caption(
+            f"Référence : du {reference[0]:%d/%m/%Y} au {reference[1] - pd.Timedelta(days=1):%d/%m/%Y}"
+        )
+        st.dataframe(
+            comparison.style.format(
+                {'Période': '{:.2f}', 'Référence': '{:.2f}', 'Écart': '{:+.2f}'},
+                na_rep="-"
+            ),
+            use_container_width=True,
+            hide_index=True
+        )
+
 def display_metrics_details(df):
     """Affiche les détails des métriques de satisfaction."""
     # Modifier cette partie au début de display_metrics_details
@@ -233,16 +263,16 @@ def display_metrics_details(df):
     st.markdown("<br>", unsafe_allow_html=True)  # Ajouter un peu d'espace
         
     # Filtrage des données
-    filtered_df = df.copy()
+    filtered_df = df
     if periode != "Tout":
-        current_date = df['Date'].max()
+        current_date = last_date(df)
         if periode == "Dernier mois":
             start_date = current_date - timedelta(days=30)
         elif periode == "Dernier trimestre":
             start_date = current_date - timedelta(days=90)
         else:
             start_date = current_date - timedelta(days=365)
-        filtered_df = df[df['Date'] >= start_date]
+        filtered_df = slice_since(df, start_date)
 
     # Calcul et affichage des métriques globales
     nps_score, total_reponses, reabo_score, reabo_reponses = calculate_global_nps(filtered_df)
@@ -293,12 +323,16 @@ def display_metrics_details(df):
             unsafe_allow_html=True
         )
 
+    # Cumuls journaliers de la version de données : tendances et comparaisons en temps constant
+    daily_index = get_daily_index(st.session_state.get('dataset_version'), df)
+    display_period_comparison(daily_index)
+
     st.markdown("---")
 
     try:
         if view_mode == "Vue classique":
             # Récupération des top/flop services
-            top_3, flop_3 = get_top_flop_services(filtered_df)
+            top_3, flop_3 = get_top_flop_services(filtered_df, daily_index)
             
             # Affichage Top/Flop en colonnes avec centrage
             col1, col2 = st.columns(2)
@@ -355,7 +389,7 @@ def display_metrics_details(df):
             all_services_stats = []
             for col in filtered_df.columns:
                 if 'Satisfaction_' in col:
-                    stats = calculate_satisfaction_stats(filtered_df, col)
+                    stats = calculate_satisfaction_stats(filtered_df, col, daily_index)
                     if stats['nb_reponses'] > 0:
                         service_name = get_service_name(col)
                         all_services_stats.append({
@@ -477,44 +511,46 @@ def display_metrics_details(df):
             st.plotly_chart(fig_stack, use_container_width=True)
 
         else:  # Vue par catégorie
-            # Calcul des scores par catégorie
-            current_scores = calculate_category_scores(filtered_df)
-            
+            # Scores de toutes les périodes calculés ensemble, une fois par version de données
+            scores = cached_category_scores(st.session_state.get('dataset_version'), df)
+            scores = scores[scores['Période'] == PERIOD_LABELS[periode]]
+
             # Affichage des catégories
             st.markdown("### Vue par catégories")
-            
+
             # Création d'une grille de catégories
             cols = st.columns(len(METRIC_STRUCTURE))
-            
-            for idx, (category, details) in enumerate(METRIC_STRUCTURE.items()):
-                if category in current_scores:
-                    score_info = current_scores[category]
-                    with cols[idx]:
-                        st.markdown(f"""
-                            <div style='padding: 15px; border-radius: 5px; 
-                                background-color: {details["color"]}15;'>
-                                <h4 style='color: {details["color"]};'>{details['label']}</h4>
-                                <h2 style='text-align: center;'>{score_info['mean']:.1f}/5</h2>
-                                <p style='text-align: center; font-size: 0.8em;'>
-                                    {score_info['count']} réponses
-                                </p>
-                            </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Affichage des métriques détaillées de la catégorie
-                        for metric, score in score_info['metrics'].items():
-                            if not pd.isna(score):
-                                metric_name = METRIC_STRUCTURE[category]['metrics'][metric]
-                                st.markdown(f"""
-                                    <div style='padding: 8px; margin: 5px 0; 
-                                        background-color: {get_score_color(score)}15;
-                                        border-radius: 3px;'>
-                                        <div style='font-size: 0.9em;'>{metric_name}</div>
-                                        <div style='font-size: 1.1em; font-weight: bold;'>
-                                            {score:.1f}
-                                        </div>
+
+            for idx, category in enumerate(METRIC_STRUCTURE):
+                rows = scores[scores['Catégorie'] == category]
+                if rows.empty:
+                    continue
+                first = rows.iloc[0]
+                with cols[idx]:
+                    st.markdown(f"""
+                        <div style='padding: 15px; border-radius: 5px; 
+                            background-color: {first['Couleur']}15;'>
+                            <h4 style='color: {first['Couleur']};'>{first['Libellé']}</h4>
+                            <h2 style='text-align: center;'>{first['Score catégorie']:.1f}/5</h2>
+                            <p style='text-align: center; font-size: 0.8em;'>
+                                {first['Réponses']} réponses
+                            </p>
+                        </div>
+                    """, unsafe_allow_html=True)
+
+                    # Affichage des métriques détaillées de la catégorie
+                    for service, score in zip(rows['Service'], rows['Score']):
+                        if not pd.isna(score):
+                            st.markdown(f"""
+                                <div style='padding: 8px; margin: 5px 0; 
+                                    background-color: {get_score_color(score)}15;
+                                    border-radius: 3px;'>
+                                    <div style='font-size: 0.9em;'>{service}</div>
+                                    <div style='font-size: 1.1em; font-weight: bold;'>
+                                        {score:.1f}
                                     </div>
-                                """, unsafe_allow_html=True)
+                                </div>
+                            """, unsafe_allow_html=True)
 
     except Exception as e:
         print(f"DEBUG - Erreur dans display_metrics_details:", str(e))
@@ -1,7 +1,10 @@
 import pandas as pd
+import numpy as np
 import streamlit as st
 import plotly.graph_objects as go
 from datetime import datetime
+from config import DEFAULT_SETTINGS
+from trends import DEFAULT_WINDOWS, GRANULARITIES, ROLLING_WINDOWS, cached_nps_series, downsample
 
 # Couleurs pour les catégories de NPS
 COLORS = {
@@ -18,42 +21,6 @@ def debug_dataframe(df, location):
     if 'Recommandation' in df.columns:
         st.sidebar.write("Plage de recommandations:", df['Recommandation'].min(), "à", df['Recommandation'].max())
 
-def standardize_categories(df):
-    """Standardise les catégories dans le DataFrame."""
-    if 'Recommandation' not in df.columns:
-        return df
-        
-    category_mapping = {
-        'Promoter': 'Promoteur',
-        'Passive': 'Passif',
-        'Detractor': 'Détracteur',
-        'Promoteurs': 'Promoteur',
-        'Passifs': 'Passif',
-        'Détracteurs': 'Détracteur'
-    }
-    
-    # Si la colonne Catégorie n'existe pas, la créer
-    if 'Catégorie' not in df.columns:
-        df['Catégorie'] = df['Recommandation'].apply(get_nps_category)
-    
-    # Standardiser les catégories existantes
-    df['Catégorie'] = df['Catégorie'].replace(category_mapping)
-    
-    return df
-
-def get_nps_category(score):
-    """Détermine la catégorie NPS basée sur le score."""
-    try:
-        score = float(score)
-        if score >= 9:
-            return "Promoteur"
-        elif score >= 7:
-            return "Passif"
-        else:
-            return "Détracteur"
-    except (ValueError, TypeError):
-        return "Inconnu"
-
 def calculate_nps(data, target_month):
     """Calcule le NPS pour un mois spécifique."""
     # Convertir target_month en Period s'il ne l'est pas déjà
@@ -75,6 +42,68 @@ def calculate_nps(data, target_month):
     nps_score = ((len(promoteurs) - len(detracteurs)) / len(month_data)) * 100
     return nps_score
 
+def display_anomaly_alerts(alerts):
+    """Affiche les baisses significatives détectées sur la dernière période."""
+    for alert in alerts:
+        unit = " pts" if alert['indicateur'] == 'NPS' else "/5"
+        st.error(
+            f"⚠️ Baisse significative ({alert['granularite'].lower()}, {alert['periode']}) - "
+            f"{alert['indicateur']} : {alert['valeur']}{unit} contre {alert['reference']}{unit} "
+            f"sur les périodes précédentes"
+        )
+
+def display_nps_trend(df, granularity):
+    """Affiche la tendance NPS journalière ou hebdomadaire sur une fenêtre glissante.
+
+    L'agrégation est faite côté serveur et la courbe est réduite à
+    points_max_graphique points, quelle que soit la profondeur d'historique.
+    """
+    unit = "jours" if granularity == "Journalier" else "semaines"
+    window = st.select_slider(
+        f"Fenêtre glissante ({unit})",
+        options=ROLLING_WINDOWS[granularity],
+        value=DEFAULT_WINDOWS[granularity],
+        key=f"overview_window_{granularity}"
+    )
+
+    series = cached_nps_series(st.session_state.get('dataset_version'), df, GRANULARITIES[granularity], window)
+    if series.empty:
+        st.info("Aucune réponse à afficher")
+        return
+    points = downsample(series, 'NPS glissant', DEFAULT_SETTINGS['points_max_graphique'])
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=points.index,
+        y=points['Réponses glissantes'],
+        name='Réponses',
+        mode='lines',
+        fill='tozeroy',
+        line=dict(color='rgba(52, 152, 219, 0.6)', width=1),
+        yaxis='y2',
+        hovertemplate="%{x|%d/%m/%Y}<br>Réponses: %{y}<extra></extra>"
+    ))
+    fig.add_trace(go.Scatter(
+        x=points.index,
+        y=points['NPS glissant'],
+        name='NPS',
+        mode='lines',
+        line=dict(color='white', width=2),
+        hovertemplate="%{x|%d/%m/%Y}<br>NPS: %{y:.0f}%<extra></extra>"
+    ))
+    fig.update_layout(
+        title=f"Évolution du NPS ({granularity.lower()}, fenêtre de {window} {unit})",
+        showlegend=True,
+        height=400,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        xaxis=dict(showgrid=False),
+        yaxis=dict(title="NPS", showgrid=True, gridcolor='rgba(255,255,255,0.1)'),
+        yaxis2=dict(title="Réponses", overlaying='y', side='right', showgrid=False)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"{len(series)} périodes agrégées, {len(points)} points affichés")
+
 def display_nps_overview(df, seuil=35):
     """Affiche la vue d'ensemble du NPS."""
     st.header("Vue d'ensemble NPS")
@@ -83,11 +112,8 @@ def display_nps_overview(df, seuil=35):
         st.error("Aucune donnée disponible")
         return
 
-    # Standardisation des catégories
-    df = standardize_categories(df)
-    
     # Debug info
-    debug_dataframe(df, "After standardization")
+    debug_dataframe(df, "Données prétraitées")
 
     # Calculs des périodes
     valid_months = df.dropna(subset=['Recommandation']).groupby(df['Date'].dt.to_period("M")).size().index
@@ -129,59 +155,70 @@ def display_nps_overview(df, seuil=35):
         </div>
     """, unsafe_allow_html=True)
 
+    granularity = st.radio(
+        "Granularité",
+        list(GRANULARITIES.keys()),
+        horizontal=True,
+        key="overview_granularity"
+    )
+
     # Préparation des données pour le graphique
-    monthly_distribution = df[df['Date'].dt.to_period("M").isin(valid_months)].groupby(
-        [df['Date'].dt.to_period("M"), 'Catégorie']
+    valid_df = df[df['Date'].dt.to_period("M").isin(valid_months)]
+    monthly_distribution = valid_df.groupby(
+        [valid_df['Date'].dt.to_period("M"), 'Catégorie']
     ).size().unstack(fill_value=0)
     
     # Debug info
     st.sidebar.write("Colonnes dans monthly_distribution:", monthly_distribution.columns.tolist())
 
-    # Création du graphique
-    fig = go.Figure()
-
-    # Ajout des barres pour chaque catégorie
-    for category in ['Détracteur', 'Passif', 'Promoteur']:
-        if category in monthly_distribution.columns:
-            fig.add_trace(go.Bar(
-                name=category,
-                x=monthly_distribution.index.astype(str),  # Conversion en string pour l'affichage
-                y=monthly_distribution[category],
-                marker_color=COLORS[category],
-                hovertemplate=f"Mois: %{{x}}<br>{category}s: %{{y}}<br><extra></extra>"
-            ))
-
-    # Calcul et ajout de la ligne NPS
-    monthly_nps = pd.DataFrame({
-        'Mois': valid_months,
-        'NPS': [calculate_nps(df, month) for month in valid_months]
-    })
-
-    fig.add_trace(go.Scatter(
-        x=monthly_nps['Mois'].astype(str),  # Conversion en string pour l'affichage
-        y=monthly_nps['NPS'],
-        mode='lines+text',
-        name='NPS',
-        line=dict(color='white', width=2),
-        text=[f"{int(x)}%" if pd.notna(x) else "N/A" for x in monthly_nps['NPS']],
-        textposition='top center',
-        textfont=dict(size=14, color='white'),
-        hovertemplate="NPS: %{text}<br><extra></extra>"
-    ))
-
-    # Mise à jour du layout
-    fig.update_layout(
-        barmode='stack',
-        title="Évolution mensuelle des réponses",
-        showlegend=True,
-        height=400,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        xaxis=dict(showgrid=False),
-        yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)')
-    )
-
-    st.plotly_chart(fig, use_container_width=True)
+    if granularity != "Mensuel":
+        display_nps_trend(df, granularity)
+    else:
+        # Création du graphique
+        fig = go.Figure()
+
+        # Ajout des barres pour chaque catégorie
+        for category in ['Détracteur', 'Passif', 'Promoteur']:
+            if category in monthly_distribution.columns:
+                fig.add_trace(go.Bar(
+                    name=category,
+                    x=monthly_distribution.index.astype(str),  # Conversion en string pour l'affichage
+                    y=monthly_distribution[category],
+                    marker_color=COLORS[category],
+                    hovertemplate=f"Mois: %{{x}}<br>{category}s: %{{y}}<br><extra></extra>"
+                ))
+
+        # Calcul et ajout de la ligne NPS
+        monthly_nps = pd.DataFrame({
+            'Mois': valid_months,
+            'NPS': [calculate_nps(df, month) for month in valid_months]
+        })
+
+        fig.add_trace(go.Scatter(
+            x=monthly_nps['Mois'].astype(str),  # Conversion en string pour l'affichage
+            y=monthly_nps['NPS'],
+            mode='lines+text',
+            name='NPS',
+            line=dict(color='white', width=2),
+            text=[f"{int(x)}%" if pd.notna(x) else "N/A" for x in monthly_nps['NPS']],
+            textposition='top center',
+            textfont=dict(size=14, color='white'),
+            hovertemplate="NPS: %{text}<br><extra></extra>"
+        ))
+
+        # Mise à jour du layout
+        fig.update_layout(
+            barmode='stack',
+            title="Évolution mensuelle des réponses",
+            showlegend=True,
+            height=400,
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            xaxis=dict(showgrid=False),
+            yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)')
+        )
+
+        st.plotly_chart(fig, use_container_width=True)
 
     # Affichage des détails mensuels
     st.markdown("### Détail mensuel")
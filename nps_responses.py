@@ -1,14 +1,82 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+import hashlib
 import html
+import numpy as np
+from time_index import bounds_between, bounds_latest, ensure_time_index
+from row_selection import take_rows
+from bitmap_index import get_bitmap_index
+from export import EXPORT_FORMATS, ExportJob, iter_export, kpis_to_csv
+from config import DEFAULT_SETTINGS
+from response_details import NPS_CATEGORIES, ResponseDetails, get_response_details
 
-# Constants avec couleurs mises à jour
-NPS_CATEGORIES = {
-    "Promoteur": {"range": (9, 10), "color": "#24A158", "bg_color": "rgba(36, 161, 88, 0.1)"},
-    "Neutre": {"range": (7, 8), "color": "#F1C40F", "bg_color": "rgba(241, 196, 15, 0.1)"},
-    "Détracteur": {"range": (0, 6), "color": "#B03428", "bg_color": "rgba(176, 52, 40, 0.1)"}
+# Colonnes lues par les statistiques et par les cartes de réponse
+STATS_COLUMNS = ['Recommandation', 'ProbabiliteReabo']
+CARD_COLUMNS = [
+    'Date', 'Recommandation', 'Nom', 'Prenom', 'ProbabiliteReabo',
+    'PourquoiNote', 'PourquoiReabo', 'Ameliorations'
+]
+
+# Style des cartes de réponse
+CARD_STYLE = """
+<style>
+.metric-card {
+    background-color: rgba(255,255,255,0.05);
+    padding: 12px;
+    border-radius: 4px;
+    margin-bottom: 10px;
+}
+.response-card {
+    margin-bottom: 8px;
+    border-radius: 4px;
+    overflow: hidden;
+}
+.name-display {
+    white-space: nowrap;
+    overflow: hidden;
+    text-overflow: ellipsis;
+    max-width: 200px;
+}
+details.response-card {
+    padding: 12px;
+}
+details.response-card summary {
+    cursor: pointer;
+    display: flex;
+    align-items: center;
+}
+details.response-card .card-score {
+    margin-left: auto;
+}
+details.response-card .card-body {
+    margin-top: 12px;
 }
+.card-columns {
+    display: grid;
+    grid-template-columns: 1fr 1fr;
+    gap: 10px;
+}
+.card-comment {
+    font-style: italic;
+    font-size: 0.9em;
+    margin-top: 5px;
+}
+.metric-title {
+    font-weight: bold;
+    margin: 8px 0;
+}
+.metric-grid {
+    display: grid;
+    grid-template-columns: repeat(4, 1fr);
+    gap: 8px;
+    margin-bottom: 10px;
+}
+.metric-cell {
+    text-align: center;
+}
+</style>
+"""
 
 def get_nps_category(score):
     """Détermine la catégorie NPS et retourne les informations associées."""
@@ -21,17 +89,6 @@ def get_nps_category(score):
     except (ValueError, TypeError):
         return "Inconnu", "#95A5A6", "rgba(149, 165, 166, 0.1)"
 
-def format_satisfaction_metrics(row):
-    """Formate les métriques de satisfaction."""
-    metrics = []
-    for col in row.index:
-        if col.startswith('Satisfaction_') and pd.notna(row[col]):
-            name = col.replace('Satisfaction_', '').replace('_', ' ').title()
-            score = float(row[col])
-            color = "#24A158" if score == 5 else "#FFFFFF" if score == 4 else "#B03428"
-            metrics.append((name, score, color))
-    return sorted(metrics, key=lambda x: x[0])
-
 def calculate_stats(df):
     """Calcule les statistiques pour les données filtrées."""
     if df.empty:
@@ -42,67 +99,81 @@ def calculate_stats(df):
     detractors = (df['Recommandation'] <= 6).sum()
     nps_score = (promoters - detractors) / total * 100
     
-    reabo_mean = pd.to_numeric(df['ProbabiliteReabo'], errors='coerce').mean()
+    reabo_mean = df['ProbabiliteReabo'].mean()
     
     return round(nps_score), round(reabo_mean, 1) if pd.notna(reabo_mean) else 0, total
 
-def apply_filters(df, periode, search, types_avis):
-    """Applique les filtres aux données."""
-    try:
-        filtered_df = df.copy()
-        
-        # Filtre période
-        now = pd.Timestamp.now()
-        if periode == "10 derniers avis":
-            filtered_df = filtered_df.sort_values('Date', ascending=False).head(10)
-        else:
-            date_filters = {
-                "30 derniers jours": now - pd.Timedelta(days=30),
-                "3 derniers mois": now - pd.Timedelta(days=90),
-                "Cette année": pd.Timestamp(year=now.year, month=1, day=1),
-                "Tout": filtered_df['Date'].min()
-            }
-            if periode in date_filters:
-                filtered_df = filtered_df[filtered_df['Date'] >= date_filters[periode]]
-        
-        # Filtre recherche
-        if search:
-            search = search.lower()
-            name_mask = (
-                filtered_df['Nom'].str.lower().fillna('').str.contains(search, na=False) |
-                filtered_df['Prenom'].str.lower().fillna('').str.contains(search, na=False)
-            )
-            filtered_df = filtered_df[name_mask]
-        
-        # Filtre types d'avis
-        if types_avis:
-            mask = pd.Series(False, index=filtered_df.index)
-            for type_avis in types_avis:
-                category_info = NPS_CATEGORIES[type_avis.replace("s", "")]
-                min_score, max_score = category_info["range"]
-                mask |= filtered_df['Recommandation'].between(min_score, max_score)
-            filtered_df = filtered_df[mask]
-        
-        return filtered_df
+def period_bounds(df, periode):
+    """Retourne les positions [début, fin) de la période sur l'index temporel."""
+    now = pd.Timestamp.now()
+    if periode == "10 derniers avis":
+        return bounds_latest(df, 10)
+    date_filters = {
+        "30 derniers jours": now - pd.Timedelta(days=30),
+        "3 derniers mois": now - pd.Timedelta(days=90),
+        "Cette année": pd.Timestamp(year=now.year, month=1, day=1),
+        "Tout": None
+    }
+    return bounds_between(df, start=date_filters.get(periode))
+
+def _name_mask(df, start, stop, search):
+    """Lignes de [start, stop) dont le nom ou le prénom contient la recherche."""
+    search = search.lower()
+    name_mask = np.zeros(stop - start, dtype=bool)
+    for col in ('Nom', 'Prenom'):
+        if col in df.columns:
+            names = df[col].iloc[start:stop].str.lower().fillna('')
+            name_mask |= names.str.contains(search, na=False).to_numpy(dtype=bool)
+    return name_mask
+
+def _selected_scores(types_avis):
+    """Notes de recommandation couvertes par les types d'avis sélectionnés."""
+    scores = []
+    for type_avis in types_avis:
+        min_score, max_score = NPS_CATEGORIES[type_avis.replace("s", "")]["range"]
+        scores.extend(range(min_score, max_score + 1))
+    return scores
+
+def filter_rows(df, periode, search, types_avis, index=None):
+    """Calcule les positions des lignes retenues par les filtres, sans copier le DataFrame.
+
+    Seule la plage de la période est parcourue : sans filtre de type d'avis, ses
+    positions sont retenues directement ; sinon, les notes concernées sont lues
+    sur l'index bitmap de la version (get_bitmap_index), limité aux octets de la
+    plage, ou à défaut sur la colonne. La recherche par nom s'applique ensuite
+    aux positions retenues.
+    """
+    start, stop = period_bounds(df, periode)
     
-    except Exception as e:
-        st.error(f"Erreur lors du filtrage: {str(e)}")
-        return pd.DataFrame()
+    # Filtre types d'avis : union des notes concernées
+    if not types_avis:
+        rows = np.arange(start, stop)
+    elif index is None:
+        scores = df['Recommandation'].iloc[start:stop].isin(_selected_scores(types_avis))
+        rows = start + np.flatnonzero(scores.to_numpy(dtype=bool))
+    else:
+        bitmap = index.any_of('Recommandation', _selected_scores(types_avis), start, stop)
+        rows = index.positions(bitmap, start, stop)
+    
+    # Filtre recherche
+    if search:
+        rows = rows[_name_mask(df, start, stop, search)[rows - start]]
+    
+    return rows
 
-def display_response_card(row, is_new):
+def _html_text(text):
+    """Échappe un texte libre pour l'insérer dans un bloc HTML (une seule ligne, sans $)."""
+    return html.escape(text).replace('\n', '<br>').replace('$', '&#36;')
+
+def _quoted_comment(text):
+    """Commentaire entre guillemets, ou mention par défaut s'il est absent."""
+    return f'"{_html_text(text)}"' if text is not None else 'Pas de commentaire'
+
+def display_response_card(details, position, now):
     """Affiche une carte de réponse formatée."""
     try:
-        score = float(row['Recommandation'])
-        category, color, bg_color = get_nps_category(score)
-        
-        # Nettoyage et formatage sécurisé du nom
-        prenom = str(row.get('Prenom', '')).strip()
-        nom = str(row.get('Nom', '')).strip()
-        full_name = f"{prenom} {nom}".strip()
-        
-        # Formatage de la date
-        date_str = pd.to_datetime(row['Date']).strftime('%d/%m/%Y')
-        new_badge = '⭐ ' if is_new else ''
+        category, color, bg_color = details.style(position)
+        new_badge = '⭐ ' if details.is_new(position, now) else ''
         
         # Construction du composant avec Streamlit natif plutôt que HTML pur
         st.markdown(
@@ -114,13 +185,13 @@ def display_response_card(row, is_new):
             f'margin-bottom: 8px;">'
             f'<div style="display: flex; justify-content: space-between; align-items: center;">'
             f'<div>'
-            f'<span style="color: #888;">{date_str}</span>'
+            f'<span style="color: #888;">{details.date_label(position)}</span>'
             f'{new_badge}'
-            f'<span style="margin-left: 10px;">{html.escape(full_name)}</span>'
+            f'<span style="margin-left: 10px;">{html.escape(details.full_name(position))}</span>'
             f'</div>'
             f'<div>'
             f'<span style="color: {color};">{category}</span>'
-            f'<span style="margin-left: 10px; font-weight: bold; color: {color};">{int(score)}/10</span>'
+            f'<span style="margin-left: 10px; font-weight: bold; color: {color};">{details.score_text(details.recommandation[position])}/10</span>'
             f'</div>'
             f'</div>'
             f'</div>',
@@ -129,8 +200,9 @@ def display_response_card(row, is_new):
     except Exception as e:
         st.error(f"Erreur d'affichage de la carte: {str(e)}")
 
-def display_response_details(row, color):
+def display_response_details(details, position):
     """Affiche les détails d'une réponse."""
+    _, color, _ = details.style(position)
     with st.expander("Voir détails"):
         cols = st.columns([1, 1])
         
@@ -139,30 +211,27 @@ def display_response_details(row, color):
             st.markdown(f"""
                 <div class="metric-card">
                     <div style="color: #888;">Score NPS</div>
-                    <div style="font-size: 1.2em; color: {color};">{int(row['Recommandation'])}/10</div>
+                    <div style="font-size: 1.2em; color: {color};">{details.score_text(details.recommandation[position])}/10</div>
                     <div style="font-style: italic; font-size: 0.9em; margin-top: 5px;">
-                        {f'"{row["PourquoiNote"]}"' if pd.notna(row.get('PourquoiNote')) else 'Pas de commentaire'}
+                        {_quoted_comment(details.text('PourquoiNote', position))}
                     </div>
                 </div>
             """, unsafe_allow_html=True)
         
         # Réabonnement
         with cols[1]:
-            reabo_score = row.get('ProbabiliteReabo', 'N/A')
-            if pd.notna(reabo_score):
-                reabo_score = int(float(reabo_score))
             st.markdown(f"""
                 <div class="metric-card">
                     <div style="color: #888;">Réabonnement</div>
-                    <div style="font-size: 1.2em;">{reabo_score}/10</div>
+                    <div style="font-size: 1.2em;">{details.score_text(details.reabo[position])}/10</div>
                     <div style="font-style: italic; font-size: 0.9em; margin-top: 5px;">
-                        {f'"{row["PourquoiReabo"]}"' if pd.notna(row.get('PourquoiReabo')) else 'Pas de commentaire'}
+                        {_quoted_comment(details.text('PourquoiReabo', position))}
                     </div>
                 </div>
             """, unsafe_allow_html=True)
         
         # Métriques de satisfaction
-        if metrics := format_satisfaction_metrics(row):
+        if metrics := details.metrics(position):
             st.markdown("### Notes détaillées")
             metric_cols = st.columns(4)
             for i, (name, score, color) in enumerate(metrics):
@@ -170,45 +239,134 @@ def display_response_details(row, color):
                     st.markdown(f"""
                         <div style="text-align: center;">
                             <div style="color: #888;">{name}</div>
-                            <div style="font-size: 1.2em; color: {color};">{int(score)}/5</div>
+                            <div style="font-size: 1.2em; color: {color};">{score}/5</div>
                         </div>
                     """, unsafe_allow_html=True)
         
         # Améliorations suggérées
-        if pd.notna(row.get('Ameliorations')):
+        if (suggestion := details.text('Ameliorations', position)) is not None:
             st.markdown("""
                 <div class="metric-card">
                     <div style="color: #888;">Suggestions d'amélioration</div>
                     <div style="font-style: italic; color: white;">"{}"</div>
                 </div>
-            """.format(row['Ameliorations']), unsafe_allow_html=True)
+            """.format(_html_text(suggestion)), unsafe_allow_html=True)
+
+def render_card_html(details, position, now):
+    """HTML d'une carte de réponse, dépliable côté navigateur (bloc <details>)."""
+    category, color, bg_color = details.style(position)
+    score = details.score_text(details.recommandation[position])
+    new_badge = '⭐ ' if details.is_new(position, now) else ''
+    grid = details.metric_grid_html(position)
+    suggestion = details.text('Ameliorations', position)
+    return (
+        f'<details class="response-card" style="background-color: {bg_color}; border-left: 4px solid {color};">'
+        f'<summary><span style="color: #888;">{details.date_label(position)}</span>{new_badge}'
+        f'<span class="name-display" style="margin-left: 10px;">{_html_text(details.full_name(position))}</span>'
+        f'<span class="card-score"><span style="color: {color};">{category}</span>'
+        f'<span style="margin-left: 10px; font-weight: bold; color: {color};">{score}/10</span></span></summary>'
+        f'<div class="card-body"><div class="card-columns">'
+        f'<div class="metric-card"><div style="color: #888;">Score NPS</div>'
+        f'<div style="font-size: 1.2em; color: {color};">{score}/10</div>'
+        f'<div class="card-comment">{_quoted_comment(details.text("PourquoiNote", position))}</div></div>'
+        f'<div class="metric-card"><div style="color: #888;">Réabonnement</div>'
+        f'<div style="font-size: 1.2em;">{details.score_text(details.reabo[position])}/10</div>'
+        f'<div class="card-comment">{_quoted_comment(details.text("PourquoiReabo", position))}</div></div>'
+        f'</div>'
+        + (f'<div class="metric-title">Notes détaillées</div><div class="metric-grid">{grid}</div>' if grid else '')
+        + (f'<div class="metric-card"><div style="color: #888;">Suggestions d\'amélioration</div>'
+           f'<div style="font-style: italic;">"{_html_text(suggestion)}"</div></div>' if suggestion is not None else '')
+        + '</div></details>'
+    )
+
+def render_cards_html(details, positions, now=None):
+    """Construit le HTML d'une page de cartes de réponse à partir des détails précalculés."""
+    now = pd.Timestamp.now() if now is None else now
+    return ''.join(render_card_html(details, position, now) for position in positions)
+
+def display_response_page(details, rows):
+    """Affiche une page de réponses (de la plus récente à la plus ancienne)."""
+    page_size = DEFAULT_SETTINGS['reponses_par_page']
+    page_count = max((len(rows) + page_size - 1) // page_size, 1)
+    page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1, key="responses_page") if page_count > 1 else 1
+
+    # Les positions sont chronologiques : la page 1 correspond à la fin du tableau
+    stop = len(rows) - (page - 1) * page_size
+    start = max(stop - page_size, 0)
+    positions = rows[start:stop][::-1]
+    st.caption(f"Réponses {len(rows) - stop + 1} à {len(rows) - start} sur {len(rows)}")
+
+    now = pd.Timestamp.now()
+    if DEFAULT_SETTINGS['rendu_cartes'] == 'widgets':
+        for position in positions:
+            display_response_card(details, position, now)
+            display_response_details(details, position)
+    else:
+        # Toute la page en un seul élément
+        st.markdown(render_cards_html(details, positions, now), unsafe_allow_html=True)
+
+def display_export(df, rows, columns, kpis):
+    """Affiche l'export des réponses filtrées et des indicateurs."""
+    with st.expander("📥 Exporter les réponses filtrées"):
+        export_format = st.selectbox("Format", list(EXPORT_FORMATS.keys()), key="export_format")
+        file_info = EXPORT_FORMATS[export_format]
+        
+        # Un export préparé pour un autre format, d'autres filtres ou d'autres données est abandonné
+        signature = (
+            export_format,
+            st.session_state.get('dataset_version'),
+            hashlib.blake2b(np.ascontiguousarray(rows)).hexdigest()
+        )
+        job = st.session_state.get('export_job')
+        if job is not None and st.session_state.get('export_signature') != signature:
+            job.discard()
+            job = st.session_state.export_job = None
+        
+        # Le fichier n'est généré qu'à la demande, bloc par bloc, hors du script de la session
+        if st.button("Préparer l'export"):
+            if job is not None:
+                job.discard()
+            job = st.session_state.export_job = ExportJob(
+                iter_export(export_format, df, rows, columns, kpis),
+                suffix=f".{file_info['extension']}"
+            )
+            st.session_state.export_signature = signature
+            st.session_state.export_stem = f"reponses_nps_{pd.Timestamp.now():%Y%m%d_%H%M}"
+        if job is None:
+            return
+        
+        # Les petits exports sont prêts presque aussitôt ; les autres se poursuivent entre deux affichages
+        if not job.wait(timeout=1):
+            st.info("Préparation de l'export en cours…")
+            st.button("Actualiser", key="export_refresh")
+            return
+        if job.error:
+            st.error(f"Erreur lors de la préparation de l'export: {job.error}")
+            return
+        
+        file_stem = st.session_state.export_stem
+        with job.open() as handle:
+            st.download_button(
+                f"Télécharger ({len(rows)} réponses)",
+                data=handle,
+                file_name=f"{file_stem}.{file_info['extension']}",
+                mime=file_info['mime']
+            )
+        # Les indicateurs sont inclus dans le classeur XLSX, fournis à part sinon
+        if export_format != "XLSX":
+            st.download_button(
+                "Télécharger les indicateurs (CSV)",
+                data=kpis_to_csv(kpis),
+                file_name=f"{file_stem}_indicateurs.csv",
+                mime="text/csv"
+            )
 
 def display_responses_details(df):
     """Fonction principale d'affichage des réponses."""
     st.header("Détails des réponses")
     
     # Configuration du style
-    st.markdown("""
-        <style>
-        .metric-card {
-            background-color: rgba(255,255,255,0.05);
-            padding: 12px;
-            border-radius: 4px;
-            margin-bottom: 10px;
-        }
-        .response-card {
-            margin-bottom: 8px;
-            border-radius: 4px;
-            overflow: hidden;
-        }
-        .name-display {
-            white-space: nowrap;
-            overflow: hidden;
-            text-overflow: ellipsis;
-            max-width: 200px;
-        }
-        </style>
-    """, unsafe_allow_html=True)
+    st.markdown(CARD_STYLE, unsafe_allow_html=True)
     
     # Filtres
     col1, col2, col3 = st.columns([2, 2, 1])
@@ -228,29 +386,40 @@ def display_responses_details(df):
         )
     
     try:
-        # Application des filtres
-        filtered_df = apply_filters(df, periode, search, types_avis)
+        # Application des filtres (positions de lignes sur le DataFrame partagé)
+        df = ensure_time_index(df)
+        version = st.session_state.get('dataset_version')
+        index = get_bitmap_index(version, df) if version else None
+        details = get_response_details(version, df) if version else ResponseDetails(df)
+        rows = filter_rows(df, periode, search, types_avis, index)
         
-        if filtered_df.empty:
+        if len(rows) == 0:
             st.info("Aucune réponse ne correspond aux critères de recherche")
             return
         
         # Affichage des statistiques
-        nps_score, reabo_mean, total = calculate_stats(filtered_df)
+        nps_score, reabo_mean, total = calculate_stats(take_rows(df, rows, STATS_COLUMNS))
         cols = st.columns(3)
         cols[0].metric("Score NPS", f"{nps_score}%")
         cols[1].metric("Prob. réabonnement", f"{reabo_mean}")
         cols[2].metric("Nombre de réponses", total)
         
+        card_columns = CARD_COLUMNS + [col for col in df.columns if col.startswith('Satisfaction_')]
+        kpis = {
+            "Période": periode,
+            "Recherche": search or "-",
+            "Types d'avis": ", ".join(types_avis) or "-",
+            "Score NPS (%)": nps_score,
+            "Prob. réabonnement": reabo_mean,
+            "Nombre de réponses": total,
+            "Exporté le": pd.Timestamp.now().strftime('%d/%m/%Y %H:%M')
+        }
+        display_export(df, rows, card_columns, kpis)
+        
         st.markdown("---")
         
-        # Affichage des réponses
-        now = pd.Timestamp.now()
-        for _, row in filtered_df.sort_values('Date', ascending=False).iterrows():
-            is_new = (now - pd.to_datetime(row['Date'])).days < 4
-            display_response_card(row, is_new)
-            category, color, _ = get_nps_category(row['Recommandation'])
-            display_response_details(row, color)
+        # Affichage des réponses, page par page
+        display_response_page(details, rows)
             
     except Exception as e:
         st.error(f"Une erreur s'est produite: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,76 @@
+import streamlit as st
+import plotly.graph_objects as go
+from text_analytics import analyze_comments, top_keywords, theme_counts
+from dataset_store import get_dataset_store
+
+def compute_text_tables(version, df, store=None, cache=None):
+    """Analyse les commentaires d'une version de données (mise en cache par version)."""
+    store = get_dataset_store() if store is None else store
+    return store.derived(version, 'text_tables', lambda: analyze_comments(df, cache))
+
+def display_text_themes(df):
+    """Affiche les mots-clés et thèmes des commentaires libres."""
+    st.header("Thèmes des commentaires")
+
+    words, themes = compute_text_tables(st.session_state.get('dataset_version'), df)
+    if words.empty:
+        st.info("Aucun commentaire libre n'est disponible dans les données")
+        return
+
+    group_by = st.radio(
+        "Regrouper par",
+        ["Mois", "Catégorie"],
+        horizontal=True,
+        key="themes_group_by"
+    )
+
+    col1, col2 = st.columns(2)
+
+    # Mots les plus fréquents sur toute la période
+    with col1:
+        st.subheader("Mots les plus cités")
+        top = top_keywords(words, n=15).iloc[::-1]
+        fig = go.Figure(go.Bar(
+            x=top['Occurrences'],
+            y=top['Mot'],
+            orientation='h',
+            marker_color='rgb(52, 152, 219)'
+        ))
+        fig.update_layout(
+            height=450,
+            margin=dict(l=20, r=20, t=30, b=20),
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)'
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    # Thèmes par mois ou par catégorie NPS
+    with col2:
+        st.subheader("Thèmes évoqués")
+        counts = theme_counts(themes, group_by)
+        if counts.empty:
+            st.info("Aucun thème détecté")
+        else:
+            fig = go.Figure(go.Heatmap(
+                z=counts.values,
+                x=counts.columns.astype(str),
+                y=counts.index,
+                colorscale='Blues',
+                hovertemplate="%{y} - %{x}: %{z} commentaires<extra></extra>"
+            ))
+            fig.update_layout(
+                height=450,
+                margin=dict(l=20, r=20, t=30, b=20),
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+    st.markdown("---")
+
+    # Détail des mots-clés par groupe
+    st.subheader(f"Mots-clés par {group_by.lower()}")
+    by_group = top_keywords(words, by=group_by, n=5)
+    labels = by_group['Mot'] + " (" + by_group['Occurrences'].astype(str) + ")"
+    summary = labels.groupby(by_group[group_by]).agg(", ".join).rename("Mots-clés")
+    st.dataframe(summary.to_frame(), use_container_width=True)
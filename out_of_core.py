@@ -0,0 +1,288 @@
+"""Mode hors mémoire : indicateurs calculés en parcourant l'historique sur disque par blocs.
+
+Pour un historique plus volumineux que la mémoire, les réponses ne sont jamais
+chargées en un seul DataFrame. Chaque bloc lu (fichier Parquet ou base SQLite
+des réponses) produit des agrégats partiels additifs : totaux journaliers des
+notes (vue d'ensemble, métriques) et sommes par segment (analyse par segment),
+fusionnés par addition. Pour une base SQLite, les totaux journaliers sont
+calculés par une requête groupée, sans lecture des réponses. La mémoire dépend du nombre de jours et de segments,
+pas du nombre de réponses. Les pages de réponses sont lues à la demande.
+"""
+import os
+import threading
+import numpy as np
+import pandas as pd
+from config import METRIC_STRUCTURE
+from data_preprocessing import TEXT_COLUMNS
+from daily_index import LEVELS, NS_PER_DAY, DailyIndex, daily_totals, score_columns
+from drilldown import drilldown_partials, finalize_drilldown, merge_partials
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+# Textes libres jamais lus pour les agrégats (le club sert d'axe d'analyse)
+COMMENT_COLUMNS = [col for col in TEXT_COLUMNS if col != 'Club']
+
+class DailyAccumulator:
+    """Totaux journaliers des notes, accumulés bloc par bloc.
+
+    La plage de jours s'étend au fil des blocs, dans un ordre quelconque.
+    """
+
+    def __init__(self, columns):
+        self.columns = score_columns(columns)
+        self.origin = None
+        self.totals = None  # (effectifs, sommes, répartition des notes) par jour
+
+    def _extend(self, first, last):
+        """Étend la plage couverte pour inclure les jours [first, last]."""
+        if self.totals is None:
+            origin, end = first, last + 1
+        else:
+            origin, end = min(self.origin, first), max(self.origin + len(self.totals[0]), last + 1)
+            if origin == self.origin and end == self.origin + len(self.totals[0]):
+                return
+        n_columns = len(self.columns)
+        totals = tuple(np.zeros((end - origin,) + shape) for shape in ((n_columns,), (n_columns,), (n_columns, LEVELS)))
+        if self.totals is not None:
+            offset = self.origin - origin
+            for new, old in zip(totals, self.totals):
+                new[offset:offset + len(old)] = old
+        self.origin, self.totals = origin, totals
+
+    def add_daily(self, first, totals):
+        """Ajoute des totaux journaliers (voir daily_totals) dont la première ligne est le jour first."""
+        n_days = len(totals[0])
+        if not n_days:
+            return
+        self._extend(first, first + n_days - 1)
+        offset = first - self.origin
+        for total, partial in zip(self.totals, totals):
+            total[offset:offset + n_days] += partial
+
+    def add(self, chunk):
+        if chunk.empty:
+            return
+        days = pd.DatetimeIndex(chunk['Date']).asi8 // NS_PER_DAY
+        first, last = int(days.min()), int(days.max())
+        self.add_daily(first, daily_totals(chunk, self.columns, days - first, last - first + 1))
+
+    def index(self):
+        """Cumuls journaliers (DailyIndex) des blocs accumulés."""
+        if self.totals is None:
+            n_columns = len(self.columns)
+            return DailyIndex.from_daily(0, self.columns, np.zeros((0, n_columns)), np.zeros((0, n_columns)),
+                                         np.zeros((0, n_columns, LEVELS)))
+        return DailyIndex.from_daily(self.origin, self.columns, *self.totals)
+
+def monthly_nps(index):
+    """Répartition des catégories et NPS de chaque mois, d'après les cumuls journaliers.
+
+    Retourne un DataFrame : Mois, Promoteur, Passif, Détracteur, Réponses, NPS.
+    """
+    columns = ['Mois', 'Promoteur', 'Passif', 'Détracteur', 'Réponses', 'NPS']
+    if not index.n_days or 'Recommandation' not in index.positions:
+        return pd.DataFrame(columns=columns)
+
+    months = pd.date_range(index.first_day().replace(day=1), index.last_day(), freq='MS')
+    rows = [index.position(month, 0) for month in months] + [index.n_days]
+    levels = np.diff(index.levels[rows, index.positions['Recommandation']], axis=0)
+    promoters, passives, detractors = levels[:, 9:].sum(axis=1), levels[:, 7:9].sum(axis=1), levels[:, :7].sum(axis=1)
+    total = levels.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        nps = (promoters - detractors) / total * 100
+    table = pd.DataFrame({
+        'Mois': months.to_period('M').astype(str),
+        'Promoteur': promoters.astype(int),
+        'Passif': passives.astype(int),
+        'Détracteur': detractors.astype(int),
+        'Réponses': total.astype(int),
+        'NPS': nps
+    }, columns=columns)
+    return table[table['Réponses'] > 0].reset_index(drop=True)
+
+def satisfaction_table(index, start=None, end=None):
+    """Moyenne et répartition de chaque métrique de satisfaction sur [start, end).
+
+    Retourne un DataFrame : Catégorie, Métrique, Service, Moyenne, Satisfaits,
+    Neutres, Insatisfaits (en %), Réponses.
+    """
+    counts, sums, levels = index.totals(start, end)
+    rows = []
+    for details in METRIC_STRUCTURE.values():
+        for metric, service in details['metrics'].items():
+            i = index.positions.get(metric)
+            if i is None or not counts[i]:
+                continue
+            distribution = levels[i]
+            graded = distribution.sum() or np.nan
+            rows.append((
+                details['label'], metric, service, sums[i] / counts[i],
+                distribution[4:].sum() / graded * 100,
+                distribution[3] / graded * 100,
+                distribution[:3].sum() / graded * 100,
+                int(counts[i])
+            ))
+    return pd.DataFrame(rows, columns=[
+        'Catégorie', 'Métrique', 'Service', 'Moyenne', 'Satisfaits', 'Neutres', 'Insatisfaits', 'Réponses'
+    ])
+
+class OutOfCoreHistory:
+    """Historique des réponses lu par blocs depuis un fichier Parquet ou une base SQLite.
+
+    Le fichier Parquet (instantané partagé, jeu synthétique) doit être trié par
+    date ; la base SQLite est parcourue selon son index sur Date. Les agrégats
+    sont conservés tant que le fichier n'est pas modifié.
+    """
+
+    def __init__(self, path, chunk_size=100_000):
+        extension = os.path.splitext(path)[1].lower()
+        if extension in PARQUET_EXTENSIONS:
+            self.kind = 'parquet'
+        elif extension in SQLITE_EXTENSIONS:
+            self.kind = 'sqlite'
+        else:
+            raise ValueError(f"Format d'historique non pris en charge : {path}")
+        self.path = path
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._signature = None
+        self._results = {}
+        self._key_locks = {}
+        self._store = None
+
+    def _response_store(self):
+        # Lecture seule : le fichier n'est ni créé, ni converti en WAL, ni modifié
+        if self._store is None:
+            from response_store import SQLiteResponseStore
+            self._store = SQLiteResponseStore(self.path, read_only=True)
+        return self._store
+
+    def columns(self):
+        """Colonnes de réponse de l'historique (hors index et clé)."""
+        if self.kind == 'parquet':
+            import pyarrow.parquet as pq
+            return [name for name in pq.ParquetFile(self.path).schema_arrow.names if not name.startswith('__index_level_')]
+        return self._response_store().columns()
+
+    def schema(self):
+        """DataFrame vide portant les colonnes de l'historique (axes et mesures disponibles)."""
+        return pd.DataFrame(columns=self.columns())
+
+    def count(self):
+        if self.kind == 'parquet':
+            import pyarrow.parquet as pq
+            return pq.ParquetFile(self.path).metadata.num_rows
+        return self._response_store().count()
+
+    def iter_chunks(self, columns=None):
+        """Réponses par blocs de chunk_size lignes, au format du prétraitement."""
+        if self.kind == 'sqlite':
+            yield from self._response_store().iter_chunks(self.chunk_size, columns)
+            return
+
+        import pyarrow.parquet as pq
+        handle = pq.ParquetFile(self.path)
+        for batch in handle.iter_batches(batch_size=self.chunk_size, columns=columns or self.columns()):
+            yield batch.to_pandas()
+
+    def signature(self):
+        """Empreinte du fichier (date de modification, taille), journal WAL compris."""
+        return tuple(
+            (stat.st_mtime_ns, stat.st_size)
+            for stat in (os.stat(p) for p in (self.path, self.path + '-wal') if os.path.exists(p))
+        )
+
+    def _memo(self, key, compute):
+        """Résultat d'un parcours, recalculé quand le fichier change.
+
+        Un verrou par résultat évite que deux sessions lancent le même parcours
+        en parallèle, sans bloquer celles qui demandent un autre résultat.
+        """
+        with self._lock:
+            signature = self.signature()
+            if signature != self._signature:
+                self._signature, self._results, self._key_locks = signature, {}, {}
+            if key in self._results:
+                return self._results[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Résultat publié par la session qui détenait le verrou
+            with self._lock:
+                if self._signature == signature and key in self._results:
+                    return self._results[key]
+            result = compute()
+            with self._lock:
+                if self._signature == signature:
+                    self._results[key] = result
+            return result
+
+    def _daily_index(self):
+        columns = self.columns()
+        accumulator = DailyAccumulator(columns)
+        if self.kind == 'sqlite':
+            # Totaux journaliers agrégés par SQLite : aucune réponse n'est lue en mémoire
+            first, *totals = self._response_store().daily_totals(accumulator.columns, LEVELS)
+            accumulator.add_daily(first, totals)
+            return accumulator.index()
+        for chunk in self.iter_chunks(['Date'] + accumulator.columns):
+            accumulator.add(chunk)
+        return accumulator.index()
+
+    def daily_index(self):
+        """Cumuls journaliers des notes, en un parcours de l'historique."""
+        return self._memo('daily_index', self._daily_index)
+
+    def _drilldown(self, dimensions, measures):
+        columns = [col for col in self.columns() if col not in COMMENT_COLUMNS]
+        merged = None
+        for chunk in self.iter_chunks(columns):
+            partials = drilldown_partials(chunk, dimensions, measures)
+            merged = partials if merged is None else merge_partials([merged, partials], dimensions)
+        if merged is None:
+            return pd.DataFrame(columns=dimensions + measures)
+        return finalize_drilldown(merged, dimensions, measures)
+
+    def drilldown(self, dimensions, measures):
+        """Analyse par segment (voir drilldown.compute_drilldown), en un parcours de l'historique."""
+        return self._memo(
+            ('drilldown', tuple(dimensions), tuple(measures)),
+            lambda: self._drilldown(list(dimensions), list(measures))
+        )
+
+    def page(self, limit=50, offset=0, columns=None):
+        """Page de réponses, des plus récentes aux plus anciennes : (DataFrame, total).
+
+        Seuls les groupes de lignes Parquet contenant la page sont lus.
+        """
+        if self.kind == 'sqlite':
+            return self._response_store().responses_page(limit, offset, columns)
+
+        import pyarrow.parquet as pq
+        handle = pq.ParquetFile(self.path)
+        total = handle.metadata.num_rows
+        stop = max(total - offset, 0)
+        start = max(stop - limit, 0)
+        frames, group_start = [], 0
+        for group in range(handle.num_row_groups):
+            group_stop = group_start + handle.metadata.row_group(group).num_rows
+            if group_start < stop and group_stop > start:
+                table = handle.read_row_group(group, columns=columns or self.columns())
+                first = max(start, group_start)
+                frames.append(table.slice(first - group_start, min(stop, group_stop) - first).to_pandas())
+            group_start = group_stop
+        if not frames:
+            return pd.DataFrame(columns=columns or self.columns()), total
+        return pd.concat(frames, ignore_index=True).iloc[::-1].reset_index(drop=True), total
+
+_HISTORIES = {}
+_HISTORIES_LOCK = threading.Lock()
+
+def get_out_of_core_history(path, chunk_size=100_000):
+    """Retourne l'historique sur disque d'un fichier (une instance par processus)."""
+    with _HISTORIES_LOCK:
+        history = _HISTORIES.get(path)
+        if history is None:
+            history = _HISTORIES[path] = OutOfCoreHistory(path, chunk_size)
+        return history
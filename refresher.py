@@ -0,0 +1,107 @@
+import queue
+import threading
+import time
+import streamlit as st
+from config import DEFAULT_SETTINGS
+from dataset_store import get_dataset_store
+from bitmap_index import get_bitmap_index
+from drilldown import cached_drilldown, default_query
+from key_drivers import cached_key_drivers
+from category_scores import cached_category_scores
+from daily_index import get_daily_index
+from response_details import get_response_details
+from nps_themes import compute_text_tables
+from text_analytics import get_comment_cache
+
+class BackgroundRefresher:
+    """Recharge les sources avant expiration et précalcule les vues par défaut.
+
+    Au démarrage, le thread charge les sources de preload qui ne le sont pas
+    encore (source par défaut des sessions). Il recharge ensuite les sources dès qu'elles atteignent
+    refresh_ratio x ttl, à condition qu'une session les ait demandées depuis
+    moins de idle secondes ; les sources statiques ne sont jamais rechargées. À
+    chaque nouvelle version publiée, les index et agrégats par défaut sont
+    calculés hors du chemin des requêtes : les sessions lisent toujours le
+    dernier instantané valide.
+    """
+
+    def __init__(self, store, ttl, refresh_ratio=0.8, interval=15, idle=1800, comment_cache=None, preload=()):
+        self.store = store
+        self.preload = preload
+        self.ttl = ttl
+        self.refresh_ratio = refresh_ratio
+        self.interval = interval
+        self.idle = idle
+        self.comment_cache = comment_cache
+        self._jobs = queue.Queue()
+        store.add_listener(lambda source, version, df: self._jobs.put((source, version, df)))
+        self._thread = threading.Thread(target=self._run, name="dataset-refresher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        # Premier chargement : la nouvelle version est précalculée par _warm_until
+        for source in self.preload:
+            if self.store.current_version(source) is None:
+                self.store.refresh(source)
+        while True:
+            for source in self.store.sources():
+                if self.is_due(source):
+                    try:
+                        self.store.refresh(source)
+                    except Exception as e:
+                        print(f"DEBUG - Erreur lors du rafraîchissement de {source}:", str(e))
+            self._warm_until(time.time() + self.interval)
+
+    def is_due(self, source):
+        """Source chargée, non statique, demandée récemment et proche de son expiration."""
+        age = self.store.age(source)
+        requested = self.store.last_request(source)
+        return (
+            age is not None
+            and age >= self.ttl * self.refresh_ratio
+            and not self.store.is_static(source)
+            and requested is not None
+            and time.time() - requested < self.idle
+        )
+
+    def _warm_until(self, deadline):
+        """Traite les précalculs en attente jusqu'à la prochaine vérification des sources."""
+        while (remaining := deadline - time.time()) > 0:
+            try:
+                source, version, df = self._jobs.get(timeout=remaining)
+            except queue.Empty:
+                return
+            try:
+                self.warm(version, df)
+            except Exception as e:
+                print(f"DEBUG - Erreur lors du préchargement des vues ({source}):", str(e))
+
+    def warm(self, version, df):
+        """Précalcule les index (bitmap, détails des réponses), l'analyse par segment par défaut,
+        les thèmes, les facteurs clés, les scores par catégorie et les cumuls journaliers."""
+        get_bitmap_index(version, df, store=self.store)
+        get_response_details(version, df, store=self.store)
+        dimensions, measures = default_query(df)
+        cached_drilldown(version, dimensions, measures, df, store=self.store)
+        compute_text_tables(version, df, store=self.store, cache=self.comment_cache)
+        cached_key_drivers(version, df, store=self.store)
+        cached_category_scores(version, df, store=self.store)
+        get_daily_index(version, df, store=self.store)
+
+@st.cache_resource
+def get_background_refresher(_loaders, static_sources=(), preload_sources=()):
+    """Démarre le rafraîchissement en arrière-plan des sources de données.
+
+    preload_sources : sources chargées et précalculées dès le démarrage.
+    """
+    store = get_dataset_store()
+    for source, loader in _loaders.items():
+        store.register_source(source, loader, static=source in static_sources)
+    return BackgroundRefresher(
+        store,
+        DEFAULT_SETTINGS['duree_cache_donnees'],
+        refresh_ratio=DEFAULT_SETTINGS['ratio_rafraichissement'],
+        idle=DEFAULT_SETTINGS['inactivite_source'],
+        comment_cache=get_comment_cache(),
+        preload=tuple(source for source in preload_sources if source in _loaders)
+    )
@@ -0,0 +1,149 @@
+import html
+import sys
+import numpy as np
+import pandas as pd
+from dataset_store import get_dataset_store
+
+# Catégories NPS des cartes de réponse (plages de notes et couleurs)
+NPS_CATEGORIES = {
+    "Promoteur": {"range": (9, 10), "color": "#24A158", "bg_color": "rgba(36, 161, 88, 0.1)"},
+    "Neutre": {"range": (7, 8), "color": "#F1C40F", "bg_color": "rgba(241, 196, 15, 0.1)"},
+    "Détracteur": {"range": (0, 6), "color": "#B03428", "bg_color": "rgba(176, 52, 40, 0.1)"}
+}
+UNKNOWN_CATEGORY = ("Inconnu", "#95A5A6", "rgba(149, 165, 166, 0.1)")
+
+# (libellé, couleur, fond) par code de catégorie ; le dernier code est "Inconnu"
+CATEGORY_STYLES = tuple(
+    (name, info["color"], info["bg_color"]) for name, info in NPS_CATEGORIES.items()
+) + (UNKNOWN_CATEGORY,)
+
+# Couleur d'une note de satisfaction (0 à 5)
+SATISFACTION_COLORS = ("#B03428",) * 4 + ("#FFFFFF", "#24A158")
+
+MISSING = -1
+
+def metric_label(col):
+    """Libellé affiché d'une colonne de satisfaction."""
+    return col.replace('Satisfaction_', '').replace('_', ' ').title()
+
+def _int8_scores(values):
+    """Notes entières sur int8 (MISSING pour les valeurs manquantes ou hors bornes)."""
+    scores = values.to_numpy(dtype=float, na_value=np.nan)
+    valid = ~np.isnan(scores) & (scores >= 0) & (scores <= 10)
+    return np.where(valid, np.nan_to_num(scores), MISSING).astype(np.int8)
+
+def _text_values(df, col):
+    """Valeurs d'une colonne texte (None si la colonne est absente)."""
+    return df[col].to_numpy(dtype=object) if col in df.columns else None
+
+class ResponseDetails:
+    """Détails des réponses d'une version de données, calculés une seule fois.
+
+    Les notes de satisfaction sont stockées en format long (int8) : pour la
+    réponse i, les positions [row_starts[i], row_starts[i + 1]) de metric_codes
+    et metric_scores donnent ses notes, déjà triées par libellé. Les libellés,
+    dates formatées et cellules HTML sont internés ; l'affichage d'une carte ne
+    fait que lire ces valeurs.
+    """
+    __slots__ = (
+        'size', 'recommandation', 'reabo', 'category', 'timestamps', 'day_codes', 'day_labels',
+        'metric_labels', 'metric_cells', 'row_starts', 'metric_codes', 'metric_scores', 'texts'
+    )
+
+    def __init__(self, df):
+        self.size = len(df)
+        self.recommandation = _int8_scores(df['Recommandation']) if 'Recommandation' in df.columns \
+            else np.full(self.size, MISSING, dtype=np.int8)
+        self.reabo = _int8_scores(df['ProbabiliteReabo']) if 'ProbabiliteReabo' in df.columns \
+            else np.full(self.size, MISSING, dtype=np.int8)
+
+        # Code de catégorie de chaque réponse (index dans CATEGORY_STYLES)
+        scores = self.recommandation
+        self.category = np.select(
+            [(scores >= info["range"][0]) & (scores <= info["range"][1]) for info in NPS_CATEGORIES.values()],
+            range(len(NPS_CATEGORIES)),
+            len(NPS_CATEGORIES)
+        ).astype(np.int8)
+
+        # Dates : chaque jour distinct n'est formaté qu'une fois
+        dates = df['Date']
+        self.timestamps = dates.to_numpy(dtype='datetime64[ns]')
+        days, day_values = pd.factorize(dates.dt.normalize(), sort=True)
+        self.day_codes = days.astype(np.int32)
+        self.day_labels = tuple(sys.intern(day.strftime('%d/%m/%Y')) for day in day_values)
+
+        # Notes de satisfaction en format long, triées par libellé de métrique
+        metric_columns = sorted((col for col in df.columns if col.startswith('Satisfaction_')), key=metric_label)
+        self.metric_labels = tuple(sys.intern(metric_label(col)) for col in metric_columns)
+        self.metric_cells = tuple(
+            tuple(
+                '<div class="metric-cell"><div style="color: #888;">' + html.escape(label) + '</div>'
+                f'<div style="font-size: 1.2em; color: {SATISFACTION_COLORS[min(score, 5)]};">{score}/5</div></div>'
+                for score in range(11)
+            )
+            for label in self.metric_labels
+        )
+        if metric_columns:
+            grid = np.column_stack([_int8_scores(df[col]) for col in metric_columns])
+        else:
+            grid = np.empty((self.size, 0), dtype=np.int8)
+        present = grid != MISSING
+        rows, metrics = np.nonzero(present)
+        self.metric_codes = metrics.astype(np.int8)
+        self.metric_scores = grid[rows, metrics]
+        self.row_starts = np.concatenate([[0], np.cumsum(present.sum(axis=1))]).astype(np.int64)
+
+        # Textes libres : références aux colonnes du jeu de données partagé, sans copie
+        self.texts = {
+            col: _text_values(df, col)
+            for col in ('Prenom', 'Nom', 'PourquoiNote', 'PourquoiReabo', 'Ameliorations')
+        }
+
+    def style(self, position):
+        """(catégorie, couleur, fond) d'une réponse."""
+        return CATEGORY_STYLES[self.category[position]]
+
+    def date_label(self, position):
+        code = self.day_codes[position]
+        return self.day_labels[code] if code >= 0 else ""
+
+    def is_new(self, position, now):
+        """Réponse de moins de 4 jours."""
+        return (np.datetime64(now, 'ns') - self.timestamps[position]) < np.timedelta64(4, 'D')
+
+    def text(self, col, position):
+        """Texte libre d'une réponse (None si absent)."""
+        values = self.texts.get(col)
+        if values is None:
+            return None
+        value = values[position]
+        return None if pd.isna(value) else str(value)
+
+    def full_name(self, position):
+        parts = (self.text('Prenom', position), self.text('Nom', position))
+        return " ".join(part.strip() for part in parts if part).strip()
+
+    @staticmethod
+    def score_text(score):
+        return "N/A" if score == MISSING else str(score)
+
+    def metrics(self, position):
+        """Notes de satisfaction d'une réponse : [(libellé, note, couleur)], triées par libellé."""
+        start, stop = self.row_starts[position], self.row_starts[position + 1]
+        return [
+            (self.metric_labels[code], int(score), SATISFACTION_COLORS[min(score, 5)])
+            for code, score in zip(self.metric_codes[start:stop], self.metric_scores[start:stop])
+        ]
+
+    def metric_grid_html(self, position):
+        """Grille HTML des notes de satisfaction d'une réponse (cellules précalculées)."""
+        start, stop = self.row_starts[position], self.row_starts[position + 1]
+        return ''.join(
+            self.metric_cells[code][score]
+            for code, score in zip(self.metric_codes[start:stop].tolist(), self.metric_scores[start:stop].tolist())
+        )
+
+def get_response_details(version, df, store=None):
+    """Retourne les détails précalculés des réponses d'une version de données."""
+    store = get_dataset_store() if store is None else store
+    return store.derived(version, 'response_details', lambda: ResponseDetails(df))
@@ -0,0 +1,258 @@
+"""Base SQLite des réponses, optionnelle, alimentée à chaque chargement de la source.
+
+La base reflète la dernière lecture complète du sheet (voir sync) : chaque
+réponse a pour clé l'empreinte de l'ensemble de ses colonnes, les doublons
+exacts restant distincts. Utilisée comme historique hors mémoire, elle fournit
+les totaux journaliers des notes, agrégés par SQLite (daily_totals), et les
+pages de réponses lues selon l'index sur Date, sans charger l'ensemble des
+réponses en mémoire.
+"""
+import contextlib
+import os
+import sqlite3
+import threading
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from data_preprocessing import SCORE_COLUMNS, is_satisfaction_column
+
+TABLE = 'reponses'
+KEY_COLUMN = 'cle'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S.%f'  # largeur fixe : l'ordre du texte est l'ordre chronologique
+INDEXED_COLUMNS = ['Date', 'Recommandation', 'Catégorie']
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def _is_numeric_column(col):
+    return col in SCORE_COLUMNS or is_satisfaction_column(col)
+
+def response_keys(df):
+    """Clé de chaque réponse : empreinte de toutes ses colonnes et rang parmi ses doublons exacts.
+
+    Le sheet n'a pas d'identifiant de ligne stable : une réponse modifiée
+    change de clé, l'ancienne version est retirée par sync.
+    """
+    content = pd.util.hash_pandas_object(df[sorted(df.columns)], index=False).to_numpy()
+    occurrence = pd.Series(content).groupby(content).cumcount().to_numpy()
+    keyed = pd.DataFrame({'contenu': content, 'rang': occurrence})
+    return pd.util.hash_pandas_object(keyed, index=False).to_numpy().view(np.int64)
+
+def _date_text(value):
+    return None if value is None else pd.Timestamp(value).strftime(DATE_FORMAT)
+
+class SQLiteResponseStore:
+    """Réponses prétraitées stockées dans un fichier SQLite (une connexion par appel).
+
+    read_only : ouvre une base existante en lecture seule (URI mode=ro), sans
+    créer la table ni modifier le mode de journalisation.
+    """
+
+    def __init__(self, path, read_only=False):
+        self.path = path
+        self.read_only = read_only
+        if read_only:
+            return
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+                f"{KEY_COLUMN} INTEGER PRIMARY KEY, \"Date\" TEXT NOT NULL, "
+                f"\"Recommandation\" REAL, \"Catégorie\" TEXT)"
+            )
+            for col in INDEXED_COLUMNS:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote('idx_' + col)} ON {TABLE} ({_quote(col)})")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Connexion fermée en sortie de bloc ; la transaction est validée si aucune erreur."""
+        if self.read_only:
+            conn = sqlite3.connect(Path(self.path).resolve().as_uri() + '?mode=ro', uri=True, timeout=30)
+        else:
+            conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def columns(self, conn=None):
+        """Colonnes de réponse de la table (hors clé)."""
+        if conn is None:
+            with self._connect() as conn:
+                return self.columns(conn)
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({TABLE})") if row[1] != KEY_COLUMN]
+
+    def _ensure_columns(self, conn, df):
+        existing = set(self.columns(conn))
+        for col in df.columns:
+            if col not in existing:
+                kind = 'REAL' if _is_numeric_column(col) else 'TEXT'
+                conn.execute(f"ALTER TABLE {TABLE} ADD COLUMN {_quote(col)} {kind}")
+
+    def _insert(self, conn, df, keys):
+        """Insère les réponses dont la clé est absente (une clé existante porte le même contenu)."""
+        frame = df.reset_index(drop=True)
+        frame['Date'] = frame['Date'].dt.strftime(DATE_FORMAT)
+        frame.insert(0, KEY_COLUMN, keys)
+        columns = list(frame.columns)
+        records = frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None)
+
+        names = ', '.join(_quote(col) for col in columns)
+        self._ensure_columns(conn, df)
+        conn.executemany(
+            f"INSERT OR IGNORE INTO {TABLE} ({names}) VALUES ({', '.join('?' * len(columns))})",
+            records
+        )
+
+    def insert(self, df):
+        """Insère les réponses d'un DataFrame prétraité ; retourne leur nombre."""
+        if df.empty:
+            return 0
+        with self._connect() as conn:
+            self._insert(conn, df, response_keys(df))
+        return len(df)
+
+    def sync(self, df):
+        """Aligne la base sur une lecture complète du sheet, en une transaction.
+
+        Seules les réponses dont la clé est absente (nouvelles ou modifiées) sont
+        écrites ; celles qui ne figurent plus dans df (supprimées ou modifiées
+        dans le sheet) sont retirées. Retourne (réponses écrites, réponses retirées).
+        """
+        keys = response_keys(df) if not df.empty else np.empty(0, dtype=np.int64)
+        with self._connect() as conn:
+            conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS cles_lues ({KEY_COLUMN} INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM cles_lues")
+            conn.executemany("INSERT OR IGNORE INTO cles_lues VALUES (?)", ((int(key),) for key in keys))
+            new_keys = [row[0] for row in conn.execute(
+                f"SELECT {KEY_COLUMN} FROM cles_lues WHERE {KEY_COLUMN} NOT IN (SELECT {KEY_COLUMN} FROM {TABLE})"
+            )]
+            new_rows = np.isin(keys, new_keys)
+            if new_rows.any():
+                self._insert(conn, df[new_rows], keys[new_rows])
+            removed = conn.execute(
+                f"DELETE FROM {TABLE} WHERE {KEY_COLUMN} NOT IN (SELECT {KEY_COLUMN} FROM cles_lues)"
+            ).rowcount
+        return int(new_rows.sum()), removed
+
+    @staticmethod
+    def _where(start=None, end=None):
+        """Clause WHERE et paramètres du filtre de période [start, end)."""
+        clauses, params = [], []
+        if start is not None:
+            clauses.append('"Date" >= ?')
+            params.append(_date_text(start))
+        if end is not None:
+            clauses.append('"Date" < ?')
+            params.append(_date_text(end))
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def _typed(self, df):
+        """Rétablit les types du contrat de prétraitement sur un résultat de requête."""
+        if 'Date' in df.columns:
+            df['Date'] = pd.to_datetime(df['Date'], format=DATE_FORMAT)
+        for col in df.columns:
+            if _is_numeric_column(col):
+                df[col] = df[col].astype('float64')
+            elif col != 'Date' and df[col].dtype == object:
+                df[col] = df[col].fillna('')
+        return df
+
+    def count(self, **filters):
+        where, params = self._where(**filters)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {TABLE}{where}", params).fetchone()[0]
+
+    def summary(self):
+        """Nombre de réponses, première et dernière date, taille du fichier."""
+        with self._connect() as conn:
+            count, first, last = conn.execute(f'SELECT COUNT(*), MIN("Date"), MAX("Date") FROM {TABLE}').fetchone()
+        return {
+            'reponses': count,
+            'premiere_date': first,
+            'derniere_date': last,
+            'taille': os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        }
+
+    def daily_totals(self, columns, levels, **filters):
+        """Totaux de chaque jour calculés par SQLite, en une requête groupée par jour.
+
+        Retourne (premier jour, effectifs, sommes, répartition des notes entières
+        de 0 à levels - 1), au format de daily_index.daily_totals sur la plage de
+        jours continue ; premier jour None si aucune réponse.
+        """
+        where, params = self._where(**filters)
+        selected = ', '.join(
+            f'COUNT({_quote(col)}), TOTAL({_quote(col)}), '
+            + ', '.join(f'TOTAL({_quote(col)} = {level})' for level in range(levels))
+            for col in columns
+        )
+        with self._connect() as conn:
+            rows = conn.execute(
+                f'SELECT substr("Date", 1, 10) AS jour{", " + selected if columns else ""} '
+                f'FROM {TABLE}{where} GROUP BY jour ORDER BY jour',
+                params
+            ).fetchall()
+        n_columns = len(columns)
+        if not rows:
+            return None, np.zeros((0, n_columns)), np.zeros((0, n_columns)), np.zeros((0, n_columns, levels))
+
+        days = pd.DatetimeIndex(pd.to_datetime([row[0] for row in rows])).asi8 // (86400 * 10**9)
+        values = np.array([row[1:] for row in rows], dtype=float).reshape(len(rows), n_columns, levels + 2)
+        first = int(days[0])
+        shape = (int(days[-1]) - first + 1, n_columns)
+        counts, sums, distribution = np.zeros(shape), np.zeros(shape), np.zeros(shape + (levels,))
+        counts[days - first], sums[days - first], distribution[days - first] = (
+            values[:, :, 0], values[:, :, 1], values[:, :, 2:]
+        )
+        return first, counts, sums, distribution
+
+    def responses_page(self, limit=50, offset=0, columns=None, **filters):
+        """Page de réponses filtrées, des plus récentes aux plus anciennes : (DataFrame, total)."""
+        where, params = self._where(**filters)
+        selected = ', '.join(_quote(col) for col in columns) if columns else '*'
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM {TABLE}{where}", params).fetchone()[0]
+            page = pd.read_sql_query(
+                f'SELECT {selected} FROM {TABLE}{where} ORDER BY "Date" DESC LIMIT ? OFFSET ?',
+                conn, params=params + [limit, offset]
+            )
+        return self._typed(page.drop(columns=[KEY_COLUMN], errors='ignore')), total
+
+    def iter_chunks(self, chunk_size=100_000, columns=None, **filters):
+        """Réponses filtrées par blocs de chunk_size lignes, dans l'ordre chronologique.
+
+        Les lignes sont lues au fil d'un unique curseur (parcours de l'index sur
+        Date) : seul le bloc en cours est en mémoire.
+        """
+        where, params = self._where(**filters)
+        selected = ', '.join(_quote(col) for col in columns) if columns else '*'
+        with self._connect() as conn:
+            for chunk in pd.read_sql_query(
+                f'SELECT {selected} FROM {TABLE}{where} ORDER BY "Date"',
+                conn, params=params, chunksize=chunk_size
+            ):
+                yield self._typed(chunk.drop(columns=[KEY_COLUMN], errors='ignore'))
+
+    def read(self, **filters):
+        """Réponses filtrées, dans l'ordre chronologique."""
+        where, params = self._where(**filters)
+        with self._connect() as conn:
+            df = pd.read_sql_query(f'SELECT * FROM {TABLE}{where} ORDER BY "Date"', conn, params=params)
+        return self._typed(df.drop(columns=[KEY_COLUMN]))
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+def get_response_store(path):
+    """Retourne la base des réponses d'un fichier (une instance par processus).
+
+    Registre de module plutôt que st.cache_resource : le chargement des sources
+    s'exécute aussi dans les threads d'arrière-plan.
+    """
+    with _STORES_LOCK:
+        store = _STORES.get(path)
+        if store is None:
+            store = _STORES[path] = SQLiteResponseStore(path)
+        return store
@@ -0,0 +1,24 @@
+def is_contiguous(rows):
+    """Vérifie si des positions triées forment une plage continue."""
+    return len(rows) == 0 or rows[-1] - rows[0] + 1 == len(rows)
+
+def select_columns(df, columns):
+    """Retourne les colonnes demandées présentes dans le DataFrame, dans son ordre."""
+    if columns is None:
+        return None
+    wanted = set(columns)
+    return [col for col in df.columns if col in wanted]
+
+def take_rows(df, rows, columns=None):
+    """Matérialise uniquement les lignes et colonnes demandées.
+
+    Une plage continue est renvoyée comme une tranche (sans copie) ; sinon
+    seules les colonnes demandées sont copiées pour les lignes retenues.
+    """
+    cols = select_columns(df, columns)
+    col_positions = slice(None) if cols is None else [df.columns.get_loc(col) for col in cols]
+
+    if is_contiguous(rows):
+        start = int(rows[0]) if len(rows) else 0
+        return df.iloc[start:start + len(rows), col_positions]
+    return df.iloc[rows, col_positions]
@@ -0,0 +1,153 @@
+"""Cache partagé des sources entre les répliques de l'application.
+
+Chaque source est stockée en un instantané Parquet dans un répertoire local
+commun à tous les processus. Une seule réplique à la fois recharge une source
+expirée (verrou de fichier) ; les autres lisent le dernier instantané publié.
+L'instantané est écrit dans un fichier temporaire puis renommé : un lecteur voit
+toujours une version complète, l'ancienne ou la nouvelle.
+"""
+import contextlib
+import os
+import re
+import tempfile
+import time
+import unicodedata
+
+def source_slug(source):
+    """Nom de fichier d'une source ("Données réelles" -> "donnees_reelles")."""
+    ascii_name = unicodedata.normalize('NFKD', source).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '_', ascii_name.lower()).strip('_') or 'source'
+
+@contextlib.contextmanager
+def file_lock(path, blocking=True):
+    """Verrou exclusif entre processus sur path ; produit True si le verrou est obtenu.
+
+    Sans fcntl (Windows), aucun verrou n'est pris et chaque réplique recharge elle-même.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield True
+        return
+
+    with open(path, 'a') as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+class SharedSnapshotCache:
+    """Instantanés des sources partagés par les processus d'une même machine.
+
+    max_age : âge (en secondes) au-delà duquel une réplique recharge la source.
+    """
+
+    def __init__(self, directory, max_age):
+        self.directory = directory
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, source):
+        return os.path.join(self.directory, f"{source_slug(source)}.parquet")
+
+    def age(self, source):
+        """Âge en secondes de l'instantané d'une source (None s'il n'existe pas)."""
+        try:
+            return time.time() - os.stat(self.path(source)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def is_fresh(self, source):
+        age = self.age(source)
+        return age is not None and age < self.max_age
+
+    def read(self, source):
+        """Lit le dernier instantané d'une source (None s'il est absent ou illisible)."""
+        import pandas as pd
+
+        try:
+            return pd.read_parquet(self.path(source))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"DEBUG - Instantané illisible pour {source}:", str(e))
+            return None
+
+    def write(self, source, df):
+        """Publie un instantané de façon atomique (fichier temporaire puis renommage)."""
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(handle)
+        try:
+            df.to_parquet(temp_path, index=True)
+            os.replace(temp_path, self.path(source))
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temp_path)
+            raise
+
+    def load(self, source, loader):
+        """Retourne la dernière version de la source, en ne la rechargeant que si elle a expiré.
+
+        La réplique qui obtient le verrou recharge la source et publie
+        l'instantané ; les autres attendent cette publication puis la lisent.
+        """
+        import pandas as pd
+
+        if self.is_fresh(source):
+            df = self.read(source)
+            if df is not None:
+                return df
+
+        lock_path = self.path(source) + '.lock'
+        with file_lock(lock_path, blocking=False) as acquired:
+            if acquired:
+                # Une autre réplique a pu publier pendant l'attente du verrou
+                if self.is_fresh(source):
+                    df = self.read(source)
+                    if df is not None:
+                        return df
+                try:
+                    df = loader()
+                except Exception as e:
+                    # Source indisponible : on sert le dernier instantané lisible, sinon l'erreur remonte
+                    previous = self.read(source)
+                    if previous is None:
+                        raise
+                    print(f"DEBUG - Chargement de {source} en échec, dernier instantané servi:", str(e))
+                    return previous
+                if df.empty:
+                    # En cas d'échec du chargement, on sert le dernier instantané valide
+                    previous = self.read(source)
+                    return df if previous is None else previous
+                try:
+                    self.write(source, df)
+                except Exception as e:
+                    # Instantané non publié (pyarrow absent, disque plein) : la source reste servie
+                    print(f"DEBUG - Instantané partagé non publié pour {source}:", str(e))
+                    return df
+                print(f"DEBUG - Instantané partagé publié pour {source} ({len(df)} lignes)")
+                return df
+
+        # Rechargement en cours dans une autre réplique : on attend sa publication.
+        # Les sessions n'attendent pas : le store sert sa version précédente pendant ce temps.
+        with file_lock(lock_path, blocking=True):
+            df = self.read(source)
+        return df if df is not None else pd.DataFrame()
+
+def shared_loaders(loaders, directory, max_age):
+    """Enveloppe les fonctions de chargement pour passer par le cache partagé.
+
+    Sans répertoire configuré, les fonctions sont retournées telles quelles.
+    """
+    if not directory:
+        return loaders
+    cache = SharedSnapshotCache(directory, max_age)
+    return {
+        source: (lambda source=source, loader=loader: cache.load(source, loader))
+        for source, loader in loaders.items()
+    }
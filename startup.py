@@ -0,0 +1,83 @@
+"""Imports différés et mesure des temps d'import au démarrage.
+
+Usage en ligne de commande : python startup.py
+affiche le temps d'import de chaque dépendance lourde et module de l'application.
+"""
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Dépendances lourdes des vues, inutiles avant la connexion
+VIEW_DEPENDENCIES = ['numpy', 'pandas', 'plotly.graph_objects']
+
+# Dépendances Google Sheets, inutiles en mode données de test
+SHEETS_DEPENDENCIES = ['gspread', 'oauth2client.service_account']
+
+HEAVY_MODULES = VIEW_DEPENDENCIES + SHEETS_DEPENDENCIES
+
+# Modules de l'application chargés après la connexion
+APP_MODULES = [
+    'dataset_store',
+    'data_loader',
+    'data_preprocessing',
+    'nps_overview',
+    'nps_metrics',
+    'nps_responses',
+    'nps_themes',
+    'nps_drilldown',
+    'nps_drivers',
+    'nps_history',
+    'anomaly_monitor',
+    'refresher',
+    'memory_report',
+]
+
+_IMPORT_TIMES = {}
+
+# Les sessions qui se connectent en même temps importeraient sinon les mêmes modules
+# en parallèle et pourraient voir un module partiellement initialisé
+_IMPORT_LOCK = threading.RLock()
+
+def timed_import(name):
+    """Importe un module et mémorise la durée du premier import réel."""
+    already_loaded = name in sys.modules
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    if not already_loaded and name not in _IMPORT_TIMES:
+        _IMPORT_TIMES[name] = time.perf_counter() - start
+    return module
+
+def preload(names):
+    """Importe une liste de modules en mesurant chacun."""
+    for name in names:
+        try:
+            timed_import(name)
+        except ImportError as e:
+            print(f"DEBUG - Import impossible de {name}:", str(e))
+
+@contextmanager
+def timed_imports(label):
+    """Mesure le temps total d'un bloc d'imports (un seul bloc exécuté à la fois)."""
+    with _IMPORT_LOCK:
+        before = len(sys.modules)
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        if len(sys.modules) > before:
+            _IMPORT_TIMES[f"[{label}]"] = elapsed
+
+def import_report():
+    """Retourne les temps d'import mesurés, du plus long au plus court (en ms)."""
+    return sorted(
+        ({'module': name, 'duree_ms': round(seconds * 1000, 1)} for name, seconds in _IMPORT_TIMES.items()),
+        key=lambda row: row['duree_ms'],
+        reverse=True
+    )
+
+if __name__ == "__main__":
+    preload(HEAVY_MODULES)
+    preload(APP_MODULES)
+    for row in import_report():
+        print(f"{row['duree_ms']:>9.1f} ms  {row['module']}")
@@ -0,0 +1,269 @@
+"""Jeu de données synthétique volumineux, écrit sur disque par blocs.
+
+Contrairement à generate_test_data (un DataFrame en mémoire), le générateur
+produit les réponses bloc par bloc dans l'ordre chronologique : la mémoire
+utilisée ne dépend que de la taille des blocs, pas du volume total. Les
+réponses couvrent plusieurs clubs, avec saisonnalité du volume et des notes,
+ruptures de tendance par club et commentaires libres.
+
+Formats de sortie :
+- csv : en-têtes bruts du formulaire Google (valeurs texte, comme le sheet),
+  pour éprouver le chemin d'ingestion complet ;
+- parquet : réponses prétraitées (contrat de data_preprocessing), un groupe
+  de lignes par bloc ;
+- sqlite : réponses prétraitées insérées dans la base de réponses.
+
+Usage en ligne de commande :
+python synthetic_data.py reponses.csv --rows 20000000 --clubs 8 --years 5
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from config import COLUMN_MAPPING
+from data_preprocessing import preprocess_data, rename_columns_flexibly
+
+FORM_DATE_FORMAT = '%d/%m/%Y %H:%M:%S'
+
+# En-têtes bruts du formulaire, par colonne interne
+RAW_HEADERS = {
+    'Date': "Horodateur",
+    'Email': "Adresse e-mail",
+    'Club': "Votre club",
+    'Recommandation': "Sur une échelle de 0 à 10, quelle est la probabilité que vous recommandiez Annette K. à un proche ? (Recommandation)",
+    'PourquoiNote': "Pourquoi cette note ?",
+    'ProbabiliteReabo': "Sur une échelle de 0 à 10, quelle est la probabilité que vous soyez toujours abonné dans un an ?",
+    'PourquoiReabo': "Pourquoi cette réponse ?",
+    **dict(zip(rename_columns_flexibly(pd.DataFrame(columns=list(COLUMN_MAPPING))).columns, COLUMN_MAPPING)),
+    'Ameliorations': "Quelles améliorations proposeriez-vous ?",
+    'Nom': "Votre Nom",
+    'Prenom': "Votre prénom",
+}
+SATISFACTION_COLUMNS = [col for col in RAW_HEADERS if col.startswith('Satisfaction_')]
+
+CLUB_NAMES = [
+    "Paris 15", "Paris 11", "Boulogne", "Levallois", "Neuilly", "Lyon Part-Dieu", "Lyon Confluence",
+    "Marseille Prado", "Bordeaux", "Lille", "Nantes", "Toulouse", "Nice", "Strasbourg", "Montpellier", "Rennes"
+]
+FIRST_NAMES = ["Camille", "Léa", "Manon", "Chloé", "Inès", "Sarah", "Julie", "Emma", "Lucas", "Hugo",
+               "Thomas", "Nicolas", "Julien", "Maxime", "Antoine", "Karim", "Sofia", "Mathilde", "Paul", "Élodie"]
+LAST_NAMES = ["Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand", "Leroy", "Moreau",
+              "Simon", "Laurent", "Lefebvre", "Michel", "Garcia", "David", "Bertrand", "Roux", "Vincent", "Fournier"]
+
+# Commentaires types par catégorie NPS
+COMMENTS = {
+    'Promoteur': [
+        "Super ambiance et coachs au top", "Les cours collectifs sont excellents", "Club propre et bien équipé",
+        "Personnel d'accueil très sympathique", "La piscine est un vrai plus", "Je recommande sans hésiter",
+        "Masterclass géniales, très motivantes", "Rapport qualité prix imbattable",
+    ],
+    'Passif': [
+        "Bien dans l'ensemble mais trop de monde le soir", "Cours intéressants mais souvent complets",
+        "Correct, vestiaires à rafraîchir", "Bon club mais parking difficile", "Des équipements parfois en panne",
+        "Ambiance sympa, horaires un peu limités",
+    ],
+    'Détracteur': [
+        "Vestiaires sales et douches froides", "Impossible de réserver un cours", "Trop cher pour le service rendu",
+        "Machines souvent hors service", "Accueil désagréable", "Piscine fermée trop souvent",
+        "Beaucoup trop de monde aux heures de pointe", "Résiliation compliquée",
+    ],
+}
+IMPROVEMENTS = [
+    "Plus de créneaux de cours le soir", "Rénover les vestiaires", "Ouvrir plus tôt le week-end",
+    "Ajouter des machines de musculation", "Améliorer la ventilation", "Proposer une offre de restauration saine",
+    "Plus de masterclass", "Un meilleur système de réservation",
+]
+REABO_COMMENTS = [
+    "Je déménage bientôt", "Tant que les tarifs restent stables", "Je suis fidèle depuis des années",
+    "Ça dépendra des travaux", "J'hésite avec un autre club", "Très satisfait, aucune raison de partir",
+]
+
+# Saisonnalité mensuelle : volume de réponses et effet sur la satisfaction (janvier -> décembre)
+MONTHLY_VOLUME = np.array([1.6, 1.3, 1.15, 1.0, 0.95, 0.9, 0.6, 0.5, 1.3, 1.1, 0.95, 0.75])
+MONTHLY_MOOD = np.array([-0.15, -0.1, 0.0, 0.05, 0.1, 0.15, 0.2, 0.2, -0.1, -0.05, 0.0, 0.05])
+
+class SyntheticConfig:
+    """Paramètres du jeu synthétique."""
+
+    def __init__(self, rows=1_000_000, clubs=8, years=3, end=None, chunk_size=250_000,
+                 shifts_per_club=3, comment_rate=0.35, missing_rate=0.1, seed=0):
+        self.rows = rows
+        self.clubs = clubs
+        self.years = years
+        self.end = pd.Timestamp(end or pd.Timestamp.now()).normalize()
+        self.chunk_size = chunk_size
+        self.shifts_per_club = shifts_per_club
+        self.comment_rate = comment_rate
+        self.missing_rate = missing_rate
+        self.seed = seed
+
+class SyntheticResponses:
+    """Génère les réponses par blocs chronologiques.
+
+    Le nombre de réponses de chaque jour suit la saisonnalité mensuelle et le
+    jour de la semaine ; les notes dérivent d'un niveau latent par réponse :
+    niveau du club + ruptures de tendance + saison + bruit.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        rng = np.random.default_rng(config.seed)
+        self.days = pd.date_range(end=config.end, periods=int(config.years * 365), freq='D')
+        weights = MONTHLY_VOLUME[self.days.month - 1] * np.where(self.days.dayofweek >= 5, 0.7, 1.0)
+        self.day_counts = rng.multinomial(config.rows, weights / weights.sum())
+        self.day_ends = np.cumsum(self.day_counts)
+
+        self.clubs = [
+            f"Annette K. {CLUB_NAMES[i % len(CLUB_NAMES)]}" + (f" {i // len(CLUB_NAMES) + 1}" if i >= len(CLUB_NAMES) else "")
+            for i in range(config.clubs)
+        ]
+        self.club_weights = rng.dirichlet(np.full(config.clubs, 4.0))
+        self.club_levels = rng.normal(0.0, 0.35, config.clubs)
+
+        # Ruptures de tendance : (jour de la rupture, décalage du niveau) par club
+        self.shift_days = np.sort(rng.integers(0, len(self.days), (config.clubs, config.shifts_per_club)), axis=1)
+        self.shift_sizes = rng.normal(0.0, 0.4, (config.clubs, config.shifts_per_club))
+        self.metric_offsets = rng.normal(0.0, 0.25, len(SATISFACTION_COLUMNS))
+
+    def chunks(self):
+        """Génère les blocs de réponses (colonnes internes, valeurs typées)."""
+        for chunk_id, start in enumerate(range(0, self.config.rows, self.config.chunk_size)):
+            stop = min(start + self.config.chunk_size, self.config.rows)
+            yield self._chunk(chunk_id, start, stop)
+
+    def _chunk(self, chunk_id, start, stop):
+        rng = np.random.default_rng([self.config.seed, chunk_id])
+        n = stop - start
+        positions = np.arange(start, stop)
+
+        # Jour de chaque réponse puis heure entre 7 h et 22 h, croissante avec le rang dans
+        # la journée : l'ordre chronologique est global, y compris d'un bloc à l'autre
+        day_index = np.searchsorted(self.day_ends, positions, side='right')
+        rank = positions - (self.day_ends[day_index] - self.day_counts[day_index])
+        seconds = 7 * 3600 + (rank + rng.random(n)) * (15 * 3600) / self.day_counts[day_index]
+        dates = self.days[day_index].to_numpy() + seconds.astype(np.int64).astype('timedelta64[s]')
+
+        club = rng.choice(len(self.clubs), n, p=self.club_weights)
+        shifted = day_index[:, None] >= self.shift_days[club]
+        latent = (
+            self.club_levels[club]
+            + (shifted * self.shift_sizes[club]).sum(axis=1)
+            + MONTHLY_MOOD[self.days.month[day_index] - 1]
+            + rng.normal(0.0, 1.0, n)
+        )
+
+        recommandation = np.clip(np.round(7.2 + 1.9 * latent + rng.normal(0.0, 1.2, n)), 0, 10)
+        reabo = np.clip(np.round(7.0 + 1.6 * latent + rng.normal(0.0, 1.6, n)), 0, 10)
+        categories = np.select([recommandation >= 9, recommandation >= 7], ['Promoteur', 'Passif'], 'Détracteur')
+
+        data = {
+            'Date': dates,
+            'Club': np.array(self.clubs, dtype=object)[club],
+            'Recommandation': recommandation,
+            'PourquoiNote': self._comments(rng, categories),
+            'ProbabiliteReabo': reabo,
+            'PourquoiReabo': self._sample(rng, REABO_COMMENTS, n, self.config.comment_rate * 0.5),
+        }
+        for i, col in enumerate(SATISFACTION_COLUMNS):
+            scores = np.clip(np.round(3.5 + 0.7 * latent + self.metric_offsets[i] + rng.normal(0.0, 0.7, n)), 1, 5)
+            data[col] = np.where(rng.random(n) < self.config.missing_rate, np.nan, scores)
+        data['Ameliorations'] = self._sample(rng, IMPROVEMENTS, n, self.config.comment_rate * 0.6)
+        data['Prenom'] = np.array(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), n)]
+        data['Nom'] = np.array(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), n)] + ' ' + positions.astype(str).astype(object)
+        data['Email'] = 'membre' + positions.astype(str).astype(object) + '@exemple.fr'
+        return pd.DataFrame(data)
+
+    @staticmethod
+    def _sample(rng, phrases, n, rate):
+        """Phrase tirée au hasard pour une part rate des réponses, vide sinon."""
+        values = np.array(phrases, dtype=object)[rng.integers(0, len(phrases), n)]
+        return np.where(rng.random(n) < rate, values, '')
+
+    def _comments(self, rng, categories):
+        comments = np.full(len(categories), '', dtype=object)
+        for category, phrases in COMMENTS.items():
+            selected = categories == category
+            comments[selected] = self._sample(rng, phrases, int(selected.sum()), self.config.comment_rate)
+        return comments
+
+def to_form_rows(chunk):
+    """Convertit un bloc en lignes brutes du formulaire (texte, cellules vides si absent)."""
+    raw = pd.DataFrame(index=chunk.index)
+    for col, header in RAW_HEADERS.items():
+        values = chunk[col]
+        if col == 'Date':
+            raw[header] = values.dt.strftime(FORM_DATE_FORMAT)
+        elif pd.api.types.is_float_dtype(values):
+            scores = values.to_numpy()
+            raw[header] = np.where(np.isnan(scores), '', np.nan_to_num(scores).astype(np.int64).astype(str))
+        else:
+            raw[header] = values
+    return raw
+
+def write_csv(responses, path):
+    for i, chunk in enumerate(responses.chunks()):
+        to_form_rows(chunk).to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        yield len(chunk)
+
+def write_parquet(responses, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in responses.chunks():
+            table = pa.Table.from_pandas(preprocess_data(chunk).reset_index(drop=True), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table.cast(writer.schema))
+            yield len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def write_sqlite(responses, path):
+    from response_store import SQLiteResponseStore
+
+    store = SQLiteResponseStore(path)
+    for chunk in responses.chunks():
+        store.insert(preprocess_data(chunk))
+        yield len(chunk)
+
+WRITERS = {'csv': write_csv, 'parquet': write_parquet, 'sqlite': write_sqlite}
+
+def write_dataset(path, config, output_format=None):
+    """Écrit le jeu synthétique ; le format est déduit de l'extension à défaut. Retourne le nombre de lignes."""
+    if output_format is None:
+        extension = path.rsplit('.', 1)[-1].lower()
+        output_format = {'db': 'sqlite', 'sqlite3': 'sqlite'}.get(extension, extension)
+    if output_format not in WRITERS:
+        raise ValueError(f"Format inconnu : {output_format} ({', '.join(WRITERS)})")
+
+    written = 0
+    start = time.perf_counter()
+    for rows in WRITERS[output_format](SyntheticResponses(config), path):
+        written += rows
+        rate = written / max(time.perf_counter() - start, 1e-9)
+        print(f"{written:>12,} / {config.rows:,} lignes ({rate:,.0f} lignes/s)".replace(',', ' '))
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère un jeu de réponses NPS synthétique sur disque")
+    parser.add_argument('path', help="fichier de sortie (.csv, .parquet ou .db)")
+    parser.add_argument('--format', choices=list(WRITERS), help="format de sortie (déduit de l'extension par défaut)")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="nombre de réponses")
+    parser.add_argument('--clubs', type=int, default=8, help="nombre de clubs")
+    parser.add_argument('--years', type=float, default=3, help="profondeur d'historique en années")
+    parser.add_argument('--chunk-size', type=int, default=250_000, help="réponses par bloc écrit")
+    parser.add_argument('--shifts', type=int, default=3, help="ruptures de tendance par club")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = SyntheticConfig(
+        rows=args.rows, clubs=args.clubs, years=args.years, chunk_size=args.chunk_size,
+        shifts_per_club=args.shifts, seed=args.seed
+    )
+    write_dataset(args.path, config, args.format)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import re
+import threading
+import unicodedata
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Colonnes de commentaires libres et colonne de mots-clés saisis dans le Google Sheet
+TEXT_COLUMNS = ['PourquoiNote', 'PourquoiReabo', 'Ameliorations']
+KEYWORD_COLUMN = 'MotsCles'
+
+FRENCH_STOPWORDS = frozenset("""
+a ai aie aient ait alors as au aucun aucune aupres aussi autre autres aux avais avait avant avec avez avoir
+avons bah bcp beaucoup bien bon bonne c ca car ce cela celle celles celui ces cet cette chez ci comme comment
+d dans de des deja depuis donc dont du elle elles en encore entre est et etaient etais etait ete etes etre eu
+fait faire fais faut fois font ici il ils j je jamais juste l la le les leur leurs lui m ma mais me meme mes
+moi moins mon n ne ni non nos notre nous on ont ou oui par parce pas peu peut peux plus pour pourquoi pourrait
+qu quand que quel quelle quelles quels qui quoi rien s sa sans se ses si sinon soit son sont sous suis sur
+t ta te tes toi ton tou tous tout toute toutes tres trop tu un une vos votre vous vraiment y
+""".split())
+
+# Thèmes détectés à partir des préfixes de mots normalisés (sans accents, au singulier
+# comme les mots produits par tokenize : "cours" devient "cour")
+THEMES = {
+    'Personnel': ('coach', 'accueil', 'personnel', 'equipe', 'staff', 'conseill', 'maitre', 'nageur', 'mns'),
+    'Propreté': ('propre', 'proprete', 'sale', 'salete', 'hygien', 'nettoy', 'menage'),
+    'Vestiaires': ('vestiaire', 'douche', 'sauna', 'serviette', 'casier'),
+    'Équipements': ('equipement', 'machine', 'appareil', 'materiel', 'tapi', 'halter', 'muscu'),
+    'Cours': ('cour', 'planning', 'horaire', 'creneau', 'reservation', 'collectif'),
+    'Piscine': ('piscine', 'bassin', 'nage', 'eau'),
+    'Affluence': ('monde', 'affluence', 'attente', 'bond', 'plein', 'foule'),
+    'Prix': ('prix', 'tarif', 'cher', 'abonnement', 'cout'),
+    'Ambiance': ('ambiance', 'convivial', 'accueillant', 'musique', 'festi', 'evenement', 'master'),
+    'Restauration': ('restau', 'bar', 'snack', 'cafe', 'boisson', 'repa'),
+}
+
+_WORD_PATTERN = re.compile(r"[a-z]+")
+
+def normalize_text(text):
+    """Met un commentaire en minuscules et supprime les accents."""
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+def _singular(word):
+    """Pluriels simples : "vestiaires" et "vestiaire" comptent ensemble."""
+    return word[:-1] if len(word) > 4 and word[-1] in 'sx' else word
+
+def tokenize(text):
+    """Découpe un commentaire normalisé en mots significatifs."""
+    return [
+        _singular(word) for word in _WORD_PATTERN.findall(normalize_text(text))
+        if len(word) >= 3 and word not in FRENCH_STOPWORDS
+    ]
+
+def parse_keywords(text):
+    """Découpe la colonne MotsCles (liste séparée par virgules ou points-virgules)."""
+    keywords = (normalize_text(keyword).strip() for keyword in re.split(r"[,;/]", str(text)))
+    return [_singular(keyword) for keyword in keywords if keyword]
+
+def detect_themes(tokens):
+    """Retourne les thèmes évoqués par une liste de mots."""
+    return tuple(
+        theme for theme, prefixes in THEMES.items()
+        if any(token.startswith(prefixes) for token in tokens)
+    )
+
+def _check_themes():
+    """Vérifie que chaque préfixe de THEMES est reconnu dans son thème une fois normalisé."""
+    for theme, prefixes in THEMES.items():
+        for prefix in prefixes:
+            if theme not in detect_themes(tokenize(prefix)):
+                raise ValueError(f"Préfixe de thème jamais détecté : {prefix!r} ({theme})")
+
+_check_themes()
+
+class CommentCache:
+    """Résultats d'analyse par empreinte de ligne, partagés entre sessions et versions de données."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def missing(self, hashes):
+        """Retourne les empreintes uniques absentes du cache."""
+        with self._lock:
+            return [h for h in pd.unique(hashes) if h not in self._entries]
+
+    def update(self, results):
+        with self._lock:
+            self._entries.update(results)
+
+    def lookup(self, hashes):
+        with self._lock:
+            return [self._entries[h] for h in hashes]
+
+    def retain(self, hashes):
+        """Oublie les lignes qui ne font plus partie des données."""
+        keep = set(hashes)
+        with self._lock:
+            self._entries = {h: entry for h, entry in self._entries.items() if h in keep}
+
+@st.cache_resource
+def get_comment_cache():
+    """Retourne le cache d'analyse partagé par toutes les sessions."""
+    return CommentCache()
+
+def _analyze_row(comment, keywords):
+    """Analyse une ligne : (mots, thèmes)."""
+    tokens = tokenize(comment)
+    keyword_list = parse_keywords(keywords) if keywords else []
+    return tuple(tokens + keyword_list), detect_themes(tokens + keyword_list)
+
+def analyze_comments(df, cache=None, batch_size=1000):
+    """Analyse les commentaires par lots et retourne les mots et thèmes au format long.
+
+    Seules les lignes dont l'empreinte est absente du cache sont analysées.
+    Retourne deux DataFrames (mots, thèmes) avec les colonnes Mois, Catégorie
+    et Mot ou Thème.
+    """
+    text_cols = [col for col in TEXT_COLUMNS if col in df.columns]
+    empty = (pd.DataFrame(columns=['Mois', 'Catégorie', 'Mot']),
+             pd.DataFrame(columns=['Mois', 'Catégorie', 'Thème']))
+    if df.empty or not (text_cols or KEYWORD_COLUMN in df.columns):
+        return empty
+
+    cache = get_comment_cache() if cache is None else cache
+    comments = df[text_cols].fillna('').astype(str).agg(' '.join, axis=1) if text_cols else pd.Series('', index=df.index)
+    keywords = df[KEYWORD_COLUMN].fillna('').astype(str) if KEYWORD_COLUMN in df.columns else pd.Series('', index=df.index)
+    hashes = pd.util.hash_pandas_object(
+        pd.DataFrame({'c': comments.to_numpy(), 'k': keywords.to_numpy()}), index=False
+    ).to_numpy()
+
+    # Analyse incrémentale : uniquement les nouvelles lignes, par lots
+    missing = set(cache.missing(hashes))
+    if missing:
+        positions = [pos for pos, h in enumerate(hashes) if h in missing]
+        comment_values, keyword_values = comments.to_numpy(), keywords.to_numpy()
+        for start in range(0, len(positions), batch_size):
+            batch = positions[start:start + batch_size]
+            cache.update({hashes[pos]: _analyze_row(comment_values[pos], keyword_values[pos]) for pos in batch})
+
+    # Le cache ne garde pas indéfiniment les lignes d'anciennes versions
+    if len(cache) > 2 * len(hashes):
+        cache.retain(hashes)
+
+    results = cache.lookup(hashes)
+    months = df['Date'].dt.to_period('M').astype(str).to_numpy()
+    categories = df['Catégorie'].to_numpy()
+
+    def to_long(values, label):
+        lengths = np.fromiter((len(v) for v in values), dtype=np.int64, count=len(values))
+        rows = np.repeat(np.arange(len(values)), lengths)
+        flat = [item for v in values for item in v]
+        return pd.DataFrame({'Mois': months[rows], 'Catégorie': categories[rows], label: flat})
+
+    return to_long([r[0] for r in results], 'Mot'), to_long([r[1] for r in results], 'Thème')
+
+def top_keywords(words, by=None, n=10):
+    """Retourne les n mots les plus fréquents, globalement ou par groupe (Mois ou Catégorie)."""
+    if words.empty:
+        return pd.DataFrame(columns=([by] if by else []) + ['Mot', 'Occurrences'])
+    keys = [by, 'Mot'] if by else ['Mot']
+    counts = words.groupby(keys).size().rename('Occurrences').reset_index()
+    counts = counts.sort_values(keys[:-1] + ['Occurrences'], ascending=[True] * (len(keys) - 1) + [False])
+    return counts.groupby(by).head(n) if by else counts.head(n)
+
+def theme_counts(themes, by):
+    """Tableau croisé du nombre de commentaires par thème et par groupe."""
+    if themes.empty:
+        return pd.DataFrame()
+    return themes.groupby(['Thème', by]).size().unstack(fill_value=0)
@@ -0,0 +1,61 @@
+import pandas as pd
+
+def index_by_date(df):
+    """Trie le DataFrame par date et l'indexe sur l'horodatage.
+
+    La colonne 'Date' est conservée pour le code existant ; l'index sert aux
+    découpages par recherche dichotomique. Les lignes sans date exploitable
+    ne peuvent pas être placées sur l'axe temporel et sont écartées.
+    """
+    if df.empty or 'Date' not in df.columns:
+        return df
+
+    df = df.dropna(subset=['Date']).sort_values('Date', kind='stable')
+    df.index = pd.DatetimeIndex(df['Date'].to_numpy(), name=None)
+    return df
+
+def has_time_index(df):
+    """Vérifie que le DataFrame est indexé et trié par date."""
+    return isinstance(df.index, pd.DatetimeIndex) and df.index.is_monotonic_increasing
+
+def ensure_time_index(df):
+    """Retourne un DataFrame indexé par date, en ne triant que si nécessaire."""
+    return df if has_time_index(df) else index_by_date(df)
+
+def last_date(df):
+    """Retourne la date la plus récente (None si aucune donnée)."""
+    df = ensure_time_index(df)
+    return df.index[-1] if len(df) else None
+
+def bounds_between(df, start=None, end=None):
+    """Retourne les positions [left, right) des lignes dont la date est dans [start, end).
+
+    Le DataFrame doit être indexé par date (voir ensure_time_index).
+    """
+    left = 0 if start is None else int(df.index.searchsorted(pd.Timestamp(start), side='left'))
+    right = len(df) if end is None else int(df.index.searchsorted(pd.Timestamp(end), side='left'))
+    return left, max(left, right)
+
+def bounds_latest(df, n):
+    """Retourne les positions [left, right) des n réponses les plus récentes."""
+    return max(len(df) - n, 0), len(df)
+
+def slice_between(df, start=None, end=None):
+    """Retourne les lignes dont la date est dans [start, end), sans copie."""
+    df = ensure_time_index(df)
+    left, right = bounds_between(df, start, end)
+    return df.iloc[left:right]
+
+def slice_since(df, start):
+    """Retourne les lignes dont la date est postérieure ou égale à start."""
+    return slice_between(df, start=start)
+
+def latest(df, n):
+    """Retourne les n réponses les plus récentes, dans l'ordre chronologique."""
+    df = ensure_time_index(df)
+    left, right = bounds_latest(df, n)
+    return df.iloc[left:right]
+
+def newest_first(df):
+    """Parcourt le DataFrame de la réponse la plus récente à la plus ancienne."""
+    return ensure_time_index(df).iloc[::-1]
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+from dataset_store import get_dataset_store
+
+# Granularités des courbes de tendance : libellé -> fréquence pandas
+GRANULARITIES = {"Mensuel": "M", "Hebdomadaire": "W", "Journalier": "D"}
+
+# Fenêtres glissantes proposées (en nombre de périodes) et fenêtre par défaut
+ROLLING_WINDOWS = {
+    "Hebdomadaire": [1, 4, 8, 13],
+    "Journalier": [1, 7, 28, 91],
+}
+DEFAULT_WINDOWS = {"Hebdomadaire": 4, "Journalier": 28}
+
+def nps_series(df, freq, window=1):
+    """Série NPS par période (sans trou) avec cumul glissant sur window périodes.
+
+    Retourne un DataFrame indexé par le début de chaque période : effectifs par
+    catégorie, NPS de la période, puis réponses et NPS sur la fenêtre glissante
+    (calculé sur les effectifs cumulés, pas en moyenne des NPS).
+    """
+    scores = df['Recommandation']
+    valid = scores.notna()
+    if not valid.any():
+        return pd.DataFrame()
+
+    # Ordinal de période de chaque réponse : les effectifs par période sont de simples bincount,
+    # et les périodes sans réponse restent à zéro pour que la fenêtre couvre bien window périodes
+    ordinals = df.loc[valid, 'Date'].dt.to_period(freq).array.asi8
+    first = ordinals.min()
+    offsets = ordinals - first
+    values = scores[valid].to_numpy(dtype=float)
+    size = offsets.max() + 1
+    counts = pd.DataFrame({
+        'Promoteur': np.bincount(offsets, weights=values >= 9, minlength=size).astype(int),
+        'Détracteur': np.bincount(offsets, weights=values <= 6, minlength=size).astype(int),
+        'Réponses': np.bincount(offsets, minlength=size),
+    }, index=pd.period_range(pd.Period(ordinal=first, freq=freq), periods=size, freq=freq))
+    counts['Passif'] = counts['Réponses'] - counts['Promoteur'] - counts['Détracteur']
+
+    rolling = counts[['Promoteur', 'Détracteur', 'Réponses']].rolling(window, min_periods=1).sum()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        counts['NPS'] = (counts['Promoteur'] - counts['Détracteur']) / counts['Réponses'].replace(0, np.nan) * 100
+        counts['Réponses glissantes'] = rolling['Réponses']
+        counts['NPS glissant'] = (rolling['Promoteur'] - rolling['Détracteur']) / rolling['Réponses'].replace(0, np.nan) * 100
+
+    counts.index = counts.index.start_time
+    return counts
+
+def cached_nps_series(version, df, freq, window, store=None):
+    """Version mise en cache de nps_series, par version de données, fréquence et fenêtre."""
+    store = get_dataset_store() if store is None else store
+    return store.derived(version, ('nps_series', freq, window), lambda: nps_series(df, freq, window))
+
+def lttb(x, y, threshold):
+    """Positions des points retenus par l'algorithme Largest-Triangle-Three-Buckets.
+
+    Conserve le premier et le dernier point, puis dans chaque tranche le point
+    formant le plus grand triangle avec le point retenu précédemment et la
+    moyenne de la tranche suivante : la forme de la courbe est préservée avec
+    au plus threshold points.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x, next_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+def downsample(series, column, max_points):
+    """Réduit une série à au plus max_points lignes (LTTB sur column, valeurs manquantes ignorées)."""
+    defined = series[series[column].notna()]
+    if len(defined) <= max_points:
+        return defined
+    x = defined.index.to_numpy(dtype='datetime64[ns]').astype(np.int64).astype(float)
+    return defined.iloc[lttb(x, defined[column].to_numpy(dtype=float), max_points)]